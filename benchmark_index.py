@@ -0,0 +1,345 @@
+import os
+import json
+import mmap
+import pickle
+import hashlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from jsonl_io import compression_of, dedupe_jsonl_variants, is_jsonl_file, open_binary
+
+# Repository root, used to resolve the default benchmark and cache locations
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Default location of the benchmark test cases
+BENCHMARK_DIR = os.path.join(REPO_ROOT, "benchmark")
+
+# Default location of the cached index (safe to delete, it is rebuilt on demand)
+CACHE_DIR = os.path.join(REPO_ROOT, ".cache", "benchmark_index")
+
+# Bump whenever the on-disk cache layout changes
+INDEX_VERSION = 1
+
+
+def file_sha256(file_path):
+    """Compute the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_jsonl_with_offsets(file_path):
+    """
+    Parse a JSONL file, remembering where each record starts in the file.
+
+    Args:
+        file_path: Path to the JSONL file (.jsonl, .jsonl.gz or .jsonl.zst)
+
+    Returns:
+        Tuple of (records, offsets) where offsets[i] is the byte offset of records[i]
+        in the decompressed stream
+    """
+    records = []
+    offsets = array('Q')
+    with open_binary(file_path) as f:
+        offset = 0
+        for line_num, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                    offsets.append(offset)
+                except json.JSONDecodeError:
+                    print(f"Warning: Invalid JSON at line {line_num} in {file_path}")
+            offset += len(line)
+    return records, offsets
+
+
+def split_benchmark_path(file_path):
+    """
+    Extract (language, category) from a benchmark path of the form
+    .../<language>/<category>/<category>.jsonl (optionally compressed)
+    """
+    parts = os.path.normpath(file_path).split(os.sep)
+    if len(parts) < 3:
+        return None, None
+    return parts[-3], parts[-2]
+
+
+class BenchmarkIndex:
+    """
+    Shared loader for the benchmark JSONL files.
+
+    The first time a benchmark file is used it is parsed once and three artifacts are
+    written to the cache directory:
+      - a manifest entry (mtime, size, SHA-256 and the id -> row table),
+      - a pickled record store used for fast iteration,
+      - a binary offset table (uint64 per row) that is memory-mapped together with the
+        source JSONL so a single test case can be fetched without parsing the file.
+
+    Cache entries are revalidated with the file mtime/size and, when those changed,
+    with the file hash, so touching a file without editing it does not force a rebuild.
+    """
+
+    def __init__(self, benchmark_dir=None, cache_dir=None, verbose=False):
+        self.benchmark_dir = os.path.abspath(benchmark_dir or BENCHMARK_DIR)
+        if cache_dir is None:
+            # Keep a separate cache per benchmark directory
+            dir_key = hashlib.sha1(self.benchmark_dir.encode('utf-8')).hexdigest()[:12]
+            cache_dir = os.path.join(CACHE_DIR, dir_key)
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+        self._manifest_path = os.path.join(self.cache_dir, "manifest.pkl")
+        self._manifest = self._load_manifest()
+        self._manifest_dirty = False
+        # In-memory caches for the current process
+        self._records = {}
+        self._offsets = {}
+        self._file_lists = {}
+
+    # ------------------------------------------------------------------
+    # Cache management
+    # ------------------------------------------------------------------
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path, 'rb') as f:
+                manifest = pickle.load(f)
+            if manifest.get("version") == INDEX_VERSION:
+                return manifest
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+        return {"version": INDEX_VERSION, "files": {}}
+
+    def _save_manifest(self):
+        if not self._manifest_dirty:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._manifest_path}.tmp{os.getpid()}"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self._manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._manifest_path)
+            self._manifest_dirty = False
+        except OSError as e:
+            print(f"Warning: Could not write benchmark index manifest: {e}")
+
+    def _cache_paths(self, rel_path):
+        stem = rel_path.replace(os.sep, "__").replace("/", "__")
+        return (os.path.join(self.cache_dir, f"{stem}.records.pkl"),
+                os.path.join(self.cache_dir, f"{stem}.offsets"))
+
+    def _entry(self, file_path):
+        """Return a valid manifest entry for file_path, rebuilding it if stale."""
+        rel_path = os.path.relpath(os.path.abspath(file_path), self.benchmark_dir)
+        stat = os.stat(file_path)
+        entry = self._manifest["files"].get(rel_path)
+
+        if entry is not None:
+            if entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                return rel_path, entry
+            # mtime changed - only rebuild if the content actually changed
+            if entry["size"] == stat.st_size and entry["sha256"] == file_sha256(file_path):
+                entry["mtime_ns"] = stat.st_mtime_ns
+                self._manifest_dirty = True
+                self._save_manifest()
+                return rel_path, entry
+
+        return rel_path, self._build_entry(file_path, rel_path, stat)
+
+    def _build_entry(self, file_path, rel_path, stat):
+        if self.verbose:
+            print(f"Indexing benchmark file {file_path}")
+        records, offsets = parse_jsonl_with_offsets(file_path)
+        language, category = split_benchmark_path(file_path)
+        entry = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_sha256(file_path),
+            "language": language,
+            "category": category,
+            "ids": {str(record.get("id")): row for row, record in enumerate(records)},
+        }
+
+        records_path, offsets_path = self._cache_paths(rel_path)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for path, payload in ((records_path, pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL)),
+                                  (offsets_path, offsets.tobytes())):
+                tmp_path = f"{path}.tmp{os.getpid()}"
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write benchmark index cache for {file_path}: {e}")
+
+        self._records[rel_path] = records
+        self._offsets[rel_path] = offsets
+        self._manifest["files"][rel_path] = entry
+        self._manifest_dirty = True
+        self._save_manifest()
+        return entry
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def files(self, language=None, categories=None) -> List[str]:
+        """
+        List benchmark JSONL files, optionally filtered by language and categories.
+
+        Args:
+            language: Language directory name (None or 'all' for every language)
+            categories: Optional list of category names
+
+        Returns:
+            Sorted list of benchmark JSONL file paths
+        """
+        root = self.benchmark_dir
+        if language and language != 'all':
+            root = os.path.join(root, language)
+        if root not in self._file_lists:
+            found = []
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if is_jsonl_file(filename):
+                        found.append(os.path.join(dirpath, filename))
+            self._file_lists[root] = dedupe_jsonl_variants(found)
+        jsonl_files = self._file_lists[root]
+        if categories:
+            jsonl_files = [f for f in jsonl_files if split_benchmark_path(f)[1] in categories]
+        return list(jsonl_files)
+
+    def records_for_file(self, file_path) -> List[Dict]:
+        """Return all records of a benchmark file, in file order."""
+        if not os.path.abspath(file_path).startswith(self.benchmark_dir + os.sep):
+            # Not part of this index - parse it directly
+            return parse_jsonl_with_offsets(file_path)[0]
+
+        rel_path, entry = self._entry(file_path)
+        if rel_path not in self._records:
+            records_path, _ = self._cache_paths(rel_path)
+            try:
+                with open(records_path, 'rb') as f:
+                    self._records[rel_path] = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                stat = os.stat(file_path)
+                self._build_entry(file_path, rel_path, stat)
+        return self._records[rel_path]
+
+    def records(self, language, category) -> List[Dict]:
+        """Return all records for a language/category pair, in file order."""
+        records = []
+        for file_path in self.files(language, [category]):
+            records.extend(self.records_for_file(file_path))
+        return records
+
+    def iter_records(self, language=None, categories=None):
+        """
+        Iterate over benchmark records.
+
+        Yields:
+            Tuples of (language, category, record)
+        """
+        for file_path in self.files(language, categories):
+            file_language, file_category = split_benchmark_path(file_path)
+            for record in self.records_for_file(file_path):
+                yield file_language, file_category, record
+
+    def _read_row(self, file_path, rel_path, row):
+        """Read a single row using the memory-mapped offset table."""
+        if rel_path in self._records:
+            return self._records[rel_path][row]
+        if compression_of(file_path):
+            # Compressed files cannot be seeked into - use the pickled record store
+            return self.records_for_file(file_path)[row]
+
+        offsets = self._offsets.get(rel_path)
+        if offsets is None:
+            _, offsets_path = self._cache_paths(rel_path)
+            try:
+                offsets = array('Q')
+                with open(offsets_path, 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        offsets.frombytes(mm[:])
+                self._offsets[rel_path] = offsets
+            except (OSError, ValueError):
+                return self.records_for_file(file_path)[row]
+
+        with open(file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = offsets[row]
+                end = mm.find(b'\n', start)
+                return json.loads(mm[start:end if end >= 0 else len(mm)])
+
+    def get(self, language, category, test_id) -> Optional[Dict]:
+        """
+        Fetch a single test case by (language, category, id).
+
+        Returns:
+            The test case dictionary, or None if it does not exist
+        """
+        for file_path in self.files(language, [category]):
+            rel_path, entry = self._entry(file_path)
+            row = entry["ids"].get(str(test_id))
+            if row is not None:
+                return self._read_row(file_path, rel_path, row)
+        return None
+
+    def find(self, test_id, language=None, categories=None) -> List[Tuple[str, Dict]]:
+        """
+        Find every test case with the given id across languages/categories.
+
+        Returns:
+            List of (file_path, record) tuples
+        """
+        matches = []
+        for file_path in self.files(language, categories):
+            rel_path, entry = self._entry(file_path)
+            row = entry["ids"].get(str(test_id))
+            if row is not None:
+                matches.append((file_path, self._read_row(file_path, rel_path, row)))
+        return matches
+
+    def by_key(self, language=None, categories=None) -> Dict[str, Dict[str, Dict]]:
+        """
+        Group records as {"<language>/<category>": {id: record}}.
+        """
+        grouped = {}
+        for file_language, file_category, record in self.iter_records(language, categories):
+            test_id = record.get('id')
+            if test_id:
+                grouped.setdefault(f"{file_language}/{file_category}", {})[test_id] = record
+        return grouped
+
+
+_INDEXES = {}
+
+
+def get_benchmark_index(benchmark_dir=None, verbose=False) -> BenchmarkIndex:
+    """Return a process-wide BenchmarkIndex for the given benchmark directory."""
+    key = os.path.abspath(benchmark_dir or BENCHMARK_DIR)
+    if key not in _INDEXES:
+        _INDEXES[key] = BenchmarkIndex(key, verbose=verbose)
+    return _INDEXES[key]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Build or inspect the cached benchmark index')
+    parser.add_argument('--benchmark', default=BENCHMARK_DIR, help='Path to the benchmark directory')
+    parser.add_argument('--language', default=None, help='Only index this language')
+    parser.add_argument('--id', type=str, help='Look up a test case by id')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = get_benchmark_index(args.benchmark, verbose=True)
+    total = sum(1 for _ in index.iter_records(args.language))
+    print(f"Indexed {total} test cases in {time.perf_counter() - start:.3f}s (cache: {index.cache_dir})")
+
+    if args.id:
+        for file_path, record in index.find(args.id, args.language):
+            print(f"{file_path}: {json.dumps(record)[:200]}")
@@ -0,0 +1,171 @@
+import math
+from statistics import NormalDist
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+# Default number of bootstrap resamples
+DEFAULT_N_BOOTSTRAP = 10000
+
+# Default seed, so the intervals of a report are the same on every run
+DEFAULT_SEED = 0
+
+# Largest number of values (resamples x samples) drawn at once when resampling by index
+MAX_DRAW_SIZE = 4_000_000
+
+# From this many samples on, the percentile interval is replaced by its normal approximation
+ANALYTIC_MIN_SAMPLES = 100_000
+
+
+def get_rng(seed=DEFAULT_SEED) -> np.random.Generator:
+    """Return a numpy random generator for the seed (an existing generator is returned unchanged)."""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def bootstrap_means(values, n_bootstrap: int = DEFAULT_N_BOOTSTRAP, rng=None) -> np.ndarray:
+    """
+    Draw the means of n_bootstrap resamples (with replacement) of values.
+
+    Scores usually take few distinct values (judge scores, pass/fail), so a resample is
+    drawn as the counts of each distinct value from one multinomial call, which is exact
+    and does not depend on the number of samples. Otherwise the resamples are drawn by
+    index in chunks of at most MAX_DRAW_SIZE values.
+
+    Args:
+        values: Sample values
+        n_bootstrap: Number of resamples
+        rng: numpy Generator or seed (default: DEFAULT_SEED)
+
+    Returns:
+        Array of n_bootstrap resample means
+    """
+    rng = get_rng(DEFAULT_SEED if rng is None else rng)
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0:
+        return np.full(n_bootstrap, np.nan)
+
+    distinct, counts = np.unique(values, return_counts=True)
+    if len(distinct) * 4 <= n:
+        draws = rng.multinomial(n, counts / n, size=n_bootstrap)
+        return draws @ distinct / n
+
+    means = np.empty(n_bootstrap)
+    chunk = max(1, MAX_DRAW_SIZE // n)
+    for start in range(0, n_bootstrap, chunk):
+        stop = min(n_bootstrap, start + chunk)
+        means[start:stop] = values[rng.integers(0, n, size=(stop - start, n))].mean(axis=1)
+    return means
+
+
+def percentile_interval(means, confidence: float = 0.95) -> Tuple[float, float]:
+    """Return the percentile interval of bootstrap resample means."""
+    lower = np.percentile(means, (1 - confidence) / 2 * 100)
+    upper = np.percentile(means, (1 + confidence) / 2 * 100)
+    return float(lower), float(upper)
+
+
+def normal_interval(values, confidence: float = 0.95) -> Tuple[float, float]:
+    """Return the normal approximation of the bootstrap interval of the mean (for large samples)."""
+    values = np.asarray(values, dtype=float)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    mean = values.mean()
+    half_width = z * values.std() / math.sqrt(len(values))
+    return float(mean - half_width), float(mean + half_width)
+
+
+def bootstrap_ci(values, n_bootstrap: int = DEFAULT_N_BOOTSTRAP, confidence: float = 0.95,
+                 seed=DEFAULT_SEED) -> Tuple[float, float]:
+    """
+    Calculate the bootstrap confidence interval of the mean of values.
+
+    Args:
+        values: Sample values
+        n_bootstrap: Number of resamples
+        confidence: Confidence level
+        seed: Seed or numpy Generator of the resampling
+
+    Returns:
+        Tuple of (lower_ci, upper_ci), NaN if there are no values
+    """
+    if len(values) == 0:
+        return math.nan, math.nan
+    if len(values) >= ANALYTIC_MIN_SAMPLES:
+        return normal_interval(values, confidence)
+    return percentile_interval(bootstrap_means(values, n_bootstrap, get_rng(seed)), confidence)
+
+
+def stratified_bootstrap_ci(values_by_stratum: Dict[Hashable, Iterable[float]], weights: Optional[Dict] = None,
+                            n_bootstrap: int = DEFAULT_N_BOOTSTRAP, confidence: float = 0.95,
+                            seed=DEFAULT_SEED) -> Tuple[float, float, float]:
+    """
+    Calculate a stratified bootstrap confidence interval of a weighted mean of stratum means.
+
+    Every stratum (e.g. a language/category file) is resampled separately, so each resample
+    keeps the number of samples per stratum of the benchmark design.
+
+    Args:
+        values_by_stratum: {stratum: sample values}
+        weights: {stratum: weight} of the stratum means (default: the stratum sizes, which gives
+            the mean of all samples); pass equal weights for a macro average
+        n_bootstrap: Number of resamples
+        confidence: Confidence level
+        seed: Seed or numpy Generator of the resampling
+
+    Returns:
+        Tuple of (estimate, lower_ci, upper_ci), NaN if there are no values
+    """
+    strata = {stratum: list(values) for stratum, values in values_by_stratum.items() if len(values) > 0}
+    if not strata:
+        return math.nan, math.nan, math.nan
+    if weights is None:
+        weights = {stratum: len(values) for stratum, values in strata.items()}
+    total_weight = sum(weights[stratum] for stratum in strata)
+
+    rng = get_rng(seed)
+    estimate = 0.0
+    resampled = np.zeros(n_bootstrap)
+    for stratum, values in strata.items():
+        share = weights[stratum] / total_weight
+        estimate += share * float(np.mean(values))
+        resampled += share * bootstrap_means(values, n_bootstrap, rng)
+    lower, upper = percentile_interval(resampled, confidence)
+    return estimate, lower, upper
+
+
+def paired_bootstrap_ci(scores_a: Dict[Hashable, float], scores_b: Dict[Hashable, float],
+                        n_bootstrap: int = DEFAULT_N_BOOTSTRAP, confidence: float = 0.95,
+                        seed=DEFAULT_SEED) -> Dict:
+    """
+    Calculate a paired bootstrap confidence interval of the mean score difference of two models.
+
+    Only the ids scored for both models are used, and they are resampled together, so the
+    difficulty of each test case cancels out of the difference.
+
+    Args:
+        scores_a: {id: score} of model A
+        scores_b: {id: score} of model B
+        n_bootstrap: Number of resamples
+        confidence: Confidence level
+        seed: Seed or numpy Generator of the resampling
+
+    Returns:
+        Dict with the mean difference (A - B), its lower_ci and upper_ci, the two-sided
+        bootstrap p_value of "no difference" and the number of pairs
+    """
+    shared = [key for key in scores_a if key in scores_b]
+    if not shared:
+        return {"difference": math.nan, "lower_ci": math.nan, "upper_ci": math.nan, "p_value": math.nan, "pairs": 0}
+    differences = np.array([scores_a[key] - scores_b[key] for key in shared], dtype=float)
+    means = bootstrap_means(differences, n_bootstrap, get_rng(seed))
+    lower, upper = percentile_interval(means, confidence)
+    p_value = min(1.0, 2 * min(np.mean(means <= 0), np.mean(means >= 0)))
+    return {
+        "difference": float(differences.mean()),
+        "lower_ci": lower,
+        "upper_ci": upper,
+        "p_value": float(p_value),
+        "pairs": len(shared),
+    }
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 from collections import defaultdict
 import matplotlib.pyplot as plt
@@ -7,11 +8,19 @@ import pandas as pd
 from Levenshtein import distance as levenshtein_distance
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 import numpy as np
 import re
 import Levenshtein
 import argparse
 
+# Make the shared repository-level modules importable when run from this directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmark_index import get_benchmark_index
+from completion_metrics import DEFAULT_CACHE_PATH as METRICS_CACHE_PATH, METRIC_NAMES, MetricsCache, compute_metrics
+from completion_store import read_completion_rows
+from jsonl_io import is_jsonl_file, open_text
+
 def strip_trivial_characters(text):
     """Strip trivial characters like whitespace, quotes, etc."""
     if not text:
@@ -84,54 +93,101 @@ def calculate_cosine_similarity(text1, text2):
         all_chars = set(text1) | set(text2)
         return len(common_chars) / len(all_chars) if all_chars else 0.0
 
+def _pair_cosines(vectorizer, pairs):
+    """
+    Fit one vocabulary over the distinct texts of the pairs and calculate the cosine of every pair.
+
+    The vocabulary is sorted like the one of a vectorizer fitted on a single pair, and every
+    row-wise dot product is summed in that order, which is how cosine_similarity sums it, so
+    the cosines are identical to calculate_cosine_similarity to the last bit.
+
+    Returns:
+        Tuple of (cosines, no_tokens) arrays, no_tokens telling the pairs where neither text has a token
+    """
+    rows = {}
+    for text1, text2 in pairs:
+        rows.setdefault(text1, len(rows))
+        rows.setdefault(text2, len(rows))
+    vectors = vectorizer.fit_transform(list(rows)).astype(float)
+    vectors.sort_indices()
+    vectors = normalize(vectors, copy=False)
+    first = vectors[[rows[text1] for text1, _ in pairs]]
+    second = vectors[[rows[text2] for _, text2 in pairs]]
+    products = first.multiply(second).tocsr()
+    products.sort_indices()
+    # The matrix-vector product adds up the entries of every row in their (sorted) order
+    cosines = products @ np.ones(products.shape[1])
+    no_tokens = (np.diff(first.indptr) == 0) & (np.diff(second.indptr) == 0)
+    return cosines, no_tokens
+
+def batch_cosine_similarity(pairs):
+    """
+    Calculate the cosine similarity of many (text1, text2) pairs at once.
+
+    Gives the same numbers as calculate_cosine_similarity on every pair, but builds one sparse
+    matrix over all the texts and takes all the cosines with one row-wise product, instead of
+    fitting a vectorizer per pair. Pairs without any word token fall back to character n-grams,
+    like the per-pair vectorizer does on an empty vocabulary.
+
+    Args:
+        pairs: List of (text1, text2) tuples
+
+    Returns:
+        List of cosine similarities, in the order of pairs
+    """
+    similarities = [None] * len(pairs)
+    pending = []
+    for i, (text1, text2) in enumerate(pairs):
+        if text1 == text2:
+            similarities[i] = 1.0
+        elif not text1 or not text2:
+            similarities[i] = 0.0
+        else:
+            pending.append(i)
+    if not pending:
+        return similarities
+
+    fallback = pending
+    try:
+        cosines, no_tokens = _pair_cosines(CountVectorizer(analyzer='word', token_pattern=r'\b\w+\b'),
+                                           [pairs[i] for i in pending])
+        fallback = [i for i, no_words in zip(pending, no_tokens) if no_words]
+        for i, cosine, no_words in zip(pending, cosines, no_tokens):
+            if not no_words:
+                similarities[i] = float(cosine)
+    except ValueError:
+        # None of the texts has a word token
+        pass
+
+    if fallback:
+        cosines, _ = _pair_cosines(CountVectorizer(analyzer='char', ngram_range=(1, 3)),
+                                   [pairs[i] for i in fallback])
+        for i, cosine in zip(fallback, cosines):
+            similarities[i] = float(cosine)
+    return similarities
+
+def average_metrics(metric_values):
+    """Average {metric name: values} per metric, ignoring missing values (None if a metric has none)."""
+    averages = {}
+    for name in METRIC_NAMES:
+        values = [value for value in metric_values[name] if value is not None]
+        averages[name] = sum(values) / len(values) if values else None
+    return averages
+
 def load_benchmark_files(benchmark_dir):
-    """Load benchmark files containing golden completions."""
-    benchmark_data = {}
-    
-    for root, dirs, files in os.walk(benchmark_dir):
-        for file in files:
-            if file.endswith('.jsonl'):
-                # Normalize path separators
-                normalized_root = root.replace('\\', '/')
-                parts = normalized_root.split('/')
-                
-                # Extract language and category
-                language = None
-                category = None
-                
-                # Find language directly from the path
-                benchmark_index = parts.index('benchmark') if 'benchmark' in parts else -1
-                if benchmark_index >= 0 and benchmark_index + 1 < len(parts):
-                    language = parts[benchmark_index + 1]
-                    if benchmark_index + 2 < len(parts):
-                        category = parts[benchmark_index + 2]
-                
-                if not language or not category:
-                    print(f"Could not determine language/category for {root}")
-                    continue
-                
-                file_path = os.path.join(root, file)
-                
-                # Create key based on language and category
-                key = f"{language}/{category}"
-                benchmark_data[key] = {}
-                
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        try:
-                            data = json.loads(line.strip())
-                            # Use id as the key for each test case
-                            test_id = data.get('id')
-                            if test_id:
-                                benchmark_data[key][test_id] = data
-                        except json.JSONDecodeError:
-                            print(f"Error parsing JSON in benchmark file: {file_path}")
-                            continue
-    
-    return benchmark_data
+    """Load benchmark files containing golden completions, keyed by "language/category" and test id."""
+    # Served from the shared cached benchmark index instead of re-parsing every JSONL file
+    return get_benchmark_index(benchmark_dir).by_key()
 
-def load_and_compare_completions(completions_dir, benchmark_dir, debug=False):
-    """Load and compare model completions with golden completions."""
+def load_and_compare_completions(completions_dir, benchmark_dir, debug=False, workers=None,
+                                 metrics_cache_path=METRICS_CACHE_PATH):
+    """
+    Load and compare model completions with golden completions.
+
+    Besides the line0 exact match and cosine similarity, every full completion is scored with
+    the metrics of completion_metrics (edit similarity, BLEU, identifier overlap, AST match),
+    in worker processes and cached in metrics_cache_path (None disables the cache).
+    """
     # Load all benchmark files first
     benchmark_data = load_benchmark_files(benchmark_dir)
     
@@ -142,17 +198,23 @@ def load_and_compare_completions(completions_dir, benchmark_dir, debug=False):
         'line0_exact_matches': 0,
         'cosine_similarities': [],
         'avg_cosine': 0,
+        'metrics': {name: [] for name in METRIC_NAMES},
+        'avg_metrics': {},
         'categories': defaultdict(lambda: {
             'total': 0,
             'line0_exact_matches': 0,
             'cosine_similarities': [],
             'avg_cosine': 0,
+            'metrics': {name: [] for name in METRIC_NAMES},
+            'avg_metrics': {},
         }),
         'languages': defaultdict(lambda: {
             'total': 0,
             'line0_exact_matches': 0,
             'cosine_similarities': [],
             'avg_cosine': 0,
+            'metrics': {name: [] for name in METRIC_NAMES},
+            'avg_metrics': {},
         })
     })
     
@@ -160,11 +222,18 @@ def load_and_compare_completions(completions_dir, benchmark_dir, debug=False):
     if debug:
         test_cases = defaultdict(list)
     
+    # The (model line0, golden line0) pairs of all completions, whose cosine similarities are
+    # calculated in one batch once every file is read, the (full completion, golden, language)
+    # pairs scored with the other metrics, and the test case results waiting for them
+    line0_pairs = []
+    metric_pairs = []
+    pending_results = []
+    
     # Walk through the completions directory structure
     for root, dirs, files in os.walk(completions_dir):
         for file in files:
-            # Only process jsonl files, skip formatted files
-            if file.endswith('.jsonl') and not file.endswith('_formatted.jsonl'):
+            # Only process jsonl files (plain or compressed), skip formatted files
+            if is_jsonl_file(file):
                 
                 file_path = os.path.join(root, file)
                 
@@ -202,157 +271,203 @@ def load_and_compare_completions(completions_dir, benchmark_dir, debug=False):
                 
                 print(f"Processing {file_path}")
                 
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        try:
-                            data = json.loads(line.strip())
-                            test_id = data.get('id')
+                for data in read_completion_rows(file_path, include_benchmark=False):
+                    test_id = data.get('id')
+                    
+                    if not test_id or test_id not in benchmark_data[benchmark_key]:
+                        print(f"Test ID {test_id} not found in benchmark data for {benchmark_key}")
+                        continue
+                    
+                    # Get golden completion from benchmark data
+                    golden_completion = benchmark_data[benchmark_key][test_id].get('golden_completion', '')
+                    
+                    # Process each model in the data
+                    models_processed = set()
+                    
+                    for field_name, field_value in data.items():
+                        # Skip non-model fields
+                        if field_name in ['id', 'testsource', 'language', 'prefix', 'suffix', 
+                                         'golden_completion', 'LLM_justification', 'assertions']:
+                            continue
+                        # Skip per-sample metadata recorded by the generator (seeds, streaming timings)
+                        if field_name.endswith(('_seeds', '_timings')):
+                            continue
+                        
+                        # Extract model name from field name
+                        # Handle both single and multiple completion formats
+                        model_name = None
+                        
+                        if field_name.endswith('_completions'):
+                            # Array of completions format - prioritize this
+                            model_name = field_name[:-12]  # Remove '_completions'
+                        elif field_name.endswith('_completion_0'):
+                            # Individual completion format - only process if array format not already processed
+                            potential_model_name = field_name[:-13]  # Remove '_completion_0'
+                            if potential_model_name not in models_processed:
+                                model_name = potential_model_name
+                        elif '_completion_' in field_name:
+                            # Skip other numbered completions - they'll be handled with _completion_0 or _completions
+                            continue
+                        elif '_completions' not in str(data.keys()) and '_completion_' not in str(data.keys()):
+                            # Single completion format (original) - only use if no multi-completion fields exist
+                            if field_name not in models_processed:
+                                model_name = field_name
+                        
+                        # Skip if no valid model name or already processed
+                        if not model_name or model_name in models_processed:
+                            continue
+                        
+                        # Mark this model as processed
+                        models_processed.add(model_name)
+                        
+                        # Collect all completions for this model
+                        completions = []
+                        
+                        # Check for array of completions
+                        if f'{model_name}_completions' in data and isinstance(data[f'{model_name}_completions'], list):
+                            completions = data[f'{model_name}_completions']
+                        # Check for individual numbered completions
+                        elif f'{model_name}_completion_0' in data:
+                            i = 0
+                            while f'{model_name}_completion_{i}' in data:
+                                completions.append(data[f'{model_name}_completion_{i}'])
+                                i += 1
+                        # Single completion (original format)
+                        elif model_name in data:
+                            completions = [data[model_name]]
+                        
+                        # Skip if no completions found
+                        if not completions:
+                            continue
+                        
+                        # Update total count (once per test case, not per completion)
+                        results[model_name]['total'] += 1
+                        results[model_name]['categories'][category]['total'] += 1
+                        results[model_name]['languages'][language]['total'] += 1
+                        
+                        # Process each completion and collect metrics
+                        # (the index of its line0 pair, or None for a similarity of 0.0)
+                        completion_pair_indices = []
+                        completion_metric_indices = []
+                        any_line0_match = False
+                        
+                        for model_completion in completions:
+                            # The full completion is scored with the other metrics, empty or not
+                            completion_metric_indices.append(len(metric_pairs))
+                            metric_pairs.append((remove_special_chars_fn(model_completion), golden_completion, language))
                             
-                            if not test_id or test_id not in benchmark_data[benchmark_key]:
-                                print(f"Test ID {test_id} not found in benchmark data for {benchmark_key}")
+                            # For empty completions, add 0.0 to similarity
+                            if not model_completion:
+                                completion_pair_indices.append(None)
                                 continue
                             
-                            # Get golden completion from benchmark data
-                            golden_completion = benchmark_data[benchmark_key][test_id].get('golden_completion', '')
+                            # Line0 comparison
+                            model_line0 = model_completion.strip().split('\n')[0].strip()
+                            golden_line0 = golden_completion.strip().split('\n')[0].strip()
                             
-                            # Process each model in the data
-                            models_processed = set()
+                            # Check for line0 exact match
+                            if model_line0 == golden_line0:
+                                any_line0_match = True
                             
-                            for field_name, field_value in data.items():
-                                # Skip non-model fields
-                                if field_name in ['id', 'testsource', 'language', 'prefix', 'suffix', 
-                                                 'golden_completion', 'LLM_justification', 'assertions']:
-                                    continue
-                                
-                                # Extract model name from field name
-                                # Handle both single and multiple completion formats
-                                model_name = None
-                                
-                                if field_name.endswith('_completions'):
-                                    # Array of completions format - prioritize this
-                                    model_name = field_name[:-12]  # Remove '_completions'
-                                elif field_name.endswith('_completion_0'):
-                                    # Individual completion format - only process if array format not already processed
-                                    potential_model_name = field_name[:-13]  # Remove '_completion_0'
-                                    if potential_model_name not in models_processed:
-                                        model_name = potential_model_name
-                                elif '_completion_' in field_name:
-                                    # Skip other numbered completions - they'll be handled with _completion_0 or _completions
-                                    continue
-                                elif '_completions' not in str(data.keys()) and '_completion_' not in str(data.keys()):
-                                    # Single completion format (original) - only use if no multi-completion fields exist
-                                    if field_name not in models_processed:
-                                        model_name = field_name
-                                
-                                # Skip if no valid model name or already processed
-                                if not model_name or model_name in models_processed:
-                                    continue
-                                
-                                # Mark this model as processed
-                                models_processed.add(model_name)
-                                
-                                # Collect all completions for this model
-                                completions = []
-                                
-                                # Check for array of completions
-                                if f'{model_name}_completions' in data and isinstance(data[f'{model_name}_completions'], list):
-                                    completions = data[f'{model_name}_completions']
-                                # Check for individual numbered completions
-                                elif f'{model_name}_completion_0' in data:
-                                    i = 0
-                                    while f'{model_name}_completion_{i}' in data:
-                                        completions.append(data[f'{model_name}_completion_{i}'])
-                                        i += 1
-                                # Single completion (original format)
-                                elif model_name in data:
-                                    completions = [data[model_name]]
-                                
-                                # Skip if no completions found
-                                if not completions:
-                                    continue
-                                
-                                # Update total count (once per test case, not per completion)
-                                results[model_name]['total'] += 1
-                                results[model_name]['categories'][category]['total'] += 1
-                                results[model_name]['languages'][language]['total'] += 1
-                                
-                                # Process each completion and collect metrics
-                                completion_cosine_sims = []
-                                any_line0_match = False
-                                
-                                for model_completion in completions:
-                                    # For empty completions, add 0.0 to similarity
-                                    if not model_completion:
-                                        completion_cosine_sims.append(0.0)
-                                        continue
-                                    
-                                    # Line0 comparison
-                                    model_line0 = model_completion.strip().split('\n')[0].strip()
-                                    golden_line0 = golden_completion.strip().split('\n')[0].strip()
-                                    
-                                    # Check for line0 exact match
-                                    if model_line0 == golden_line0:
-                                        any_line0_match = True
-                                    
-                                    # Calculate cosine similarity for first line
-                                    cosine_sim = calculate_cosine_similarity(model_line0, golden_line0)
-                                    completion_cosine_sims.append(cosine_sim)
-                                
-                                # For line0 exact match: count if ANY completion matches
-                                if any_line0_match:
-                                    results[model_name]['line0_exact_matches'] += 1
-                                    results[model_name]['categories'][category]['line0_exact_matches'] += 1
-                                    results[model_name]['languages'][language]['line0_exact_matches'] += 1
-                                
-                                # For cosine similarity: use average of all completions
-                                if completion_cosine_sims:
-                                    avg_cosine_sim = sum(completion_cosine_sims) / len(completion_cosine_sims)
-                                else:
-                                    avg_cosine_sim = 0.0
-                                
-                                results[model_name]['cosine_similarities'].append(avg_cosine_sim)
-                                results[model_name]['categories'][category]['cosine_similarities'].append(avg_cosine_sim)
-                                results[model_name]['languages'][language]['cosine_similarities'].append(avg_cosine_sim)
-                                
-                                # Store detailed test case info for debug mode
-                                if debug:
-                                    prompt = benchmark_data[benchmark_key][test_id].get('prompt', '')
-                                    # For debug, store all completions with their individual similarities
-                                    test_cases[model_name].append({
-                                        'test_id': test_id,
-                                        'language': language,
-                                        'category': category,
-                                        'prompt': prompt,
-                                        'golden_completion': golden_completion,
-                                        'model_completions': completions,
-                                        'individual_cosine_similarities': completion_cosine_sims,
-                                        'avg_cosine_similarity': avg_cosine_sim
-                                    })
-                            
-                        except json.JSONDecodeError:
-                            print(f"Error parsing JSON in file: {file_path}")
-                            continue
+                            # Cosine similarity of the first line, calculated with all others below
+                            completion_pair_indices.append(len(line0_pairs))
+                            line0_pairs.append((model_line0, golden_line0))
+                        
+                        # For line0 exact match: count if ANY completion matches
+                        if any_line0_match:
+                            results[model_name]['line0_exact_matches'] += 1
+                            results[model_name]['categories'][category]['line0_exact_matches'] += 1
+                            results[model_name]['languages'][language]['line0_exact_matches'] += 1
+                        
+                        # Store detailed test case info for debug mode
+                        test_case = None
+                        if debug:
+                            prompt = benchmark_data[benchmark_key][test_id].get('prompt', '')
+                            # For debug, store all completions with their individual similarities
+                            test_case = {
+                                'test_id': test_id,
+                                'language': language,
+                                'category': category,
+                                'prompt': prompt,
+                                'golden_completion': golden_completion,
+                                'model_completions': completions,
+                            }
+                        
+                        pending_results.append((model_name, category, language, completion_pair_indices,
+                                                completion_metric_indices, test_case))
+    
+    # Calculate the cosine similarities of all first lines at once
+    print(f"Calculating cosine similarities of {len(line0_pairs)} completion first lines")
+    line0_similarities = batch_cosine_similarity(line0_pairs)
+    
+    # Score all full completions with the other metrics
+    metrics_cache = MetricsCache(metrics_cache_path) if metrics_cache_path else None
+    try:
+        completion_metrics = compute_metrics(metric_pairs, workers=workers, cache=metrics_cache)
+    finally:
+        if metrics_cache is not None:
+            metrics_cache.close()
+    
+    for model_name, category, language, completion_pair_indices, completion_metric_indices, test_case in pending_results:
+        completion_cosine_sims = [0.0 if pair_index is None else line0_similarities[pair_index]
+                                  for pair_index in completion_pair_indices]
+        
+        # For cosine similarity: use average of all completions
+        if completion_cosine_sims:
+            avg_cosine_sim = sum(completion_cosine_sims) / len(completion_cosine_sims)
+        else:
+            avg_cosine_sim = 0.0
+        
+        results[model_name]['cosine_similarities'].append(avg_cosine_sim)
+        results[model_name]['categories'][category]['cosine_similarities'].append(avg_cosine_sim)
+        results[model_name]['languages'][language]['cosine_similarities'].append(avg_cosine_sim)
+        
+        # Other metrics: average of all completions of the test case
+        case_metrics = average_metrics({name: [completion_metrics[metric_index][name]
+                                               for metric_index in completion_metric_indices]
+                                        for name in METRIC_NAMES})
+        for name, value in case_metrics.items():
+            if value is not None:
+                results[model_name]['metrics'][name].append(value)
+                results[model_name]['categories'][category]['metrics'][name].append(value)
+                results[model_name]['languages'][language]['metrics'][name].append(value)
+        
+        if test_case is not None:
+            test_case['individual_cosine_similarities'] = completion_cosine_sims
+            test_case['avg_cosine_similarity'] = avg_cosine_sim
+            test_case['avg_metrics'] = case_metrics
+            test_cases[model_name].append(test_case)
     
     # Calculate average metrics for each model
     for model_name in results:
         # Overall averages
         cosine_sims = results[model_name]['cosine_similarities']
         results[model_name]['avg_cosine'] = sum(cosine_sims) / len(cosine_sims) if cosine_sims else 0
+        results[model_name]['avg_metrics'] = average_metrics(results[model_name]['metrics'])
         
         # Category averages
         for category in results[model_name]['categories']:
             cat_cosine_sims = results[model_name]['categories'][category]['cosine_similarities']
             results[model_name]['categories'][category]['avg_cosine'] = sum(cat_cosine_sims) / len(cat_cosine_sims) if cat_cosine_sims else 0
+            results[model_name]['categories'][category]['avg_metrics'] = average_metrics(results[model_name]['categories'][category]['metrics'])
         
         # Language averages
         for language in results[model_name]['languages']:
             lang_cosine_sims = results[model_name]['languages'][language]['cosine_similarities']
             results[model_name]['languages'][language]['avg_cosine'] = sum(lang_cosine_sims) / len(lang_cosine_sims) if lang_cosine_sims else 0
+            results[model_name]['languages'][language]['avg_metrics'] = average_metrics(results[model_name]['languages'][language]['metrics'])
     
     if debug:
         return results, test_cases
     return results
 
+def format_metric_averages(data):
+    """Return the avg_<metric> fields of a results level, rounded like avg_cosine (None if not computed)."""
+    return {
+        f"avg_{name}": round(value, 2) if value is not None else None
+        for name, value in data['avg_metrics'].items()
+    }
+
 def format_results(results):
     """Format results into a JSON-friendly dictionary with computed statistics."""
     formatted_results = {}
@@ -373,7 +488,8 @@ def format_results(results):
                 "total_comparisons": model_data['total'],
                 "line0_exact_matches": model_data['line0_exact_matches'],
                 "line0_exact_match_rate": round((model_data['line0_exact_matches'] / model_data['total'] * 100) if model_data['total'] > 0 else 0, 2),
-                "avg_cosine": round(model_data['avg_cosine'], 2)
+                "avg_cosine": round(model_data['avg_cosine'], 2),
+                **format_metric_averages(model_data)
             },
             "categories": {},
             "languages": {}
@@ -386,7 +502,8 @@ def format_results(results):
                     "total_comparisons": category_data['total'],
                     "line0_exact_matches": category_data['line0_exact_matches'],
                     "line0_exact_match_rate": round((category_data['line0_exact_matches'] / category_data['total'] * 100) if category_data['total'] > 0 else 0, 2),
-                    "avg_cosine": round(category_data['avg_cosine'], 2)
+                    "avg_cosine": round(category_data['avg_cosine'], 2),
+                    **format_metric_averages(category_data)
                 }
         
         # Format language data with the new metric
@@ -396,7 +513,8 @@ def format_results(results):
                     "total_comparisons": language_data['total'],
                     "line0_exact_matches": language_data['line0_exact_matches'],
                     "line0_exact_match_rate": round((language_data['line0_exact_matches'] / language_data['total'] * 100) if language_data['total'] > 0 else 0, 2),
-                    "avg_cosine": round(language_data['avg_cosine'], 2)
+                    "avg_cosine": round(language_data['avg_cosine'], 2),
+                    **format_metric_averages(language_data)
                 }
     
     return formatted_results
@@ -569,11 +687,13 @@ def create_specific_category_comparisons(formatted_results, plots_dir="plots"):
     print("Created specific category comparison plots across languages with consistent formatting")
 
 def run_comparison(benchmark_base="../benchmark", completions_base="../completions", 
-                  results_file="model_benchmark_comparison_results.json", plots_dir="plots", debug=False):
+                  results_file="model_benchmark_comparison_results.json", plots_dir="plots", debug=False,
+                  workers=None, metrics_cache_path=METRICS_CACHE_PATH):
     """Run the comparison pipeline and save results."""
     # Load and compare completions
     if debug:
-        results, test_cases = load_and_compare_completions(completions_base, benchmark_base, debug=True)
+        results, test_cases = load_and_compare_completions(completions_base, benchmark_base, debug=True,
+                                                           workers=workers, metrics_cache_path=metrics_cache_path)
         # Print only cosine similarity for debug mode
         for model_name, cases in test_cases.items():
             print(f"\n## MODEL: {model_name}")
@@ -584,6 +704,9 @@ def run_comparison(benchmark_base="../benchmark", completions_base="../completio
                 print(f"   Language: {case['language']}, Category: {case['category']}")
                 print(f"   Average Cosine Similarity: {case['avg_cosine_similarity']:.4f}")
                 print(f"   Individual Cosine Similarities: {[f'{s:.4f}' for s in case['individual_cosine_similarities']]}")
+                print("   Full completion metrics: " + ", ".join(
+                    f"{name}={value:.4f}" if value is not None else f"{name}=n/a"
+                    for name, value in case['avg_metrics'].items()))
                 print(f"   Prompt: {case['prompt'][:100]}..." if len(case['prompt']) > 100 else f"   Prompt: {case['prompt']}")
                 print(f"   Golden completion: {case['golden_completion'][:100]}..." if len(case['golden_completion']) > 100 else f"   Golden completion: {case['golden_completion']}")
                 # Show first completion as example
@@ -594,7 +717,8 @@ def run_comparison(benchmark_base="../benchmark", completions_base="../completio
         return
     
     # Standard flow (generate plots and JSON)
-    results = load_and_compare_completions(completions_base, benchmark_base)
+    results = load_and_compare_completions(completions_base, benchmark_base, workers=workers,
+                                           metrics_cache_path=metrics_cache_path)
     
     # Format results 
     formatted_results = format_results(results)
@@ -605,7 +729,7 @@ def run_comparison(benchmark_base="../benchmark", completions_base="../completio
         return
     
     # Save results to JSON file
-    with open(results_file, 'w', encoding='utf-8') as f:
+    with open_text(results_file, 'w') as f:
         json.dump(formatted_results, f, indent=2)
     print(f"\nResults have been saved to {results_file}")
     
@@ -625,6 +749,12 @@ if __name__ == "__main__":
                         help='Directory to save visualization plots (default: plots)')
     parser.add_argument('--debug', action='store_true',
                         help='Enable debug mode to print most dissimilar test cases instead of generating plots and JSON')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes computing the full completion metrics (default: CPU count)')
+    parser.add_argument('--metrics_cache', default=METRICS_CACHE_PATH,
+                        help=f'Path to the cache of full completion metrics (default: {METRICS_CACHE_PATH})')
+    parser.add_argument('--no_metrics_cache', action='store_true',
+                        help='Compute every full completion metric again without reading or writing the cache')
     
     args = parser.parse_args()
     
@@ -643,4 +773,5 @@ if __name__ == "__main__":
     else:
         print("Debug mode enabled: printing most dissimilar test cases")
     
-    run_comparison(benchmark_base, completions_base, results_file, plots_dir, debug)
+    metrics_cache_path = None if args.no_metrics_cache else args.metrics_cache
+    run_comparison(benchmark_base, completions_base, results_file, plots_dir, debug, args.workers, metrics_cache_path)
@@ -1,6 +1,8 @@
 import os  
+import sys
 import base64
 import json
+import hashlib
 from openai import AzureOpenAI  
 from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 import dotenv
@@ -9,6 +11,8 @@ import re
 import ast
 import glob
 import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import numpy as np
 from collections import defaultdict
 from pathlib import Path
@@ -17,6 +21,16 @@ import matplotlib
 import seaborn as sns
 from matplotlib.colors import LinearSegmentedColormap
 
+# Make the shared repository-level modules importable when run from this directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bootstrap import bootstrap_ci, paired_bootstrap_ci, stratified_bootstrap_ci
+from completion_store import read_completion_rows
+from judge_index import JudgeScoreIndex
+from jsonl_io import JSONL_EXTENSIONS, dedupe_jsonl_variants, iter_jsonl, strip_jsonl_extension, temporary_path
+from request_scheduler import estimate_tokens, get_scheduler, print_scheduler_stats
+from response_cache import ResponseCache, make_cache_key
+from results_warehouse import ResultsWarehouse
+
 matplotlib.rcParams['font.family'] = 'sans-serif'
 matplotlib.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans', 'Liberation Sans']
 
@@ -27,37 +41,161 @@ O3MINI_ENDPOINT = os.getenv("O3MINI_ENDPOINT", "[ANONYMIZED-ENDPOINT-2]")  # End
 O3MINI_DEPLOYMENT = os.getenv("O3MINI_DEPLOYMENT", "[ANONYMIZED-DEPLOYMENT-3]")  # The deployment name to use in API calls
 O3MINI_API_VERSION = "2025-01-01-preview"
 O3MINI_API_KEY = os.getenv("O3MINI_API_KEY")
+O3MINI_MAX_COMPLETION_TOKENS = 16384
+# Typical reasoning + answer tokens of a judge response, charged to --tokens_per_minute
+O3MINI_EXPECTED_COMPLETION_TOKENS = 2000
+
+# Default number of judge requests in flight
+DEFAULT_MAX_IN_FLIGHT = 8
+
+# Shared o3-mini client, built on first use
+_JUDGE_CLIENT = None
+_JUDGE_CLIENT_LOCK = threading.Lock()
+
+# Times an errored or unparseable judgement is re-queued before its score is recorded as missing
+DEFAULT_SCORE_RETRIES = 2
+
+# Prompts asking the judge to score one completion, or several candidates of one test case at once;
+# bump JUDGE_PROMPT_VERSION when either changes
+JUDGE_PROMPT_VERSION = 1
+SINGLE_MODEL_PROMPT_TEMPLATE = """You are a highly experienced software judge tasked with evaluating the quality of a model-generated code completion. For a given code prefix and suffix, your job is to evaluate a completion based on the criteria below and determine the overall final score (0-10). Assign a score (0-5) for each category. Please solely focus on the completion quality.
 
-def bootstrap_ci(judge_results, n_bootstrap=10000, confidence=0.95):
+    # Evaluation Criteria:
+    1. Relevance to Prefix and Suffix (0-5): Does the code completion connect semantically meaningfully to both the prefix and suffix?
+    2. Helpfulness (0-5): Does the completion provide non-trivial assistance, adding meaningful content that reduces the user's effort in writing code?
+
+    Based on the evaluation, provide your answer following format:
+    Final Sum Score for Completion: <score>
+    Detailed Reasoning:
+    <your reasoning here>
+    
+    # Begin:
+    Prefix: 
+    ```
+    {prefix}
+    ```
+    
+    Model Completion: 
+    ```
+    {completion}
+    ```
+    
+    Suffix: 
+    ```
+    {suffix}
+    ```
     """
-    Calculate bootstrap confidence intervals for the given results.
+
+BATCH_JUDGE_PROMPT_TEMPLATE = """You are a highly experienced software judge tasked with evaluating the quality of model-generated code completions. For a given code prefix and suffix, your job is to evaluate each of the {count} candidate completions below on its own, based on the criteria below, and determine its overall final score (0-10). Assign a score (0-5) for each category. Please solely focus on the completion quality and do not rank the candidates against each other.
+
+    # Evaluation Criteria:
+    1. Relevance to Prefix and Suffix (0-5): Does the code completion connect semantically meaningfully to both the prefix and suffix?
+    2. Helpfulness (0-5): Does the completion provide non-trivial assistance, adding meaningful content that reduces the user's effort in writing code?
+
+    Based on the evaluation, provide your answer following format, with one score line per candidate:
+    Final Sum Score for Completion 1: <score>
+    Final Sum Score for Completion 2: <score>
+    ...
+    Detailed Reasoning:
+    <your reasoning here>
     
-    Args:
-        judge_results: List of score values
-        n_bootstrap: Number of bootstrap samples (default: 10000)
-        confidence: Confidence level (default: 0.95)
-        
-    Returns:
-        Tuple of (lower_ci, upper_ci)
+    # Begin:
+    Prefix: 
+    ```
+    {prefix}
+    ```
+    
+{candidates}
+    Suffix: 
+    ```
+    {suffix}
+    ```
     """
-    N = len(judge_results)
-    bootstrap_means = [
-        np.mean(np.random.choice(judge_results, N, replace=True)) for _ in range(n_bootstrap)
-    ]
-    lower = np.percentile(bootstrap_means, (1 - confidence) / 2 * 100)
-    upper = np.percentile(bootstrap_means, (1 + confidence) / 2 * 100)
-    return lower, upper
+
+BATCH_CANDIDATE_TEMPLATE = """    Model Completion {number}: 
+    ```
+    {completion}
+    ```
+    
+"""
+
+# The same prompts asking for a JSON answer, requested with a structured-output schema
+SINGLE_MODEL_JSON_PROMPT_TEMPLATE = """You are a highly experienced software judge tasked with evaluating the quality of a model-generated code completion. For a given code prefix and suffix, your job is to evaluate a completion based on the criteria below and determine the overall final score (0-10). Assign a score (0-5) for each category. Please solely focus on the completion quality.
+
+    # Evaluation Criteria:
+    1. Relevance to Prefix and Suffix (0-5): Does the code completion connect semantically meaningfully to both the prefix and suffix?
+    2. Helpfulness (0-5): Does the completion provide non-trivial assistance, adding meaningful content that reduces the user's effort in writing code?
+
+    Based on the evaluation, answer with a JSON object with the fields:
+    "relevance": the Relevance score (integer 0-5)
+    "helpfulness": the Helpfulness score (integer 0-5)
+    "total": the final sum score, relevance + helpfulness (integer 0-10)
+    "reasoning": your detailed reasoning
+    
+    # Begin:
+    Prefix: 
+    ```
+    {prefix}
+    ```
+    
+    Model Completion: 
+    ```
+    {completion}
+    ```
+    
+    Suffix: 
+    ```
+    {suffix}
+    ```
+    """
+
+BATCH_JUDGE_JSON_PROMPT_TEMPLATE = """You are a highly experienced software judge tasked with evaluating the quality of model-generated code completions. For a given code prefix and suffix, your job is to evaluate each of the {count} candidate completions below on its own, based on the criteria below, and determine its overall final score (0-10). Assign a score (0-5) for each category. Please solely focus on the completion quality and do not rank the candidates against each other.
+
+    # Evaluation Criteria:
+    1. Relevance to Prefix and Suffix (0-5): Does the code completion connect semantically meaningfully to both the prefix and suffix?
+    2. Helpfulness (0-5): Does the completion provide non-trivial assistance, adding meaningful content that reduces the user's effort in writing code?
+
+    Based on the evaluation, answer with a JSON object with a "candidates" list holding one object per candidate, with the fields:
+    "candidate": the candidate number (1-{count})
+    "relevance": the Relevance score (integer 0-5)
+    "helpfulness": the Helpfulness score (integer 0-5)
+    "total": the final sum score, relevance + helpfulness (integer 0-10)
+    "reasoning": your detailed reasoning
+    
+    # Begin:
+    Prefix: 
+    ```
+    {prefix}
+    ```
+    
+{candidates}
+    Suffix: 
+    ```
+    {suffix}
+    ```
+    """
+
+# Follow-up message sent when a structured judge response does not match the schema
+JUDGE_REASK_PROMPT = "Your answer is not valid: {error}. Reply again with only the JSON object, following the required fields exactly."
+
+# Judge answer formats: JSON with sub-scores (structured output), or the score line read by extract_score
+JUDGE_FORMATS = ('json', 'text')
+DEFAULT_JUDGE_FORMAT = 'json'
+
+# Times an invalid structured response is sent back to the judge to be corrected
+MAX_JUDGE_REASKS = 2
+
+# Sub-scores of a structured judgement and their maximum
+JUDGE_SUB_SCORES = {"relevance": 5, "helpfulness": 5}
+
+# Default number of test cases of a --calibrate run
+DEFAULT_CALIBRATION_ENTRIES = 50
 
 def read_jsonl_file(file_path):
     """Read a JSONL file and return a list of parsed JSON objects."""
-    data = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                line = line.strip()
-                if line:  # Skip empty lines
-                    data.append(json.loads(line))
-        return data
+        # Handles plain, .jsonl.gz and .jsonl.zst files
+        return list(iter_jsonl(file_path))
     except Exception as e:
         print(f"Error reading {file_path}: {str(e)}")
         return []
@@ -93,6 +231,125 @@ def extract_score(response_text):
         print(f"Error extracting score: {str(e)}")
         return None
 
+def extract_batch_scores(response_text, num_candidates):
+    """
+    Extract the per-candidate scores of a batch judge response.
+    
+    Args:
+        response_text: Judge response with one "Final Sum Score for Completion <i>: <score>" line per candidate
+        num_candidates: Number of candidates in the prompt
+        
+    Returns:
+        List of num_candidates scores (None for candidates without a score)
+    """
+    scores = {}
+    pattern = r'Final\s+Sum\s+Score\s+for\s+Completion\s*#?\s*(\d+)\s*(?:\*\*)?\s*:?\s*(?:\*\*)?\s*([0-9]+(?:\.[0-9]+)?)'
+    for number, score in re.findall(pattern, response_text or "", re.IGNORECASE):
+        # The first score of a candidate wins, like in extract_score
+        scores.setdefault(int(number), float(score))
+    extracted = [scores.get(number) for number in range(1, num_candidates + 1)]
+    print(f"Extracted scores: {extracted}")
+    return extracted
+
+class JudgeOutputError(ValueError):
+    """Raised when a structured judge response does not match the judge schema."""
+
+def get_judge_response_format(num_candidates=1):
+    """Return the structured-output response_format of a JSON judge prompt judging num_candidates completions."""
+    judgement = {
+        "type": "object",
+        "properties": {
+            "relevance": {"type": "integer"},
+            "helpfulness": {"type": "integer"},
+            "total": {"type": "integer"},
+            "reasoning": {"type": "string"},
+        },
+        "required": ["relevance", "helpfulness", "total", "reasoning"],
+        "additionalProperties": False,
+    }
+    schema = judgement
+    if num_candidates > 1:
+        candidate = dict(judgement, properties=dict(candidate={"type": "integer"}, **judgement["properties"]),
+                         required=["candidate"] + judgement["required"])
+        schema = {
+            "type": "object",
+            "properties": {"candidates": {"type": "array", "items": candidate}},
+            "required": ["candidates"],
+            "additionalProperties": False,
+        }
+    return {"type": "json_schema", "json_schema": {"name": "judge_scores", "strict": True, "schema": schema}}
+
+def validate_judgement(judgement):
+    """
+    Check one structured judgement against the schema and the score ranges.
+    
+    Returns:
+        Dictionary with the score (the total), the sub-scores and the reasoning
+    
+    Raises:
+        JudgeOutputError: If a field is missing, out of range, or the total is not the sum of the sub-scores
+    """
+    if not isinstance(judgement, dict):
+        raise JudgeOutputError(f"expected a JSON object, got {type(judgement).__name__}")
+    result = {}
+    for field, maximum in list(JUDGE_SUB_SCORES.items()) + [("total", sum(JUDGE_SUB_SCORES.values()))]:
+        value = judgement.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise JudgeOutputError(f'"{field}" must be a number')
+        if not 0 <= value <= maximum:
+            raise JudgeOutputError(f'"{field}" must be between 0 and {maximum}, got {value}')
+        result[field] = float(value)
+    if abs(result["total"] - sum(result[field] for field in JUDGE_SUB_SCORES)) > 1e-6:
+        raise JudgeOutputError(f'"total" ({result["total"]:g}) must be the sum of {" + ".join(JUDGE_SUB_SCORES)}')
+    if not isinstance(judgement.get("reasoning"), str):
+        raise JudgeOutputError('"reasoning" must be a string')
+    return {
+        "score": result.pop("total"),
+        **result,
+        "reasoning": judgement["reasoning"],
+    }
+
+def parse_judge_json(response_text, num_candidates=1):
+    """
+    Parse and validate a structured judge response.
+    
+    Args:
+        response_text: JSON answer of the judge (a surrounding markdown fence is tolerated)
+        num_candidates: Number of completions judged by the prompt
+        
+    Returns:
+        List of num_candidates validated judgements (see validate_judgement), in candidate order
+        
+    Raises:
+        JudgeOutputError: If the response is not valid JSON or does not match the schema
+    """
+    text = (response_text or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise JudgeOutputError(f"not valid JSON ({e})")
+    
+    if num_candidates == 1:
+        return [validate_judgement(data)]
+    
+    candidates = data.get("candidates") if isinstance(data, dict) else None
+    if not isinstance(candidates, list):
+        raise JudgeOutputError('expected a "candidates" list')
+    judgements = {}
+    for candidate in candidates:
+        number = candidate.get("candidate") if isinstance(candidate, dict) else None
+        if not isinstance(number, int) or not 1 <= number <= num_candidates:
+            raise JudgeOutputError(f'"candidate" must be a number from 1 to {num_candidates}')
+        if number in judgements:
+            raise JudgeOutputError(f"candidate {number} is judged twice")
+        judgements[number] = validate_judgement(candidate)
+    missing = [number for number in range(1, num_candidates + 1) if number not in judgements]
+    if missing:
+        raise JudgeOutputError(f"missing candidate(s) {', '.join(map(str, missing))}")
+    return [judgements[number] for number in range(1, num_candidates + 1)]
+
 def find_all_models(completions_dir: str) -> List[str]:
     """
     Find all available models in the completions directory.
@@ -107,7 +364,8 @@ def find_all_models(completions_dir: str) -> List[str]:
     models = set()
     
     # Find all JSONL files in the completions directory
-    all_files = glob.glob(f"{completions_dir}/**/*.jsonl", recursive=True)
+    all_files = [path for extension in JSONL_EXTENSIONS
+                 for path in glob.glob(f"{completions_dir}/**/*{extension}", recursive=True)]
     
     # Extract model names from filenames
     for file_path in all_files:
@@ -116,7 +374,7 @@ def find_all_models(completions_dir: str) -> List[str]:
             continue
             
         # Extract the model name part (after the dash, before .jsonl)
-        model_part = os.path.basename(file_path).split("-", 1)[1].replace(".jsonl", "")
+        model_part = strip_jsonl_extension(os.path.basename(file_path).split("-", 1)[1])
         
         # Skip formatted files
         if "_formatted" in model_part:
@@ -130,7 +388,8 @@ def find_all_models(completions_dir: str) -> List[str]:
     
     return list(models)
 
-def display_score_summary(results_dir: str, generate_plot=False, generate_heatmap=False, language_filter=None):
+def display_score_summary(results_dir: str, generate_plot=False, generate_heatmap=False, language_filter=None, compare=None,
+                          judge_stats=None):
     """
     Display a summary of single model evaluation scores
     
@@ -139,6 +398,8 @@ def display_score_summary(results_dir: str, generate_plot=False, generate_heatma
         generate_plot: Whether to generate a comparison plot
         generate_heatmap: Whether to generate language-category heatmaps
         language_filter: Optional list of languages that were filtered for
+        compare: Optional (model A, model B) pair to compare with a paired bootstrap
+        judge_stats: Judge deduplication statistics of the run, added to the summary file
     """
     print("\n\n" + "="*80)
     print("EVALUATION SUMMARY")
@@ -148,7 +409,7 @@ def display_score_summary(results_dir: str, generate_plot=False, generate_heatma
         print(f"\nNote: Results filtered for languages: {', '.join(language_filter)}")
     
     # Call generate_single_model_summary to create the summary
-    summary = generate_single_model_summary(results_dir)
+    summary = generate_single_model_summary(results_dir, judge_stats=judge_stats)
     
     # Display single model evaluation scores
     if summary:
@@ -179,6 +440,8 @@ def display_score_summary(results_dir: str, generate_plot=False, generate_heatma
             score_str += ci_str
                 
             print(f"OVERALL: Score: {score_str} (across {overall.get('categories_count')} categories, {overall.get('sample_count')} samples)")
+            if overall.get('sub_scores'):
+                print(f"Sub-scores: {format_sub_scores(overall['sub_scores'])}")
             
             # Display language breakdowns if available
             if 'languages' in model_data:
@@ -216,7 +479,9 @@ def display_score_summary(results_dir: str, generate_plot=False, generate_heatma
                 if 'completions_per_test' in scores and scores['completions_per_test'] > 1:
                     completions_info = f", {scores['completions_per_test']:.1f} completions/test"
                     
-                print(f"  {category}: {cat_score_str}, Evaluations: {scores['evaluations']}{completions_info}")
+                sub_scores_info = f", {format_sub_scores(scores['sub_scores'])}" if scores.get('sub_scores') else ""
+                    
+                print(f"  {category}: {cat_score_str}, Evaluations: {scores['evaluations']}{completions_info}{sub_scores_info}")
                 
             print(f"\nDetailed results available in: {results_dir}/{model_name}_detailed_results/")
             
@@ -237,11 +502,304 @@ def display_score_summary(results_dir: str, generate_plot=False, generate_heatma
                 summary,
                 results_dir
             )
+        
+        if compare:
+            compare_models(results_dir, compare[0], compare[1])
             
     else:
         print("No evaluation results found.")
 
-def evaluate_single_completion(model_file, output_file, model_name, max_evaluations=None, current_evaluations=0, max_file_evaluations=None):
+def format_sub_scores(sub_scores):
+    """Format mean sub-scores as "relevance 4.10/5, helpfulness 3.20/5"."""
+    return ", ".join(f"{field} {sub_scores[field]:.2f}/{maximum}"
+                     for field, maximum in JUDGE_SUB_SCORES.items() if field in sub_scores)
+
+def compare_models(results_dir: str, model_a: str, model_b: str, confidence=0.95):
+    """
+    Compare the judge scores of two models on the test cases both were scored on.
+    
+    The difference is tested with a paired bootstrap over the shared test cases, which is much
+    tighter than comparing the two models' separate confidence intervals.
+    
+    Args:
+        results_dir: Directory containing the <model>_detailed_results written by the summary
+        model_a: First model name
+        model_b: Second model name
+        confidence: Confidence level of the interval
+        
+    Returns:
+        Dictionary with the paired bootstrap result (see bootstrap.paired_bootstrap_ci)
+    """
+    scores = []
+    for model_name in (model_a, model_b):
+        outputs = read_jsonl_file(os.path.join(results_dir, f"{model_name}_detailed_results", "outputs.jsonl"))
+        scores.append({(entry['language'], entry['category'], entry['id']): entry['score'] for entry in outputs})
+    
+    comparison = paired_bootstrap_ci(scores[0], scores[1], confidence=confidence)
+    print(f"\nPAIRED COMPARISON: {model_a} vs {model_b}")
+    print("="*50)
+    if comparison['pairs'] == 0:
+        print("No test cases were scored for both models.")
+        return comparison
+    print(f"Mean score difference ({model_a} - {model_b}): {comparison['difference']:+.2f} "
+          f"({int(confidence*100)}% CI: {comparison['lower_ci']:+.2f} to {comparison['upper_ci']:+.2f}), "
+          f"p={comparison['p_value']:.4f}, {comparison['pairs']} paired test cases")
+    return comparison
+
+def get_entry_completions(entry, model_name):
+    """
+    Return the completions of a model in a completion row.
+
+    Handles the array (<model>_completions), numbered (<model>_completion_i) and
+    single (<model>) formats, in that order of preference.
+
+    Returns:
+        List of completions, or None if the row has none for the model
+    """
+    if f"{model_name}_completions" in entry and isinstance(entry[f"{model_name}_completions"], list):
+        return entry[f"{model_name}_completions"]
+    if f"{model_name}_completion_0" in entry:
+        completions = []
+        i = 0
+        while f"{model_name}_completion_{i}" in entry:
+            completions.append(entry[f"{model_name}_completion_{i}"])
+            i += 1
+        return completions
+    if model_name in entry:
+        return [entry[model_name]]
+    return None
+
+def get_judge_client():
+    """Return the shared o3-mini client, building it on first use."""
+    global _JUDGE_CLIENT
+    with _JUDGE_CLIENT_LOCK:
+        if _JUDGE_CLIENT is None:
+            # Retries are handled by the request scheduler
+            _JUDGE_CLIENT = AzureOpenAI(
+                api_version=O3MINI_API_VERSION,
+                azure_endpoint=O3MINI_ENDPOINT,
+                api_key=O3MINI_API_KEY,
+                max_retries=0,
+            )
+        return _JUDGE_CLIENT
+
+def get_judge_scheduler(max_in_flight=DEFAULT_MAX_IN_FLIGHT, requests_per_minute=None, tokens_per_minute=None, max_retries=6):
+    """Return the shared request scheduler of the o3-mini deployment (the limits apply when it is created)."""
+    return get_scheduler(
+        O3MINI_DEPLOYMENT,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        max_concurrency=max(1, max_in_flight),
+        max_retries=max_retries,
+    )
+
+def get_judge_cache_key(messages, response_format=None):
+    """Return the response cache key of a judge prompt."""
+    extra = {"response_format": response_format} if response_format else {}
+    return make_cache_key(O3MINI_ENDPOINT, O3MINI_DEPLOYMENT, messages,
+                          max_tokens=O3MINI_MAX_COMPLETION_TOKENS, sample=0, **extra)
+
+def request_judgement(messages, scheduler, response_cache=None, response_format=None):
+    """
+    Send a judge prompt to o3-mini through the request scheduler.
+
+    Identical prompts are answered from the response cache. The scheduler limits the
+    requests in flight and retries throttled or transiently failing requests with backoff.
+
+    Args:
+        messages: Chat messages of the judge prompt
+        scheduler: RequestScheduler of the o3-mini deployment
+        response_cache: Optional ResponseCache
+        response_format: Optional structured-output response_format (see get_judge_response_format)
+
+    Returns:
+        Tuple of (response text, whether it came from the cache)
+    """
+    # Reuse the judge response of an identical prompt when it is cached
+    response_content = response_cache.get(get_judge_cache_key(messages, response_format), "o3-mini") if response_cache else None
+    if response_content is not None:
+        return response_content, True
+
+    client = get_judge_client()
+    extra = {"response_format": response_format} if response_format else {}
+    completion = scheduler.call(lambda: client.chat.completions.create(
+        max_completion_tokens=O3MINI_MAX_COMPLETION_TOKENS,
+        model=O3MINI_DEPLOYMENT,
+        messages=messages,
+        stream=False,
+        **extra
+    ), estimated_tokens=estimate_tokens(messages, O3MINI_EXPECTED_COMPLETION_TOKENS))
+    return completion.choices[0].message.content, False
+
+def judge_prompt(messages, scheduler, response_cache=None, num_candidates=1, judge_format=DEFAULT_JUDGE_FORMAT):
+    """
+    Request a judgement and extract its scores.
+
+    JSON judgements are requested with a structured-output schema and validated; an invalid
+    answer is sent back to the judge with the validation error, up to MAX_JUDGE_REASKS times.
+    Only responses with a score for every candidate are cached, the others are asked again.
+
+    Args:
+        messages: Chat messages of the judge prompt (see build_judge_prompt)
+        scheduler: RequestScheduler of the o3-mini deployment
+        response_cache: Optional ResponseCache
+        num_candidates: Number of completions judged by the prompt
+        judge_format: 'json' or 'text', the answer format the prompt asks for
+
+    Returns:
+        Tuple of (response text, list of num_candidates scores, list of num_candidates
+        sub-score dictionaries), with None where no score was found
+    """
+    if judge_format == 'text':
+        response_content, from_cache = request_judgement(messages, scheduler, response_cache)
+        if num_candidates == 1:
+            scores = [extract_score(response_content)]
+        else:
+            scores = extract_batch_scores(response_content, num_candidates)
+        if all(score is not None for score in scores) and response_cache and not from_cache:
+            response_cache.put(get_judge_cache_key(messages), response_content, "o3-mini")
+        return response_content, scores, [None] * num_candidates
+
+    response_format = get_judge_response_format(num_candidates)
+    response_content, from_cache = request_judgement(messages, scheduler, response_cache, response_format)
+    conversation = list(messages)
+    for reask in range(MAX_JUDGE_REASKS + 1):
+        try:
+            judgements = parse_judge_json(response_content, num_candidates)
+            break
+        except JudgeOutputError as e:
+            if reask == MAX_JUDGE_REASKS:
+                print(f"Invalid judge response after {MAX_JUDGE_REASKS} re-asks: {e}")
+                return response_content, [None] * num_candidates, [None] * num_candidates
+            print(f"Invalid judge response ({e}), asking again")
+            conversation += [{"role": "assistant", "content": response_content},
+                             {"role": "user", "content": JUDGE_REASK_PROMPT.format(error=e)}]
+            response_content, from_cache = request_judgement(conversation, scheduler, None, response_format)
+
+    # The valid answer is cached under the original prompt
+    if response_cache and not from_cache:
+        response_cache.put(get_judge_cache_key(messages, response_format), response_content, "o3-mini")
+    scores = [judgement["score"] for judgement in judgements]
+    sub_scores = [{field: judgement[field] for field in JUDGE_SUB_SCORES} for judgement in judgements]
+    return response_content, scores, sub_scores
+
+def get_judge_dedup_key(prefix, suffix, completion, judge_format=DEFAULT_JUDGE_FORMAT):
+    """Return the key identifying a judge prompt: (prefix, suffix, completion(s), prompt template version and format)."""
+    payload = json.dumps([JUDGE_PROMPT_VERSION, judge_format, prefix, suffix, completion], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def build_judge_prompt(prefix, suffix, completions, judge_format=DEFAULT_JUDGE_FORMAT):
+    """
+    Build the judge prompt of one completion, or the batch prompt of several candidates of a test case.
+
+    The batch prompt states the prefix and suffix once and numbers the candidates.
+
+    Returns:
+        Tuple of (dedup key, chat messages)
+    """
+    single_template, batch_template = ((SINGLE_MODEL_JSON_PROMPT_TEMPLATE, BATCH_JUDGE_JSON_PROMPT_TEMPLATE)
+                                       if judge_format == 'json' else
+                                       (SINGLE_MODEL_PROMPT_TEMPLATE, BATCH_JUDGE_PROMPT_TEMPLATE))
+    if len(completions) == 1:
+        content = single_template.format(prefix=prefix, completion=completions[0], suffix=suffix)
+        return get_judge_dedup_key(prefix, suffix, completions[0], judge_format), [{"role": "user", "content": content}]
+    candidates = "".join(BATCH_CANDIDATE_TEMPLATE.format(number=number, completion=completion)
+                         for number, completion in enumerate(completions, 1))
+    content = batch_template.format(count=len(completions), prefix=prefix, candidates=candidates, suffix=suffix)
+    return get_judge_dedup_key(prefix, suffix, list(completions), judge_format), [{"role": "user", "content": content}]
+
+class JudgeDeduplicator:
+    """
+    Shares one judge request between the identical judge prompts of a run.
+
+    Identical completions of different models, or of the samples of one model, are judged
+    once and the judgement is fanned out to every completion that shares it. A judgement
+    that failed or has no score is requested again by the next completion that needs it.
+    """
+
+    def __init__(self):
+        self.requests = {}
+        self.stats = {'judgements': 0, 'requests': 0, 'tokens_saved': 0}
+        self._lock = threading.Lock()
+
+    def submit(self, dedup_key, messages, submit, judgements=1):
+        """
+        Return the future judging a prompt, sending it with submit() unless it is already judged.
+
+        Args:
+            dedup_key: Key of the prompt (see get_judge_dedup_key)
+            messages: Chat messages of the judge prompt
+            submit: Callable sending the prompt and returning a future of (response, scores)
+            judgements: Number of completions waiting for the prompt's judgement
+
+        Returns:
+            Future of (response text, scores)
+        """
+        with self._lock:
+            self.stats['judgements'] += judgements
+            future = self.requests.get(dedup_key)
+            if future is None or (future.done() and (future.exception() is not None
+                                                     or any(score is None for score in future.result()[1]))):
+                future = submit()
+                self.requests[dedup_key] = future
+                self.stats['requests'] += 1
+            else:
+                self.stats['tokens_saved'] += estimate_tokens(messages, O3MINI_EXPECTED_COMPLETION_TOKENS)
+            return future
+
+    def summary_stats(self):
+        """Return how many judge requests were saved by sharing identical prompts, or None if nothing was judged."""
+        judgements = self.stats['judgements']
+        if not judgements:
+            return None
+        saved = judgements - self.stats['requests']
+        return {
+            'judgements': judgements,
+            'unique_prompts': self.stats['requests'],
+            'requests_saved': saved,
+            'requests_saved_percent': round(saved / judgements * 100, 1),
+            'tokens_saved': self.stats['tokens_saved'],
+        }
+
+    def print_stats(self):
+        """Print how many judge requests were saved by sharing identical prompts."""
+        stats = self.summary_stats()
+        if stats is None:
+            return
+        print("\nJudge Deduplication Statistics:")
+        print("-" * 40)
+        print(f"{stats['judgements']} completion judgements from {stats['unique_prompts']} unique judge prompts: "
+              f"{stats['requests_saved']} requests saved ({stats['requests_saved_percent']:.1f}%), "
+              f"~{stats['tokens_saved']} tokens saved")
+
+def get_journal_path(output_file):
+    """Return the path of the judge journal kept next to an evaluation output file."""
+    return os.path.splitext(output_file)[0] + ".journal.jsonl"
+
+def hash_completion(completion):
+    """Return the SHA-256 hex digest of a completion, used to match journal records to completions."""
+    return hashlib.sha256(str(completion).encode('utf-8')).hexdigest()
+
+def load_judge_journal(journal_path):
+    """
+    Load the judge journal of an interrupted evaluation.
+
+    The journal is append-only, so the last record of each (id, completion index) pair wins.
+    A line torn by a crash is skipped.
+
+    Args:
+        journal_path: Path of the JSONL journal
+
+    Returns:
+        Dictionary mapping (id, completion_index) to the latest journal record
+    """
+    records = {}
+    if os.path.exists(journal_path):
+        for record in iter_jsonl(journal_path):
+            records[(record.get("id"), record.get("completion_index"))] = record
+    return records
+
+def evaluate_single_completion(model_file, output_file, model_name, max_evaluations=None, current_evaluations=0, max_file_evaluations=None, response_cache=None, scheduler=None, score_retries=DEFAULT_SCORE_RETRIES, deduplicator=None, judge_batch_size=1, judge_format=DEFAULT_JUDGE_FORMAT):
     """
     Evaluate a single model's completions using o3 mini.
     
@@ -252,20 +810,29 @@ def evaluate_single_completion(model_file, output_file, model_name, max_evaluati
         max_evaluations: Maximum number of evaluations to run (for debugging)
         current_evaluations: Number of evaluations already processed
         max_file_evaluations: Maximum number of evaluations to run per file
+        response_cache: Optional ResponseCache used to reuse judge responses of identical prompts
+        scheduler: RequestScheduler of the o3-mini deployment (default: get_judge_scheduler())
+        score_retries: Times an errored or unparseable judgement is re-queued
+        deduplicator: JudgeDeduplicator shared by the files of a run, so identical prompts are judged once
+        judge_batch_size: Maximum completions of a test case judged together in one batch prompt
+        judge_format: 'json' to ask for structured judgements with sub-scores, 'text' for a score line
+    
+    Every judgement is appended to a journal next to output_file as soon as it arrives, so an
+    interrupted evaluation resumes with the (id, completion index) pairs that are not scored yet.
     
     Returns:
         Number of evaluations processed in this run
     """
     print(f"Using o3 mini model for evaluation: {O3MINI_DEPLOYMENT}")
+    scheduler = scheduler or get_judge_scheduler()
+    deduplicator = deduplicator or JudgeDeduplicator()
 
-    # Initialize o3-mini client with API key authentication
-    client = AzureOpenAI(  
-        api_version=O3MINI_API_VERSION,
-        azure_endpoint=O3MINI_ENDPOINT,
-        api_key=O3MINI_API_KEY,  
-    )
-
-    model_data = read_jsonl_file(model_file)
+    # Rows carry prefix/suffix for both regular completion files and the normalized store
+    try:
+        model_data = read_completion_rows(model_file)
+    except Exception as e:
+        print(f"Error reading {model_file}: {str(e)}")
+        model_data = []
     
     # Extract language and category from the file path
     # Expected structure: ../completions/{language}/{category}/{filename}
@@ -322,66 +889,102 @@ def evaluate_single_completion(model_file, output_file, model_name, max_evaluati
             print(f"Limiting to {max_file_evaluations} evaluations per file (out of {len(model_data)}) due to max_file_evaluations setting")
             model_data = model_data[:max_file_evaluations]
 
-    # Single model evaluation prompt template
-    single_model_prompt_template = """You are a highly experienced software judge tasked with evaluating the quality of a model-generated code completion. For a given code prefix and suffix, your job is to evaluate a completion based on the criteria below and determine the overall final score (0-10). Assign a score (0-5) for each category. Please solely focus on the completion quality.
-
-    # Evaluation Criteria:
-    1. Relevance to Prefix and Suffix (0-5): Does the code completion connect semantically meaningfully to both the prefix and suffix?
-    2. Helpfulness (0-5): Does the completion provide non-trivial assistance, adding meaningful content that reduces the user's effort in writing code?
-
-    Based on the evaluation, provide your answer following format:
-    Final Sum Score for Completion: <score>
-    Detailed Reasoning:
-    <your reasoning here>
-    
-    # Begin:
-    Prefix: 
-    ```
-    {prefix}
-    ```
-    
-    Model Completion: 
-    ```
-    {completion}
-    ```
-    
-    Suffix: 
-    ```
-    {suffix}
-    ```
-    """
-
     # Store evaluation results
     evaluation_results = []
     processed_count = 0
+    max_attempts = 1 + max(0, score_retries)
+
+    # Judgements of an interrupted run, reused when the completion is unchanged
+    journal_path = get_journal_path(output_file)
+    journal = load_judge_journal(journal_path)
 
     try:
-        for entry in model_data:
+        # Journal records of every completion, by (entry index, completion index)
+        judgements = {}
+        # Judge requests to send: (entry, [(completion, [(key, journal record), ...]), ...])
+        pending = []
+        for entry_index, entry in enumerate(model_data):
+            entry_id = entry.get("id")
+            # Completions still to judge, grouped by text so identical samples share one judgement
+            waiting = {}
+            for comp_idx, model_completion in enumerate(get_entry_completions(entry, model_name) or []):
+                completion_hash = hash_completion(model_completion)
+                record = journal.get((entry_id, comp_idx))
+                if record is None or record.get("completion_hash") != completion_hash:
+                    record = {"id": entry_id, "completion_index": comp_idx, "completion_hash": completion_hash,
+                              "score": None, "sub_scores": None, "response": None, "attempts": 0}
+                if record["score"] is not None or record["attempts"] >= max_attempts:
+                    judgements[(entry_index, comp_idx)] = record
+                    continue
+                waiting.setdefault(completion_hash, (model_completion, []))[1].append(((entry_index, comp_idx), record))
+            candidates = list(waiting.values())
+            for start in range(0, len(candidates), max(1, judge_batch_size)):
+                pending.append((entry, candidates[start:start + max(1, judge_batch_size)]))
+
+        if journal:
+            to_go = sum(len(waiters) for _, candidates in pending for _, waiters in candidates)
+            print(f"Resuming from {journal_path}: {len(judgements)} completion(s) already judged, {to_go} to go")
+
+        # Send the pending judge prompts concurrently and journal each judgement as it arrives;
+        # the results are collected in file order below
+        with open(journal_path, 'a', encoding='utf-8') as journal_file, \
+                ThreadPoolExecutor(max_workers=scheduler.concurrency.max_limit) as executor:
+            # Completions waiting for each judge request (identical prompts share one request)
+            in_flight = defaultdict(list)
+
+            def submit(item):
+                entry, candidates = item
+                completions = [completion for completion, _ in candidates]
+                dedup_key, messages = build_judge_prompt(entry.get("prefix", ""), entry.get("suffix", ""), completions,
+                                                         judge_format)
+                future = deduplicator.submit(dedup_key, messages, lambda: executor.submit(
+                    judge_prompt, messages, scheduler, response_cache, len(completions), judge_format),
+                    judgements=sum(len(waiters) for _, waiters in candidates))
+                in_flight[future].append(item)
+
+            for item in pending:
+                submit(item)
+
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    for entry, candidates in in_flight.pop(future):
+                        try:
+                            response_content, scores, sub_scores = future.result()
+                        except Exception as e:
+                            response_content, scores, sub_scores = f"Error: {str(e)}", [None] * len(candidates), [None] * len(candidates)
+
+                        # Candidates without a score are re-queued together
+                        retry = []
+                        for (completion, waiters), score, sub_score in zip(candidates, scores, sub_scores):
+                            retry_waiters = []
+                            for key, record in waiters:
+                                record = dict(record, score=score, sub_scores=sub_score, response=response_content,
+                                              attempts=record["attempts"] + 1)
+                                journal_file.write(json.dumps(record) + "\n")
+                                if score is None and record["attempts"] < max_attempts:
+                                    retry_waiters.append((key, record))
+                                else:
+                                    judgements[key] = record
+                            if retry_waiters:
+                                retry.append((completion, retry_waiters))
+                        journal_file.flush()
+
+                        if retry:
+                            attempt = max(record["attempts"] for _, waiters in retry for _, record in waiters) + 1
+                            print(f"  Re-queueing {len(retry)} completion(s) of ID {entry.get('id')} "
+                                  f"(attempt {attempt}/{max_attempts})")
+                            submit((entry, retry))
+
+        for entry_index, entry in enumerate(model_data):
             entry_id = entry.get("id")
-            prefix = entry.get("prefix", "")
-            suffix = entry.get("suffix", "")
             
             # Collect all completions for this entry
-            model_completions = []
-            
-            # Check for array of completions first
-            if f"{model_name}_completions" in entry and isinstance(entry[f"{model_name}_completions"], list):
-                model_completions = entry[f"{model_name}_completions"]
-                print(f"Found {len(model_completions)} completions in array format")
-            # Check for individual numbered completions
-            elif f"{model_name}_completion_0" in entry:
-                i = 0
-                while f"{model_name}_completion_{i}" in entry:
-                    model_completions.append(entry[f"{model_name}_completion_{i}"])
-                    i += 1
-                print(f"Found {len(model_completions)} numbered completions")
-            # Fall back to single completion format
-            elif model_name in entry:
-                model_completions = [entry[model_name]]
-                print(f"Found single completion")
-            else:
+            model_completions = get_entry_completions(entry, model_name)
+            if model_completions is None:
                 print(f"No completions found for model {model_name}")
                 continue
+            print(f"Found {len(model_completions)} completion(s)")
             
             # Use extracted language from path, but allow entry values to override if present
             language = entry.get("language", actual_language)
@@ -390,48 +993,28 @@ def evaluate_single_completion(model_file, output_file, model_name, max_evaluati
             
             # Store scores for all completions
             completion_scores = []
+            completion_sub_scores = []
             completion_responses = []
             
             # Evaluate each completion
             for comp_idx, model_completion in enumerate(model_completions):
                 print(f"  Evaluating completion {comp_idx + 1}/{len(model_completions)}")
-                
-                formatted_prompt = single_model_prompt_template.format(
-                    prefix=prefix,
-                    completion=model_completion,
-                    suffix=suffix
-                )
-                
-                messages = [{"role": "user", "content": formatted_prompt}]
-
-                try:
-                    completion = client.chat.completions.create(  
-                        max_completion_tokens=16384,
-                        model=O3MINI_DEPLOYMENT,  
-                        messages=messages,
-                        stream=False  
-                    )
+                record = judgements[(entry_index, comp_idx)]
+                response_content = record["response"]
+                score = record["score"]
 
-                    response_content = completion.choices[0].message.content
+                if response_content.startswith("Error: ") and score is None:
+                    print(f"    Error evaluating completion {comp_idx + 1}: {response_content[len('Error: '):]}")
+                else:
                     print(f"    Evaluation result for completion {comp_idx + 1}:")
                     print(f"    {response_content[:200]}...")  # Print first 200 chars
-                    
-                    # Extract score from response
-                    score = extract_score(response_content)
-                    
                     if score is not None:
-                        completion_scores.append(score)
-                        completion_responses.append(response_content)
                         print(f"    Score for completion {comp_idx + 1}: {score}")
                     else:
                         print(f"    Failed to extract score for completion {comp_idx + 1}")
-                        completion_scores.append(None)
-                        completion_responses.append(response_content)
-                    
-                except Exception as e:
-                    print(f"    Error evaluating completion {comp_idx + 1}: {str(e)}")
-                    completion_scores.append(None)
-                    completion_responses.append(f"Error: {str(e)}")
+                completion_scores.append(score)
+                completion_sub_scores.append(record.get("sub_scores"))
+                completion_responses.append(response_content)
             
             # Calculate average score (only from successful evaluations)
             valid_scores = [s for s in completion_scores if s is not None]
@@ -463,6 +1046,7 @@ def evaluate_single_completion(model_file, output_file, model_name, max_evaluati
                 "id": entry_id,
                 "score": avg_score,  # Average score
                 "individual_scores": completion_scores,  # All individual scores
+                "individual_sub_scores": completion_sub_scores,  # Relevance/helpfulness of structured judgements
                 "num_completions": len(model_completions),
                 "num_valid_scores": len(valid_scores),
                 "language": language,
@@ -475,18 +1059,140 @@ def evaluate_single_completion(model_file, output_file, model_name, max_evaluati
             evaluation_results.append(result)
             processed_count += 1
 
-        # Save all evaluation results to a JSON file
-        with open(output_file, 'w', encoding='utf-8') as outfile:
+        # Save all evaluation results to a JSON file (atomically, a partial file would be skipped as evaluated)
+        tmp_path = temporary_path(output_file)
+        with open(tmp_path, 'w', encoding='utf-8') as outfile:
             json.dump(evaluation_results, outfile, indent=2)
+        os.replace(tmp_path, output_file)
+        with JudgeScoreIndex(os.path.dirname(os.path.abspath(output_file))) as index:
+            index.add_file(output_file, evaluation_results)
+        
+        # The results file now holds every judgement
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
         
         print(f"\nEvaluation results saved to {output_file}")
         return processed_count
 
     except Exception as e:
         print(f"Error occurred: {str(e)}")
+        print(f"Judgements received so far are kept in {journal_path} and reused on the next run")
         return 0
 
-def generate_single_model_summary(results_dir: str, output_file: str = None):
+def calibrate_batch_judging(model_files, num_entries=DEFAULT_CALIBRATION_ENTRIES, batch_size=5, scheduler=None, response_cache=None, output_file=None, tolerance=0.5, judge_format=DEFAULT_JUDGE_FORMAT):
+    """
+    Check that batch judging agrees with single-prompt judging.
+    
+    The distinct completions of up to num_entries test cases (those with at least two) are
+    judged both one per prompt and batch_size per batch prompt, and the two scores of every
+    completion are compared with a paired bootstrap.
+    
+    Args:
+        model_files: List of (completion file, model name) pairs to take the test cases from
+        num_entries: Number of test cases to judge
+        batch_size: Maximum completions per batch prompt
+        scheduler: RequestScheduler of the o3-mini deployment (default: get_judge_scheduler())
+        response_cache: Optional ResponseCache (single-prompt judgements of earlier runs are reused)
+        output_file: Optional path to save the calibration results JSON
+        tolerance: Largest mean score difference (in points) still counted as agreement
+        judge_format: 'json' or 'text', the answer format the judge is asked for
+    
+    Returns:
+        Dictionary with the agreement statistics
+    """
+    print("\n" + "="*80)
+    print("BATCH JUDGING CALIBRATION")
+    print("="*80)
+    scheduler = scheduler or get_judge_scheduler()
+    batch_size = max(2, batch_size)
+    
+    # (id, prefix, suffix, distinct completions) of the test cases to judge
+    cases = []
+    for model_file, model_name in model_files:
+        for entry in read_completion_rows(model_file):
+            completions = list(dict.fromkeys(get_entry_completions(entry, model_name) or []))
+            if len(completions) >= 2:
+                cases.append((f"{model_name}/{entry.get('id')}", entry.get("prefix", ""), entry.get("suffix", ""), completions))
+            if len(cases) >= num_entries:
+                break
+        if len(cases) >= num_entries:
+            break
+    if not cases:
+        print("No test cases with at least two distinct completions to calibrate on (generate with --num_completions > 1)")
+        return {}
+    
+    single_tokens = batch_tokens = 0
+    with ThreadPoolExecutor(max_workers=scheduler.concurrency.max_limit) as executor:
+        judged = []
+        for case_id, prefix, suffix, completions in cases:
+            single = []
+            for completion in completions:
+                _, messages = build_judge_prompt(prefix, suffix, [completion], judge_format)
+                single_tokens += estimate_tokens(messages)
+                single.append(executor.submit(judge_prompt, messages, scheduler, response_cache, 1, judge_format))
+            batch = []
+            for start in range(0, len(completions), batch_size):
+                chunk = completions[start:start + batch_size]
+                _, messages = build_judge_prompt(prefix, suffix, chunk, judge_format)
+                batch_tokens += estimate_tokens(messages)
+                batch.append(executor.submit(judge_prompt, messages, scheduler, response_cache, len(chunk), judge_format))
+            judged.append((case_id, single, batch))
+        
+        pairs = []
+        for case_id, single, batch in judged:
+            single_scores = [future.result()[1][0] if future.exception() is None else None for future in single]
+            batch_scores = [score for future in batch
+                            for score in (future.result()[1] if future.exception() is None else [None] * batch_size)]
+            for index, (single_score, batch_score) in enumerate(zip(single_scores, batch_scores)):
+                pairs.append({"id": case_id, "completion_index": index, "single_score": single_score, "batch_score": batch_score})
+    
+    scored = [pair for pair in pairs if pair["single_score"] is not None and pair["batch_score"] is not None]
+    if not scored:
+        print("No completion was scored in both modes")
+        return {}
+    single = np.array([pair["single_score"] for pair in scored])
+    batch = np.array([pair["batch_score"] for pair in scored])
+    comparison = paired_bootstrap_ci({i: score for i, score in enumerate(batch)}, {i: score for i, score in enumerate(single)})
+    correlation = float(np.corrcoef(single, batch)[0, 1]) if len(scored) > 1 and single.std() > 0 and batch.std() > 0 else None
+    
+    calibration = {
+        "test_cases": len(cases),
+        "completions": len(pairs),
+        "scored_in_both_modes": len(scored),
+        "batch_size": batch_size,
+        "single_mean": round(float(single.mean()), 3),
+        "batch_mean": round(float(batch.mean()), 3),
+        "mean_difference": round(comparison["difference"], 3),
+        "difference_lower_ci": round(comparison["lower_ci"], 3),
+        "difference_upper_ci": round(comparison["upper_ci"], 3),
+        "mean_absolute_difference": round(float(np.abs(batch - single).mean()), 3),
+        "within_one_point": round(float((np.abs(batch - single) <= 1).mean()), 3),
+        "correlation": round(correlation, 3) if correlation is not None else None,
+        "single_prompt_tokens": single_tokens,
+        "batch_prompt_tokens": batch_tokens,
+        "agrees": comparison["lower_ci"] >= -tolerance and comparison["upper_ci"] <= tolerance,
+        "pairs": pairs
+    }
+    
+    print(f"Test cases: {len(cases)}, completions scored in both modes: {len(scored)}/{len(pairs)}")
+    print(f"Mean score: single {calibration['single_mean']:.2f}, batch {calibration['batch_mean']:.2f}")
+    print(f"Batch - single: {comparison['difference']:+.2f} (95% CI: {comparison['lower_ci']:+.2f} to {comparison['upper_ci']:+.2f}), "
+          f"mean absolute difference {calibration['mean_absolute_difference']:.2f}, "
+          f"{calibration['within_one_point'] * 100:.0f}% within 1 point"
+          + (f", correlation {correlation:.2f}" if correlation is not None else ""))
+    print(f"Prompt tokens: single {single_tokens}, batch {batch_tokens} ({single_tokens / max(batch_tokens, 1):.1f}x fewer)")
+    if calibration["agrees"]:
+        print(f"✓ Batch judging agrees with single-prompt judging (within +/-{tolerance} points)")
+    else:
+        print(f"⚠ Batch judging does not agree with single-prompt judging within +/-{tolerance} points")
+    
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(calibration, f, indent=2)
+        print(f"Calibration results saved to {output_file}")
+    return calibration
+
+def generate_single_model_summary(results_dir: str, output_file: str = None, judge_stats: dict = None):
     """
     Generate a properly structured single model summary file that groups all categories
     under their respective models.
@@ -494,16 +1200,22 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
     Args:
         results_dir: Directory containing evaluation result files
         output_file: Optional path to save the summary JSON (defaults to results_dir/single_model_summary.json)
+        judge_stats: Optional judge deduplication statistics of the run (JudgeDeduplicator.summary_stats()),
+            saved in the summary JSON under "judge_deduplication"
     
     Returns:
-        Dictionary with the summary data
+        Dictionary with the summary data (by model)
     """
     print("\n\n" + "="*80)
     print("GENERATING SINGLE MODEL SUMMARY")
     print("="*80)
     
-    # Find all single model evaluation files
-    single_eval_files = glob.glob(f"{results_dir}/*_single_evaluation.json")
+    # Scores of all single model evaluation files, read from the score index (only new or changed
+    # files are parsed, the judge responses are never loaded); the index also keeps the
+    # confidence intervals of earlier summaries
+    index = JudgeScoreIndex(results_dir)
+    index.sync()
+    indexed_results = index.read_entries()
     
     # Dictionary to store model scores by category
     model_data = {}
@@ -515,10 +1227,9 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
     detailed_results = {}
     
     # Process all single model evaluation files
-    for file_path in single_eval_files:
+    for filename, data in indexed_results.items():
         try:
-            # Extract filename without extension
-            filename = os.path.basename(file_path)
+            file_path = os.path.join(results_dir, filename)
             
             # New file naming convention: {language}_{category}_{model_name}_single_evaluation.json
             file_parts = filename.split('_single_evaluation.json')[0]
@@ -601,14 +1312,11 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
                 
             print(f"Processing {filename}: Model={model_name}, Language={language_from_file}, Category={category_from_file}")
             
-            # Read the result file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
             # Calculate average score for this category
             scores = []
             all_results = []
             language_category_results = defaultdict(list)
+            sub_scores = defaultdict(list)
             total_completions_evaluated = 0
             total_valid_evaluations = 0
             
@@ -617,6 +1325,12 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
                     score = entry.get('score')
                     scores.append(score)
                     
+                    # Sub-scores stored with structured judgements (absent for the text format)
+                    for completion_sub_scores in entry.get('individual_sub_scores') or []:
+                        for field in JUDGE_SUB_SCORES:
+                            if completion_sub_scores and completion_sub_scores.get(field) is not None:
+                                sub_scores[field].append(completion_sub_scores[field])
+                    
                     # Track number of completions evaluated (for multi-completion scenarios)
                     total_completions_evaluated += entry.get('num_completions', 1)
                     total_valid_evaluations += entry.get('num_valid_scores', 1)
@@ -665,14 +1379,15 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
             
             # Calculate confidence intervals regardless of sample size
             # If sample is small, we'll note it in the output
-            lower_ci, upper_ci = bootstrap_ci(scores)
+            lower_ci, upper_ci = index.memoize("bootstrap_ci", scores, lambda: bootstrap_ci(scores))
             if len(scores) < 5:
                 print(f"Warning: Only {len(scores)} samples for {category_from_file} in {model_name}. CI may not be statistically meaningful.")
             
             # Add the model to our list if it's new
             if model_name not in model_data:
                 model_data[model_name] = {
-                    'overall': {'scores': [], 'categories_count': 0, 'all_scores': []},
+                    'overall': {'scores': [], 'categories_count': 0, 'all_scores': [], 'file_scores': {},
+                                'sub_scores': defaultdict(list)},
                     'categories': {},
                     'languages': defaultdict(list)
                 }
@@ -689,6 +1404,9 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
                 'upper_ci': round(upper_ci, 2),
                 'ci_warning': len(scores) < 5
             }
+            if sub_scores:
+                model_data[model_name]['categories'][category_from_file]['sub_scores'] = {
+                    field: round(sum(values) / len(values), 2) for field, values in sub_scores.items()}
             
             # Group scores by language
             for language, lang_scores in language_category_results.items():
@@ -698,6 +1416,9 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
             model_data[model_name]['overall']['scores'].append(avg_score)
             model_data[model_name]['overall']['categories_count'] += 1
             model_data[model_name]['overall']['all_scores'].extend(scores)
+            model_data[model_name]['overall']['file_scores'][filename] = scores
+            for field, values in sub_scores.items():
+                model_data[model_name]['overall']['sub_scores'][field].extend(values)
             
             # Add detailed results
             detailed_results[model_name].extend(all_results)
@@ -710,9 +1431,13 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
     for model_name in model_names:
         model_info = model_data[model_name]
         
-        # Calculate overall confidence intervals
+        # Calculate overall confidence intervals; the overall score averages the files, so each
+        # file is resampled separately and weighted equally
         all_scores = model_info['overall']['all_scores']
-        overall_lower_ci, overall_upper_ci = bootstrap_ci(all_scores)
+        file_scores = model_info['overall']['file_scores']
+        _, overall_lower_ci, overall_upper_ci = index.memoize(
+            "stratified_bootstrap_ci/equal_weights", file_scores,
+            lambda: stratified_bootstrap_ci(file_scores, weights={filename: 1 for filename in file_scores}))
         ci_warning = len(all_scores) < 5
         
         # Create the model entry
@@ -728,6 +1453,10 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
                 'ci_warning': ci_warning
             }
         }
+        overall_sub_scores = model_info['overall']['sub_scores']
+        if overall_sub_scores:
+            final_summary[model_name]['overall']['sub_scores'] = {
+                field: round(sum(values) / len(values), 2) for field, values in overall_sub_scores.items()}
         
         # Add all categories
         for category, data in model_info['categories'].items():
@@ -750,7 +1479,7 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
         # Add language statistics
         final_summary[model_name]['languages'] = {}
         for language, scores in model_info['languages'].items():
-            lang_lower_ci, lang_upper_ci = bootstrap_ci(scores)
+            lang_lower_ci, lang_upper_ci = index.memoize("bootstrap_ci", scores, lambda: bootstrap_ci(scores))
             lang_ci_warning = len(scores) < 5
                 
             final_summary[model_name]['languages'][language] = {
@@ -760,14 +1489,18 @@ def generate_single_model_summary(results_dir: str, output_file: str = None):
                 'upper_ci': round(lang_upper_ci, 2),
                 'ci_warning': lang_ci_warning
             }
+    index.close()
     
     # Determine the output file path for main summary
     if output_file is None:
         output_file = os.path.join(results_dir, "single_model_summary.json")
     
-    # Save the summary
+    # Save the summary, with the judge requests saved by deduplication in the run that wrote it
+    summary_payload = dict(final_summary)
+    if judge_stats:
+        summary_payload['judge_deduplication'] = judge_stats
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(final_summary, f, indent=2)
+        json.dump(summary_payload, f, indent=2)
     
     # Generate more granular output files
     for model_name in model_names:
@@ -981,6 +1714,11 @@ def create_language_category_heatmap(summary_data, output_dir):
     # Use summary data as is (no filtering needed since we only have approved models)
     filtered_data = summary_data
     
+    # Mean score of every result file, from the score index
+    with JudgeScoreIndex(output_dir) as index:
+        index.sync(verbose=False)
+        file_means = index.file_means()
+    
     # Skip individual model heatmaps and only create the combined heatmap
     
     # If we have multiple models, create a combined figure with all heatmaps stacked
@@ -1034,12 +1772,10 @@ def create_language_category_heatmap(summary_data, output_dir):
             
             # SECOND METHOD: Look for detailed result files
             # This is the most reliable approach for language-specific category data
-            result_files = glob.glob(f"{output_dir}/*_{model_name}_single_evaluation.json")
+            result_files = [filename for filename in file_means if filename.endswith(f"_{model_name}_single_evaluation.json")]
             print(f"  Found {len(result_files)} evaluation files")
             
-            for file_path in result_files:
-                filename = os.path.basename(file_path)
-                
+            for filename in result_files:
                 # Parse the filename to extract language and category
                 # Format should be: language_category_modelname_single_evaluation.json
                 filename_base = filename.replace("_single_evaluation.json", "")
@@ -1093,18 +1829,10 @@ def create_language_category_heatmap(summary_data, output_dir):
                 if category not in category_order:
                     continue
                 
-                # Read the file and calculate average score
-                try:
-                    with open(file_path, 'r') as f:
-                        eval_data = json.load(f)
-                        
-                    scores = [e.get('score') for e in eval_data if e.get('score') is not None]
-                    if scores:
-                        avg_score = sum(scores) / len(scores)
-                        language_category_scores[(language, category)] = avg_score
-                        print(f"    Found score for {language}/{category}: {avg_score}")
-                except Exception as e:
-                    print(f"    Error reading {file_path}: {str(e)}")
+                # Average score of the file
+                avg_score = file_means[filename]
+                language_category_scores[(language, category)] = avg_score
+                print(f"    Found score for {language}/{category}: {avg_score}")
             
             # Fill the data matrix with scores
             for j, category in enumerate(category_order):
@@ -1196,6 +1924,17 @@ def main():
     parser.add_argument('--language', nargs='+', help='Evaluate only files for the specified language(s)')
     parser.add_argument('--plot', action='store_true', help='Generate a comparison plot of model scores with confidence intervals')
     parser.add_argument('--heatmap', action='store_true', help='Generate language-category heatmaps for models')
+    parser.add_argument('--compare', nargs=2, metavar=('MODEL_A', 'MODEL_B'), help='Compare two models with a paired bootstrap over the test cases scored for both')
+    parser.add_argument('--warehouse', type=str, help='Optional: Path to a results warehouse (SQLite) to ingest judge scores into')
+    parser.add_argument('--no_cache', '--no-cache', dest='no_cache', action='store_true', help='Do not read or write the judge response cache')
+    parser.add_argument('--max_in_flight', type=int, default=DEFAULT_MAX_IN_FLIGHT, help=f'Maximum number of concurrent judge requests (default: {DEFAULT_MAX_IN_FLIGHT})')
+    parser.add_argument('--requests_per_minute', type=float, default=None, help='Judge requests per minute allowed (default: unlimited)')
+    parser.add_argument('--tokens_per_minute', type=float, default=None, help='Estimated judge tokens per minute allowed (default: unlimited)')
+    parser.add_argument('--max_retries', type=int, default=6, help='Maximum retries of a throttled or failed judge request (default: 6)')
+    parser.add_argument('--score_retries', type=int, default=DEFAULT_SCORE_RETRIES, help=f'Times an errored or unparseable judgement is re-queued (default: {DEFAULT_SCORE_RETRIES})')
+    parser.add_argument('--judge_batch_size', type=int, default=1, help='Judge up to this many completions of a test case in one batch prompt (default: 1, one prompt per completion)')
+    parser.add_argument('--judge_format', choices=JUDGE_FORMATS, default=DEFAULT_JUDGE_FORMAT, help=f'Answer format asked of the judge: structured JSON with relevance/helpfulness sub-scores, or the original score line (default: {DEFAULT_JUDGE_FORMAT})')
+    parser.add_argument('--calibrate', type=int, nargs='?', const=DEFAULT_CALIBRATION_ENTRIES, help=f'Instead of evaluating, compare batch judging (--judge_batch_size) with single-prompt judging on this many test cases (default: {DEFAULT_CALIBRATION_ENTRIES})')
     
     args = parser.parse_args()
     
@@ -1206,7 +1945,8 @@ def main():
             args.output_dir, 
             generate_plot=args.plot,
             generate_heatmap=args.heatmap,
-            language_filter=args.language
+            language_filter=args.language,
+            compare=args.compare
         )
         return
         
@@ -1228,6 +1968,18 @@ def main():
     
     # Track total evaluations
     total_evaluations = 0
+
+    # Judge responses are cached on disk so reruns do not pay for identical prompts again
+    response_cache = None if args.no_cache else ResponseCache()
+
+    # All judge requests share one scheduler: in-flight limit, rate limits, retries with backoff
+    scheduler = get_judge_scheduler(args.max_in_flight, args.requests_per_minute, args.tokens_per_minute, args.max_retries)
+
+    # Identical (prefix, suffix, completion) prompts of all models are judged once
+    deduplicator = JudgeDeduplicator()
+
+    # Completion files to sample the --calibrate test cases from
+    calibration_files = []
     
     # Process all model files
     for model_name in models_to_evaluate:
@@ -1236,14 +1988,15 @@ def main():
         print(f"{'='*80}")
         
         # Search pattern should handle both regular model names and those with 'usage_' prefix
-        model_pattern = f"*-{model_name}.jsonl"
-        usage_model_pattern = f"*-usage_{model_name}.jsonl"
-        
-        model_files = glob.glob(f"{completions_dir}/**/{model_pattern}", recursive=True)
-        usage_model_files = glob.glob(f"{completions_dir}/**/{usage_model_pattern}", recursive=True)
+        # (plain or compressed JSONL files)
+        model_files = []
+        usage_model_files = []
+        for extension in JSONL_EXTENSIONS:
+            model_files += glob.glob(f"{completions_dir}/**/*-{model_name}{extension}", recursive=True)
+            usage_model_files += glob.glob(f"{completions_dir}/**/*-usage_{model_name}{extension}", recursive=True)
         
-        # Combine both sets of files
-        all_model_files = model_files + usage_model_files
+        # Combine both sets of files, keeping one variant per file
+        all_model_files = dedupe_jsonl_variants(model_files) + dedupe_jsonl_variants(usage_model_files)
         
         if not all_model_files:
             print(f"No files found for model: {model_name}")
@@ -1350,9 +2103,14 @@ def main():
             print(f"Extracted from path: language={language}, category={category}")
             
             # Extract the real model name from the file in case it uses usage_ prefix
-            file_model_name = os.path.basename(model_file).split("-", 1)[1].replace(".jsonl", "")
+            file_model_name = strip_jsonl_extension(os.path.basename(model_file).split("-", 1)[1])
             if file_model_name.startswith("usage_"):
                 file_model_name = file_model_name[6:]  # Remove 'usage_' prefix
+            
+            # Calibration judges its own sample of test cases, see below
+            if args.calibrate:
+                calibration_files.append((model_file, file_model_name))
+                continue
                         
             # Generate output file path - include both language and category
             # Ensure no prefix is added to the model name
@@ -1362,6 +2120,14 @@ def main():
             if os.path.exists(output_file):
                 file_size = os.path.getsize(output_file)
                 if file_size > 0:
+                    # The score index knows the number of entries of files it has read
+                    with JudgeScoreIndex(output_dir) as index:
+                        indexed_entries = index.entry_count(output_file)
+                    if indexed_entries:
+                        print(f"✓ Skipping {file_model_name} for {language}/{category} - already evaluated ({indexed_entries} entries)")
+                        total_evaluations += indexed_entries
+                        continue
+                    
                     # Check if the file has valid JSON content
                     try:
                         with open(output_file, 'r') as f:
@@ -1383,11 +2149,22 @@ def main():
                 file_model_name,  # Use the model name from file which might include usage_ prefix
                 max_evaluations=max_evaluations,
                 current_evaluations=total_evaluations,
-                max_file_evaluations=args.max_file_evaluations
+                max_file_evaluations=args.max_file_evaluations,
+                response_cache=response_cache,
+                scheduler=scheduler,
+                score_retries=args.score_retries,
+                deduplicator=deduplicator,
+                judge_batch_size=args.judge_batch_size,
+                judge_format=args.judge_format
             )
             
             total_evaluations += evaluations_done
             
+            # Ingest the new scores into the results warehouse
+            if args.warehouse and evaluations_done > 0:
+                with ResultsWarehouse(args.warehouse) as warehouse:
+                    warehouse.ingest_judge_file(output_file)
+            
             # Check if we've hit the max evaluations limit
             if max_evaluations is not None and total_evaluations >= max_evaluations:
                 print(f"Reached max evaluations limit ({max_evaluations}). Stopping.")
@@ -1397,12 +2174,34 @@ def main():
         if max_evaluations is not None and total_evaluations >= max_evaluations:
             break
 
+    if args.calibrate:
+        calibrate_batch_judging(
+            calibration_files,
+            num_entries=args.calibrate,
+            batch_size=args.judge_batch_size,
+            scheduler=scheduler,
+            response_cache=response_cache,
+            output_file=os.path.join(output_dir, "batch_judging_calibration.json"),
+            judge_format=args.judge_format
+        )
+
+    print_scheduler_stats()
+    deduplicator.print_stats()
+    if response_cache is not None:
+        response_cache.print_stats()
+        response_cache.close()
+
+    if args.calibrate:
+        return
+
     # Display score summary at the end
     display_score_summary(
         output_dir, 
         generate_plot=args.plot,
         generate_heatmap=args.heatmap,
-        language_filter=args.language
+        language_filter=args.language,
+        compare=args.compare,
+        judge_stats=deduplicator.summary_stats()
     )
 
 if __name__ == "__main__":
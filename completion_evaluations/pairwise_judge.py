@@ -0,0 +1,582 @@
+import os
+import sys
+import json
+import glob
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from llm_judge import (DEFAULT_MAX_IN_FLIGHT, JUDGE_REASK_PROMPT, MAX_JUDGE_REASKS, JudgeOutputError,
+                       find_all_models, get_entry_completions, get_judge_cache_key, get_judge_scheduler,
+                       request_judgement)
+
+# Make the shared repository-level modules importable when run from this directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bootstrap import get_rng, percentile_interval
+from completion_store import read_completion_rows
+from jsonl_io import JSONL_EXTENSIONS, dedupe_jsonl_variants, strip_jsonl_extension
+from local_model import BACKEND_CHOICES, load_local_model
+from request_scheduler import print_scheduler_stats
+from response_cache import ResponseCache
+
+# Prompt asking the judge which of two completions of a test case is better
+PAIRWISE_PROMPT_TEMPLATE = """You are a highly experienced software judge tasked with comparing two model-generated code completions. For a given code prefix and suffix, decide which completion is better based on the criteria below, or answer "tie" if they are equally good. Please solely focus on the completion quality; the order in which the completions are shown does not matter.
+
+    # Evaluation Criteria:
+    1. Relevance to Prefix and Suffix: Does the code completion connect semantically meaningfully to both the prefix and suffix?
+    2. Helpfulness: Does the completion provide non-trivial assistance, adding meaningful content that reduces the user's effort in writing code?
+
+    Answer with a JSON object with the fields:
+    "winner": "A", "B" or "tie"
+    "reasoning": your detailed reasoning
+
+    # Begin:
+    Prefix:
+    ```
+    {prefix}
+    ```
+
+    Completion A:
+    ```
+    {completion_a}
+    ```
+
+    Completion B:
+    ```
+    {completion_b}
+    ```
+
+    Suffix:
+    ```
+    {suffix}
+    ```
+    """
+
+# Structured-output schema of a preference
+PAIRWISE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "judge_preference",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "winner": {"type": "string", "enum": ["A", "B", "tie"]},
+                "reasoning": {"type": "string"},
+            },
+            "required": ["winner", "reasoning"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Maximum new tokens of a preference generated by a local model
+LOCAL_MAX_TOKENS = 1024
+
+# Comparison schedulers: active-learning Bradley-Terry, or Swiss rounds of neighbours in the current ranking
+SCHEDULERS = ('active', 'swiss')
+
+DEFAULT_MAX_COMPARISONS = 1000
+DEFAULT_ROUND_SIZE = 16
+
+# Comparisons stop once every rating's 95% interval is within this many Elo points
+DEFAULT_TARGET_CI = 30.0
+
+# Elo scale of the Bradley-Terry ratings: 400 points is a 10:1 odds of winning
+ELO_SCALE = 400 / np.log(10)
+ELO_BASE = 1000
+
+# Gaussian prior on the log-strengths, so models that won (or lost) every comparison keep a finite rating
+BT_PRIOR = 0.01
+
+# Bootstrap refits of the final ratings
+DEFAULT_N_BOOTSTRAP = 200
+
+# Files of the results directory: every comparison as it arrives (a rerun continues from it), and the ratings
+COMPARISONS_FILE = "pairwise_comparisons.jsonl"
+RATINGS_FILE = "pairwise_ratings.json"
+
+
+def load_cases(completions_dir, models, languages=None):
+    """
+    Collect the test cases with completions of at least two of the models.
+
+    Returns:
+        {(language, category, id): {"prefix", "suffix", "completions": {model: first completion}}}
+    """
+    cases = defaultdict(lambda: {"completions": {}})
+    for model_name in models:
+        model_files = []
+        for extension in JSONL_EXTENSIONS:
+            model_files += glob.glob(f"{completions_dir}/**/*-{model_name}{extension}", recursive=True)
+            model_files += glob.glob(f"{completions_dir}/**/*-usage_{model_name}{extension}", recursive=True)
+        for model_file in sorted(dedupe_jsonl_variants(model_files)):
+            # Structure: {completions_dir}/{language}/{category}/{category}-{model}.jsonl
+            relative = os.path.relpath(model_file, completions_dir).split(os.sep)
+            if len(relative) < 3:
+                continue
+            language, category = relative[0], relative[1]
+            if languages and language.lower() not in languages:
+                continue
+            file_model_name = strip_jsonl_extension(os.path.basename(model_file).split("-", 1)[1])
+            if file_model_name.startswith("usage_"):
+                file_model_name = file_model_name[6:]
+            if file_model_name != model_name:
+                continue
+            for entry in read_completion_rows(model_file):
+                completions = get_entry_completions(entry, file_model_name)
+                if not completions or not isinstance(completions[0], str) or completions[0].startswith("Error: "):
+                    continue
+                case = cases[(language, category, entry.get("id"))]
+                case.setdefault("prefix", entry.get("prefix", ""))
+                case.setdefault("suffix", entry.get("suffix", ""))
+                case["completions"][model_name] = completions[0]
+    return {key: case for key, case in cases.items() if len(case["completions"]) >= 2}
+
+
+def parse_preference(response_text):
+    """
+    Read the winner ("A", "B" or "tie") of a preference.
+
+    Structured JSON answers are expected; a "Winner: A" line is accepted as well, for
+    stand-in endpoints without structured outputs.
+
+    Raises:
+        JudgeOutputError: If no valid winner is found
+    """
+    text = (response_text or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        data = json.loads(text)
+        winner = data.get("winner") if isinstance(data, dict) else None
+    except json.JSONDecodeError:
+        winner = None
+        for line in text.splitlines():
+            line = line.strip(' *#')
+            if line.lower().startswith("winner:"):
+                winner = line.split(":", 1)[1].strip(' *"')
+                break
+    if isinstance(winner, str) and winner.strip().lower() in ("a", "b", "tie"):
+        return winner.strip().upper() if winner.strip().lower() != "tie" else "tie"
+    raise JudgeOutputError('"winner" must be "A", "B" or "tie"')
+
+
+def request_preference(messages, scheduler, response_cache=None, local_client=None):
+    """Send a preference prompt to the o3-mini judge, or to a local model. Returns (response text, from cache)."""
+    if local_client is not None:
+        response = scheduler.call(lambda: local_client.complete(messages, max_tokens=LOCAL_MAX_TOKENS))
+        return response.choices[0].message.content, False
+    return request_judgement(messages, scheduler, response_cache, PAIRWISE_RESPONSE_FORMAT)
+
+
+def compare_completions(case, model_first, model_second, scheduler, response_cache=None, local_client=None):
+    """
+    Ask the judge which of two models' completions of a test case is better.
+
+    Invalid answers are sent back to the judge with the error, up to MAX_JUDGE_REASKS times.
+
+    Args:
+        case: Test case from load_cases
+        model_first: Model whose completion is shown as completion A
+        model_second: Model whose completion is shown as completion B
+
+    Returns:
+        Tuple of (winning model or "tie", None if no valid answer was given; number of judge requests sent)
+    """
+    completion_first = case["completions"][model_first]
+    completion_second = case["completions"][model_second]
+    if completion_first == completion_second:
+        return "tie", 0
+
+    content = PAIRWISE_PROMPT_TEMPLATE.format(prefix=case["prefix"], completion_a=completion_first,
+                                              completion_b=completion_second, suffix=case["suffix"])
+    messages = [{"role": "user", "content": content}]
+    response_content, from_cache = request_preference(messages, scheduler, response_cache, local_client)
+    requests = 0 if from_cache else 1
+    conversation = list(messages)
+    for reask in range(MAX_JUDGE_REASKS + 1):
+        try:
+            winner = parse_preference(response_content)
+            break
+        except JudgeOutputError as e:
+            if reask == MAX_JUDGE_REASKS:
+                print(f"Invalid judge preference after {MAX_JUDGE_REASKS} re-asks: {e}")
+                return None, requests
+            conversation += [{"role": "assistant", "content": response_content},
+                             {"role": "user", "content": JUDGE_REASK_PROMPT.format(error=e)}]
+            response_content, _ = request_preference(conversation, scheduler, None, local_client)
+            requests += 1
+
+    if response_cache and local_client is None and not from_cache:
+        response_cache.put(get_judge_cache_key(messages, PAIRWISE_RESPONSE_FORMAT), response_content, "o3-mini")
+    return {"A": model_first, "B": model_second}.get(winner, "tie"), requests
+
+
+def fit_bradley_terry(comparisons, models, prior=BT_PRIOR):
+    """
+    Fit Bradley-Terry log-strengths to pairwise outcomes (ties count half a win for each model).
+
+    Newton's method on the log-likelihood with a Gaussian prior on the log-strengths.
+
+    Args:
+        comparisons: List of comparison records (model_a, model_b, winner)
+        models: Model names
+        prior: Precision of the prior (keeps unbeaten models finite)
+
+    Returns:
+        Tuple of (log-strengths, information matrix), indexed like models
+    """
+    index = {model: i for i, model in enumerate(models)}
+    wins = np.zeros((len(models), len(models)))
+    for comparison in comparisons:
+        a, b = index[comparison["model_a"]], index[comparison["model_b"]]
+        if comparison["winner"] == comparison["model_a"]:
+            wins[a, b] += 1
+        elif comparison["winner"] == comparison["model_b"]:
+            wins[b, a] += 1
+        else:
+            wins[a, b] += 0.5
+            wins[b, a] += 0.5
+    return fit_bradley_terry_wins(wins, prior)
+
+
+def fit_bradley_terry_wins(wins, prior=BT_PRIOR, max_iterations=100, tolerance=1e-9):
+    """Fit Bradley-Terry log-strengths to a matrix of wins[i, j] (times i beat j). See fit_bradley_terry."""
+    games = wins + wins.T
+    theta = np.zeros(len(wins))
+    for _ in range(max_iterations):
+        p = 1 / (1 + np.exp(theta[None, :] - theta[:, None]))
+        gradient = (wins - games * p).sum(axis=1) - prior * theta
+        weights = games * p * (1 - p)
+        information = np.diag(weights.sum(axis=1)) - weights + prior * np.eye(len(wins))
+        step = np.linalg.solve(information, gradient)
+        theta += step
+        if np.abs(step).max() < tolerance:
+            break
+    p = 1 / (1 + np.exp(theta[None, :] - theta[:, None]))
+    weights = games * p * (1 - p)
+    information = np.diag(weights.sum(axis=1)) - weights + prior * np.eye(len(wins))
+    return theta - theta.mean(), information
+
+
+def to_elo(theta):
+    """Convert centered log-strengths to ratings on the Elo scale."""
+    return ELO_BASE + ELO_SCALE * np.asarray(theta)
+
+
+def rating_half_widths(information):
+    """Approximate 95% half-widths (Elo points) of the ratings from the information matrix."""
+    # The ratings are centered; only the weak prior pins down their common shift, so project it out
+    centering = np.eye(len(information)) - 1 / len(information)
+    covariance = centering @ np.linalg.inv(information) @ centering
+    return 1.96 * ELO_SCALE * np.sqrt(np.clip(np.diag(covariance), 0, None))
+
+
+def bootstrap_ratings(comparisons, models, n_bootstrap=DEFAULT_N_BOOTSTRAP, confidence=0.95, seed=0):
+    """
+    Bootstrap confidence intervals of the ratings, refitting on resampled comparisons.
+
+    Returns:
+        Array of (lower, upper) Elo ratings per model
+    """
+    rng = get_rng(seed)
+    index = {model: i for i, model in enumerate(models)}
+    pairs = np.array([(index[c["model_a"]], index[c["model_b"]]) for c in comparisons])
+    outcome = np.array([1.0 if c["winner"] == c["model_a"] else 0.0 if c["winner"] == c["model_b"] else 0.5
+                        for c in comparisons])
+    samples = np.empty((n_bootstrap, len(models)))
+    for b in range(n_bootstrap):
+        draw = rng.integers(0, len(comparisons), size=len(comparisons))
+        wins = np.zeros((len(models), len(models)))
+        np.add.at(wins, (pairs[draw, 0], pairs[draw, 1]), outcome[draw])
+        np.add.at(wins, (pairs[draw, 1], pairs[draw, 0]), 1 - outcome[draw])
+        samples[b] = to_elo(fit_bradley_terry_wins(wins)[0])
+    return np.array([percentile_interval(samples[:, i], confidence) for i in range(len(models))])
+
+
+def schedule_active(models, theta, information, available, round_size, rng):
+    """
+    Pick the pairs to compare next by expected information (active-learning Bradley-Terry).
+
+    A comparison of i and j is worth p(1 - p) times the current variance of theta_i - theta_j:
+    close matches between uncertain models teach the most about the ranking.
+
+    Returns:
+        List of (model_i, model_j) pairs, possibly repeated, of up to round_size comparisons
+    """
+    covariance = np.linalg.inv(information)
+    scores = {}
+    for i, j in available:
+        p = 1 / (1 + np.exp(theta[j] - theta[i]))
+        variance = covariance[i, i] + covariance[j, j] - 2 * covariance[i, j]
+        # The random term breaks ties between pairs of equal value
+        scores[(i, j)] = p * (1 - p) * variance * (1 + 1e-6 * rng.random())
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    if not ranked:
+        return []
+    # The best pairs, each compared on up to two cases per round so a round covers several pairs
+    picked = ranked[:max(1, round_size // 2)]
+    return [(models[i], models[j]) for i, j in (picked * 2)[:round_size]]
+
+
+def schedule_swiss(models, theta, available, round_size, round_number):
+    """
+    Pick the pairs of a Swiss round: neighbours in the current ranking, shifted by one every
+    other round so each model meets both of its neighbours.
+
+    Returns:
+        List of (model_i, model_j) pairs, every pair of the round at least once
+    """
+    order = list(np.argsort(-theta, kind='stable'))
+    offset = round_number % 2
+    pairs = [(order[k], order[k + 1]) for k in range(offset, len(order) - 1, 2)]
+    pairs = [(i, j) for i, j in pairs if (min(i, j), max(i, j)) in available]
+    if not pairs:
+        # Neighbours ran out of test cases, fall back to any pair still available
+        pairs = sorted(available)
+    if not pairs:
+        return []
+    repeats = max(1, round_size // len(pairs))
+    return [(models[i], models[j]) for i, j in pairs * repeats]
+
+
+def run_tournament(cases, models, output_dir, scheduler, scheduler_name='active', max_comparisons=DEFAULT_MAX_COMPARISONS,
+                   round_size=DEFAULT_ROUND_SIZE, target_ci=DEFAULT_TARGET_CI, n_bootstrap=DEFAULT_N_BOOTSTRAP,
+                   seed=0, response_cache=None, local_client=None):
+    """
+    Rank models with adaptively scheduled pairwise judge comparisons.
+
+    Every round the scheduler picks the model pairs to compare, each on a test case the pair
+    has not been compared on yet (completion order shown to the judge drawn at random). The
+    comparisons of a round are judged concurrently and appended to COMPARISONS_FILE, then the
+    Bradley-Terry ratings are refit. Comparisons stop when every 95% interval is within
+    target_ci Elo points, max_comparisons is reached, or no pair has a test case left.
+
+    Args:
+        cases: Test cases from load_cases
+        models: Model names to rank
+        output_dir: Directory of the comparisons and ratings files
+        scheduler: RequestScheduler of the judge
+        scheduler_name: 'active' or 'swiss'
+        max_comparisons: Maximum comparisons, including those of earlier runs
+        round_size: Comparisons judged per round
+        target_ci: Target 95% half-width of the ratings, in Elo points
+        n_bootstrap: Bootstrap refits of the final confidence intervals
+        seed: Seed of the case, order and tie-break draws
+        response_cache: Optional ResponseCache
+        local_client: Optional local model client used instead of the o3-mini judge
+
+    Returns:
+        Dictionary with the ratings and the comparison statistics
+    """
+    rng = get_rng(seed)
+    models = sorted(models)
+    index = {model: i for i, model in enumerate(models)}
+    os.makedirs(output_dir, exist_ok=True)
+    comparisons_path = os.path.join(output_dir, COMPARISONS_FILE)
+
+    # Comparisons of earlier runs between the models ranked now
+    comparisons = []
+    if os.path.exists(comparisons_path):
+        with open(comparisons_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("model_a") in index and record.get("model_b") in index:
+                    comparisons.append(record)
+        if comparisons:
+            print(f"Continuing from {len(comparisons)} comparison(s) in {comparisons_path}")
+
+    # Test cases each pair can still be compared on
+    remaining = defaultdict(list)
+    for key in sorted(cases, key=str):
+        case_models = sorted(model for model in cases[key]["completions"] if model in index)
+        for a in range(len(case_models)):
+            for b in range(a + 1, len(case_models)):
+                remaining[(index[case_models[a]], index[case_models[b]])].append(key)
+    for comparison in comparisons:
+        pair = tuple(sorted((index[comparison["model_a"]], index[comparison["model_b"]])))
+        key = (comparison["language"], comparison["category"], comparison["id"])
+        if key in remaining[pair]:
+            remaining[pair].remove(key)
+    for pair in remaining:
+        rng.shuffle(remaining[pair])
+
+    stats = {'judge_requests': 0, 'identical': 0, 'failed': 0}
+    theta, information = fit_bradley_terry(comparisons, models)
+    round_number = 0
+    with open(comparisons_path, 'a', encoding='utf-8') as comparisons_file, \
+            ThreadPoolExecutor(max_workers=scheduler.concurrency.max_limit) as executor:
+        while len(comparisons) < max_comparisons:
+            half_widths = rating_half_widths(information)
+            if comparisons and half_widths.max() <= target_ci:
+                print(f"Every rating is within ±{target_ci:g} Elo points, stopping")
+                break
+            available = {pair for pair, keys in remaining.items() if keys}
+            size = min(round_size, max_comparisons - len(comparisons))
+            if scheduler_name == 'swiss':
+                pairs = schedule_swiss(models, theta, available, size, round_number)
+            else:
+                pairs = schedule_active(models, theta, information, available, size, rng)
+            pairs = pairs[:size]
+
+            futures = []
+            for model_i, model_j in pairs:
+                pair = tuple(sorted((index[model_i], index[model_j])))
+                if not remaining[pair]:
+                    continue
+                key = remaining[pair].pop()
+                # Show the two completions in random order, so position bias averages out
+                first, second = (model_i, model_j) if rng.random() < 0.5 else (model_j, model_i)
+                if cases[key]["completions"][first] == cases[key]["completions"][second]:
+                    stats['identical'] += 1
+                futures.append((key, first, second, executor.submit(
+                    compare_completions, cases[key], first, second, scheduler, response_cache, local_client)))
+            if not futures:
+                print("No pair of models has a test case left to compare on, stopping")
+                break
+
+            for (language, category, case_id), first, second, future in futures:
+                try:
+                    winner, requests = future.result()
+                except Exception as e:
+                    print(f"Error comparing {first} and {second} on {language}/{category}/{case_id}: {str(e)}")
+                    winner, requests = None, 0
+                stats['judge_requests'] += requests
+                if winner is None:
+                    stats['failed'] += 1
+                    continue
+                record = {"language": language, "category": category, "id": case_id,
+                          "model_a": first, "model_b": second, "winner": winner}
+                comparisons.append(record)
+                comparisons_file.write(json.dumps(record) + "\n")
+            comparisons_file.flush()
+
+            round_number += 1
+            theta, information = fit_bradley_terry(comparisons, models)
+            leader = models[int(np.argmax(theta))]
+            print(f"Round {round_number}: {len(comparisons)} comparisons, leader {leader}, "
+                  f"largest 95% half-width ±{rating_half_widths(information).max():.0f} Elo")
+
+    if not comparisons:
+        print("No comparisons to rate the models on")
+        return {}
+
+    ratings = to_elo(theta)
+    intervals = bootstrap_ratings(comparisons, models, n_bootstrap, seed=seed)
+    record_counts = {model: {"comparisons": 0, "wins": 0, "losses": 0, "ties": 0} for model in models}
+    for comparison in comparisons:
+        for model in (comparison["model_a"], comparison["model_b"]):
+            counts = record_counts[model]
+            counts["comparisons"] += 1
+            if comparison["winner"] == model:
+                counts["wins"] += 1
+            elif comparison["winner"] == "tie":
+                counts["ties"] += 1
+            else:
+                counts["losses"] += 1
+
+    # One single-model judgement per model with a completion, for every test case
+    exhaustive = sum(sum(1 for model in case["completions"] if model in index) for case in cases.values())
+    results = {
+        "scheduler": scheduler_name,
+        "comparisons": len(comparisons),
+        # Counts of this run
+        "judge_requests": stats['judge_requests'],
+        "identical_completions": stats['identical'],
+        "failed_comparisons": stats['failed'],
+        "exhaustive_single_judgements": exhaustive,
+        "ratings": {
+            model: {
+                "rating": round(float(ratings[i]), 1),
+                "lower_ci": round(float(intervals[i][0]), 1),
+                "upper_ci": round(float(intervals[i][1]), 1),
+                **record_counts[model],
+            }
+            for i, model in sorted(enumerate(models), key=lambda item: -ratings[item[0]])
+        },
+    }
+    with open(os.path.join(output_dir, RATINGS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return results
+
+
+def print_ratings(results):
+    """Print the ratings table of a tournament."""
+    print("\n" + "="*80)
+    print("PAIRWISE RATINGS (Bradley-Terry, Elo scale)")
+    print("="*80)
+    for rank, (model, rating) in enumerate(results["ratings"].items(), 1):
+        print(f"{rank:>2}. {model:<30} {rating['rating']:7.1f} (95% CI: {rating['lower_ci']:.1f}-{rating['upper_ci']:.1f})"
+              f"  {rating['wins']}W/{rating['losses']}L/{rating['ties']}T of {rating['comparisons']}")
+    print(f"\n{results['comparisons']} comparisons in total; this run sent {results['judge_requests']} judge requests "
+          f"and ruled {results['identical_completions']} comparisons of identical completions ties without one")
+    print(f"Scoring every completion of these test cases would take {results['exhaustive_single_judgements']} judgements")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank code completion models with pairwise judge comparisons')
+    parser.add_argument('--completions_dir', type=str, default='../completions', help='Directory containing completion files')
+    parser.add_argument('--output_dir', type=str, default='pairwise_judge_results', help='Directory to save the comparisons and ratings')
+    parser.add_argument('--specific_models', nargs='+', help='Rank only the specified list of models (default: all)')
+    parser.add_argument('--language', nargs='+', help='Compare only test cases of the specified language(s)')
+    parser.add_argument('--scheduler', choices=SCHEDULERS, default='active', help='Comparison scheduling: active-learning Bradley-Terry or Swiss rounds (default: active)')
+    parser.add_argument('--max_comparisons', type=int, default=DEFAULT_MAX_COMPARISONS, help=f'Maximum comparisons, including those of earlier runs (default: {DEFAULT_MAX_COMPARISONS})')
+    parser.add_argument('--round_size', type=int, default=DEFAULT_ROUND_SIZE, help=f'Comparisons judged per round before the ratings are refit (default: {DEFAULT_ROUND_SIZE})')
+    parser.add_argument('--target_ci', type=float, default=DEFAULT_TARGET_CI, help=f'Stop once every 95%% interval is within this many Elo points (default: {DEFAULT_TARGET_CI:g})')
+    parser.add_argument('--n_bootstrap', type=int, default=DEFAULT_N_BOOTSTRAP, help=f'Bootstrap refits of the final confidence intervals (default: {DEFAULT_N_BOOTSTRAP})')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the test case and completion order draws (default: 0)')
+    parser.add_argument('--local_model', type=str, default=None, help='Judge with a local model instead of o3-mini: a GGUF file (llama.cpp) or a Hugging Face model directory (transformers, CPU)')
+    parser.add_argument('--local_backend', type=str, default='auto', choices=list(BACKEND_CHOICES), help='Backend of the local model (default: auto, llama_cpp for .gguf files)')
+    parser.add_argument('--no_cache', '--no-cache', dest='no_cache', action='store_true', help='Do not read or write the judge response cache')
+    parser.add_argument('--max_in_flight', type=int, default=DEFAULT_MAX_IN_FLIGHT, help=f'Maximum number of concurrent judge requests (default: {DEFAULT_MAX_IN_FLIGHT})')
+    parser.add_argument('--requests_per_minute', type=float, default=None, help='Judge requests per minute allowed (default: unlimited)')
+    parser.add_argument('--tokens_per_minute', type=float, default=None, help='Estimated judge tokens per minute allowed (default: unlimited)')
+    parser.add_argument('--max_retries', type=int, default=6, help='Maximum retries of a throttled or failed judge request (default: 6)')
+    args = parser.parse_args()
+
+    models = args.specific_models or sorted(find_all_models(args.completions_dir))
+    if len(models) < 2:
+        print("Pairwise ranking needs at least two models")
+        return
+    languages = [language.lower() for language in args.language] if args.language else None
+    cases = load_cases(args.completions_dir, models, languages)
+    print(f"Ranking {len(models)} models on {len(cases)} test cases with completions of at least two of them")
+
+    local_client = None
+    if args.local_model:
+        local_client = load_local_model(args.local_model, args.local_backend, max_batch_size=args.max_in_flight)
+    response_cache = None if args.no_cache or local_client else ResponseCache()
+    scheduler = get_judge_scheduler(args.max_in_flight, args.requests_per_minute, args.tokens_per_minute, args.max_retries)
+
+    results = run_tournament(
+        cases,
+        models,
+        args.output_dir,
+        scheduler,
+        scheduler_name=args.scheduler,
+        max_comparisons=args.max_comparisons,
+        round_size=args.round_size,
+        target_ci=args.target_ci,
+        n_bootstrap=args.n_bootstrap,
+        seed=args.seed,
+        response_cache=response_cache,
+        local_client=local_client
+    )
+
+    print_scheduler_stats()
+    if response_cache is not None:
+        response_cache.print_stats()
+        response_cache.close()
+    if results:
+        print_ratings(results)
+        print(f"\nRatings saved to {os.path.join(args.output_dir, RATINGS_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
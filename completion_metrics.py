@@ -0,0 +1,344 @@
+import os
+import re
+import math
+import json
+import sqlite3
+import hashlib
+import warnings
+import importlib
+import keyword
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import Levenshtein
+
+# Repository root, used to resolve the default cache location
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Default location of the metrics cache (safe to delete, the metrics are computed again)
+CACHE_DIR = os.path.join(REPO_ROOT, ".cache", "metrics")
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "metrics.db")
+
+# Metrics computed for every (completion, golden completion) pair, all in [0, 1]
+METRIC_NAMES = ("edit_similarity", "bleu", "identifier_overlap", "ast_match")
+
+# Bump whenever a metric changes, so cached values of the old definition are not reused
+METRICS_VERSION = 1
+
+# Number of pairs a worker process scores per task
+DEFAULT_BATCH_SIZE = 256
+
+# Largest n-gram order of the BLEU score
+BLEU_MAX_N = 4
+
+# Benchmark language -> tree_sitter_languages grammar name
+TREE_SITTER_LANGUAGES = {
+    "python": "python",
+    "java": "java",
+    "javascript": "javascript",
+    "typescript": "typescript",
+    "cpp": "cpp",
+    "c_sharp": "c_sharp",
+}
+
+# Code tokens for BLEU: identifiers/numbers, or single punctuation characters
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Keywords shared by the C-family languages of the benchmark, not counted as identifiers
+C_FAMILY_KEYWORDS = {
+    "abstract", "auto", "bool", "boolean", "break", "byte", "case", "catch", "char", "class", "const",
+    "continue", "default", "delete", "do", "double", "else", "enum", "export", "extends", "false", "final",
+    "finally", "float", "for", "function", "if", "implements", "import", "in", "instanceof", "int",
+    "interface", "let", "long", "namespace", "new", "null", "nullptr", "override", "package", "private",
+    "protected", "public", "return", "short", "static", "struct", "super", "switch", "this", "throw",
+    "throws", "true", "try", "typeof", "using", "var", "virtual", "void", "while", "yield",
+}
+
+LANGUAGE_KEYWORDS = {
+    "python": set(keyword.kwlist) | {"self"},
+    "java": C_FAMILY_KEYWORDS | {"synchronized", "transient", "volatile", "native"},
+    "javascript": C_FAMILY_KEYWORDS | {"async", "await", "const", "debugger", "of", "undefined"},
+    "typescript": C_FAMILY_KEYWORDS | {"any", "as", "async", "await", "number", "of", "readonly", "string",
+                                       "type", "undefined"},
+    "cpp": C_FAMILY_KEYWORDS | {"constexpr", "include", "inline", "noexcept", "operator", "std", "template",
+                                "typename", "unsigned"},
+    "c_sharp": C_FAMILY_KEYWORDS | {"async", "await", "base", "foreach", "get", "is", "object", "out", "readonly",
+                                    "ref", "sealed", "set", "string"},
+}
+
+# Parsers of the current process, by language (None if tree-sitter cannot parse it)
+_PARSERS = {}
+
+
+def get_parser(language: str):
+    """Return the tree-sitter parser of a benchmark language, or None if tree-sitter or the grammar is missing."""
+    if language not in _PARSERS:
+        parser = None
+        if language in TREE_SITTER_LANGUAGES:
+            try:
+                tree_sitter_languages = importlib.import_module("tree_sitter_languages")
+                # tree_sitter_languages loads its grammars with a deprecated tree_sitter call
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", FutureWarning)
+                    parser = tree_sitter_languages.get_parser(TREE_SITTER_LANGUAGES[language])
+            except ImportError:
+                parser = None
+        _PARSERS[language] = parser
+    return _PARSERS[language]
+
+
+def ast_available() -> bool:
+    """Return whether tree-sitter is installed, so ast_match can be computed."""
+    try:
+        importlib.import_module("tree_sitter_languages")
+        return True
+    except ImportError:
+        return False
+
+
+def get_metrics_version() -> str:
+    """Return the version of the metric definitions, which also tells whether ast_match was computed."""
+    return f"{METRICS_VERSION}" if ast_available() else f"{METRICS_VERSION}-noast"
+
+
+def hash_text(text: str) -> str:
+    """Return the SHA-256 hex digest of a text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_subtree_counts(text: str, language: str) -> Optional[Counter]:
+    """
+    Count the subtrees of the syntax tree of a text, by their shape.
+
+    A subtree is identified by the types of its named nodes, not by the identifiers or
+    literals in it, like the syntax match of CodeBLEU. Completions are parsed on their own;
+    tree-sitter recovers from the missing surrounding code with error nodes.
+
+    Returns:
+        Counter of subtree signatures, or None if the language cannot be parsed
+    """
+    parser = get_parser(language)
+    if parser is None:
+        return None
+    root = parser.parse(text.encode('utf-8')).root_node
+
+    signatures = {}
+    counts = Counter()
+    stack = [(root, False)]
+    # Post-order traversal, so the signatures of the children are known before their parent's
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.named_children)
+            continue
+        signature = hash((node.type, tuple(signatures.pop(child.id) for child in node.named_children)))
+        signatures[node.id] = signature
+        counts[signature] += 1
+    return counts
+
+
+@lru_cache(maxsize=4096)
+def get_text_features(text: str, language: str) -> Tuple[List[str], frozenset, Optional[Counter]]:
+    """Return the code tokens, identifiers and subtree counts of a text (cached, golden completions repeat)."""
+    tokens = TOKEN_PATTERN.findall(text)
+    keywords = LANGUAGE_KEYWORDS.get(language, set())
+    identifiers = frozenset(name for name in IDENTIFIER_PATTERN.findall(text) if name not in keywords)
+    return tokens, identifiers, get_subtree_counts(text, language)
+
+
+def edit_similarity(completion: str, golden: str) -> float:
+    """Return 1 - Levenshtein distance / length of the longer text."""
+    longest = max(len(completion), len(golden))
+    if longest == 0:
+        return 1.0
+    return 1.0 - Levenshtein.distance(completion, golden) / longest
+
+
+def bleu_score(candidate: List[str], reference: List[str], max_n: int = BLEU_MAX_N) -> float:
+    """
+    Sentence-level BLEU of candidate tokens against reference tokens.
+
+    Uses uniform weights up to max_n and the add-one smoothing of Lin & Och (2004) for the
+    orders above 1 (as the smoothed BLEU of CodeXGLUE), so short completions do not score 0.
+    """
+    if not candidate or not reference:
+        return 1.0 if candidate == reference else 0.0
+
+    log_precision = 0.0
+    for n in range(1, max_n + 1):
+        candidate_ngrams = Counter(tuple(candidate[i:i + n]) for i in range(len(candidate) - n + 1))
+        reference_ngrams = Counter(tuple(reference[i:i + n]) for i in range(len(reference) - n + 1))
+        matches = sum((candidate_ngrams & reference_ngrams).values())
+        total = sum(candidate_ngrams.values())
+        if n == 1:
+            if matches == 0:
+                return 0.0
+        else:
+            matches += 1
+            total += 1
+        log_precision += math.log(matches / total) / max_n
+
+    brevity_penalty = 1.0 if len(candidate) > len(reference) else math.exp(1 - len(reference) / len(candidate))
+    return brevity_penalty * math.exp(log_precision)
+
+
+def jaccard(first, second) -> float:
+    """Return |A & B| / |A | B| of two sets (1.0 if both are empty)."""
+    union = first | second
+    return len(first & second) / len(union) if union else 1.0
+
+
+def subtree_match(candidate: Counter, reference: Counter) -> float:
+    """Return the fraction of the reference subtrees also found in the candidate (counted with multiplicity)."""
+    total = sum(reference.values())
+    if total == 0:
+        return 1.0 if not candidate else 0.0
+    return sum((candidate & reference).values()) / total
+
+
+def score_pair(completion: str, golden: str, language: str) -> Dict[str, Optional[float]]:
+    """
+    Compute every metric of METRIC_NAMES for a completion against the golden completion.
+
+    Both texts are compared in full (after stripping surrounding whitespace); ast_match is
+    None when tree-sitter is not installed or does not know the language.
+    """
+    completion = (completion or "").strip()
+    golden = (golden or "").strip()
+    if completion == golden:
+        return {name: (None if name == "ast_match" and get_parser(language) is None else 1.0)
+                for name in METRIC_NAMES}
+
+    completion_tokens, completion_identifiers, completion_subtrees = get_text_features(completion, language)
+    golden_tokens, golden_identifiers, golden_subtrees = get_text_features(golden, language)
+    return {
+        "edit_similarity": edit_similarity(completion, golden),
+        "bleu": bleu_score(completion_tokens, golden_tokens),
+        "identifier_overlap": jaccard(completion_identifiers, golden_identifiers),
+        "ast_match": None if golden_subtrees is None else subtree_match(completion_subtrees, golden_subtrees),
+    }
+
+
+def score_batch(pairs: List[Tuple[str, str, str]]) -> List[Dict[str, Optional[float]]]:
+    """Score a batch of (completion, golden, language) pairs (the task run by the worker processes)."""
+    return [score_pair(completion, golden, language) for completion, golden, language in pairs]
+
+
+class MetricsCache:
+    """
+    Disk-backed cache of the metrics of (completion, golden completion) pairs.
+
+    Metrics are stored as JSON in a SQLite file keyed by the hashes of both texts and the
+    language, so only completions that were not scored before are computed again.
+    Entries of another metrics version are dropped when the cache is opened.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self.version = get_metrics_version()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS metrics (
+                    completion_hash TEXT NOT NULL,
+                    golden_hash TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    metrics TEXT NOT NULL,
+                    PRIMARY KEY (completion_hash, golden_hash, language)
+                )
+            """)
+            self.conn.execute("DELETE FROM metrics WHERE version != ?", (self.version,))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[Dict]:
+        """Return the cached metrics of a (completion hash, golden hash, language) key, or None on a miss."""
+        row = self.conn.execute(
+            "SELECT metrics FROM metrics WHERE completion_hash = ? AND golden_hash = ? AND language = ?",
+            key).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put_many(self, entries: List[Tuple[Tuple[str, str, str], Dict]]):
+        """Store the metrics of (key, metrics) entries."""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?, ?)",
+                                  [(*key, self.version, json.dumps(metrics)) for key, metrics in entries])
+
+
+def compute_metrics(pairs: List[Tuple[str, str, str]], workers: Optional[int] = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE, cache: Optional[MetricsCache] = None,
+                    verbose: bool = True) -> List[Dict[str, Optional[float]]]:
+    """
+    Compute the metrics of many (completion, golden, language) pairs.
+
+    Pairs are deduplicated by (completion hash, golden hash, language) and looked up in the
+    cache; the rest are scored in batches by a pool of worker processes, grouped by golden
+    completion so each worker tokenizes and parses a golden completion once.
+
+    Args:
+        pairs: List of (completion, golden completion, language) tuples
+        workers: Number of worker processes (default: CPU count; 1 scores in this process)
+        batch_size: Number of pairs per worker task
+        cache: MetricsCache the metrics are read from and stored in
+        verbose: Print how many pairs were scored and cached
+
+    Returns:
+        List of {metric name: value} dicts, in the order of pairs
+    """
+    keys = []
+    texts = {}
+    for completion, golden, language in pairs:
+        key = (hash_text(completion or ""), hash_text(golden or ""), language)
+        keys.append(key)
+        texts.setdefault(key, (completion or "", golden or "", language))
+
+    scores = {}
+    if cache is not None:
+        for key in texts:
+            cached = cache.get(key)
+            if cached is not None:
+                scores[key] = cached
+
+    missing = sorted((key for key in texts if key not in scores), key=lambda key: (key[2], key[1], key[0]))
+    batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+    workers = workers or os.cpu_count() or 1
+
+    if batches:
+        if not ast_available():
+            print("tree_sitter_languages is not installed, ast_match is not computed "
+                  "(pip install tree-sitter==0.21.3 tree_sitter_languages)")
+        if workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+                batch_scores = executor.map(score_batch, [[texts[key] for key in batch] for batch in batches])
+                for batch, results in zip(batches, batch_scores):
+                    scores.update(zip(batch, results))
+                    if cache is not None:
+                        cache.put_many(list(zip(batch, results)))
+        else:
+            for batch in batches:
+                results = score_batch([texts[key] for key in batch])
+                scores.update(zip(batch, results))
+                if cache is not None:
+                    cache.put_many(list(zip(batch, results)))
+
+    if verbose:
+        print(f"Computed the metrics of {len(pairs)} completions: {len(texts)} distinct, "
+              f"{len(texts) - len(missing)} cached, {len(missing)} scored"
+              + (f" with {min(workers, len(batches))} worker(s)" if batches else ""))
+    return [scores[key] for key in keys]
@@ -0,0 +1,352 @@
+import os
+import json
+from typing import Dict, List, Optional
+
+from benchmark_index import BENCHMARK_DIR, get_benchmark_index
+from jsonl_io import (COMPRESSION_CHOICES, find_jsonl_files, iter_jsonl, resolve_jsonl_path,
+                      strip_jsonl_extension, write_jsonl, write_jsonl_atomic)
+
+# Marker file written at the root of a normalized completion store
+STORE_MARKER = "store.json"
+STORE_FORMAT = "devbench-completion-store"
+STORE_VERSION = 1
+
+# Default location for a normalized store (keeps the "completions" prefix that the
+# evaluation scripts use to locate the language/category directories)
+DEFAULT_STORE_DIR = "completions_store"
+
+# Fields copied from the benchmark row into every legacy completion file
+BENCHMARK_FIELDS = ['id', 'testsource', 'language', 'prefix', 'suffix',
+                    'golden_completion', 'LLM_justification', 'assertions']
+
+
+def model_name_from_filename(file_path):
+    """Extract the model name from a '<category>-<model>.jsonl' file name (optionally compressed)."""
+    base_filename = os.path.basename(file_path)
+    if '-' not in base_filename:
+        return None
+    return strip_jsonl_extension(base_filename.split('-', 1)[1])
+
+
+def find_store_root(file_path) -> Optional[str]:
+    """
+    Return the store root for a completion file laid out as
+    <store>/<language>/<category>/<category>-<model>.jsonl, or None if the
+    file is a regular (denormalized) completion file.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(file_path))))
+    if os.path.exists(os.path.join(root, STORE_MARKER)):
+        return root
+    return None
+
+
+def is_completion_store(directory) -> bool:
+    """Check whether a directory is the root of a normalized completion store."""
+    return os.path.exists(os.path.join(directory, STORE_MARKER))
+
+
+def _load_store_info(store_root):
+    with open(os.path.join(store_root, STORE_MARKER), 'r', encoding='utf-8') as f:
+        info = json.load(f)
+    benchmark_dir = info.get("benchmark_dir") or BENCHMARK_DIR
+    if not os.path.isabs(benchmark_dir):
+        benchmark_dir = os.path.normpath(os.path.join(store_root, benchmark_dir))
+    info["benchmark_dir"] = benchmark_dir
+    return info
+
+
+def extract_model_completions(data, model_name):
+    """
+    Split a legacy completion row into the normalized completion record.
+
+    Args:
+        data: Parsed row from a legacy completion file
+        model_name: Model name the file was generated with
+
+    Returns:
+        Normalized record dictionary, or None if the row has no completions for the model
+    """
+    record = {"id": data.get("id")}
+    list_key = f"{model_name}_completions"
+
+    if isinstance(data.get(list_key), list):
+        completions = data[list_key]
+        record["layout"] = "multi"
+        record["completions"] = completions
+        # Keep the numbered fields only when they disagree with the list
+        indexed = []
+        i = 0
+        while f"{model_name}_completion_{i}" in data:
+            indexed.append(data[f"{model_name}_completion_{i}"])
+            i += 1
+        if indexed != completions:
+            record["indexed"] = indexed
+    elif f"{model_name}_completion_0" in data:
+        completions = []
+        i = 0
+        while f"{model_name}_completion_{i}" in data:
+            completions.append(data[f"{model_name}_completion_{i}"])
+            i += 1
+        record["layout"] = "indexed"
+        record["completions"] = completions
+    elif model_name in data:
+        record["layout"] = "single"
+        record["completions"] = [data[model_name]]
+    else:
+        return None
+
+    # Any other per-row metadata the generator attached (e.g. seeds, latencies)
+    meta = {key: value for key, value in data.items()
+            if key not in BENCHMARK_FIELDS and key != model_name
+            and not key.startswith(f"{model_name}_completion")}
+    if meta:
+        record["meta"] = meta
+    return record
+
+
+def expand_record(record, model_name, benchmark_row=None):
+    """
+    Rebuild a legacy-shaped completion row from a normalized record.
+
+    Args:
+        record: Normalized completion record
+        model_name: Model name the record belongs to
+        benchmark_row: Benchmark test case to merge in (None to only return id and completion fields)
+
+    Returns:
+        Dictionary shaped like a row of the original completion files
+    """
+    data = dict(benchmark_row) if benchmark_row else {"id": record.get("id")}
+    data.update(record.get("overrides", {}))
+
+    completions = record.get("completions", [])
+    layout = record.get("layout", "multi")
+    if layout == "single":
+        data[model_name] = completions[0] if completions else ""
+    else:
+        indexed = record.get("indexed", completions)
+        for i, completion in enumerate(indexed):
+            data[f"{model_name}_completion_{i}"] = completion
+        if layout == "multi":
+            data[f"{model_name}_completions"] = completions
+
+    data.update(record.get("meta", {}))
+    return data
+
+
+def read_store_records(file_path) -> List[Dict]:
+    """Read the normalized records of a store file."""
+    return list(iter_jsonl(file_path))
+
+
+def read_completion_rows(file_path, include_benchmark=True) -> List[Dict]:
+    """
+    Read a completion file and return rows in the legacy completion format.
+
+    Works for both regular completion files and files in a normalized store. For
+    store files, the benchmark fields are joined back in from the benchmark index
+    unless include_benchmark is False (callers that only need the completions).
+
+    Args:
+        file_path: Path to a '<category>-<model>.jsonl' completion file
+        include_benchmark: Whether store rows should include the benchmark fields
+
+    Returns:
+        List of row dictionaries
+    """
+    store_root = find_store_root(file_path)
+    if store_root is None:
+        return list(iter_jsonl(file_path))
+
+    model_name = model_name_from_filename(file_path)
+    parts = os.path.normpath(os.path.abspath(file_path)).split(os.sep)
+    language, category = parts[-3], parts[-2]
+    benchmark_index = get_benchmark_index(_load_store_info(store_root)["benchmark_dir"]) if include_benchmark else None
+
+    rows = []
+    for record in read_store_records(file_path):
+        benchmark_row = None
+        if benchmark_index is not None:
+            benchmark_row = benchmark_index.get(language, category, record.get("id"))
+            if benchmark_row is None:
+                print(f"Warning: Test ID {record.get('id')} not found in benchmark for {language}/{category}")
+        rows.append(expand_record(record, model_name, benchmark_row))
+    return rows
+
+
+class CompletionStore:
+    """
+    Normalized completion store.
+
+    Completions are stored once per (language, category, test id, model, sample index) in
+    <store>/<language>/<category>/<category>-<model>.jsonl, one line per test id:
+
+        {"id": "1", "layout": "multi", "completions": ["...", "..."]}
+
+    The benchmark row (prefix, suffix, assertions, ...) is not duplicated; it is joined back
+    in from the benchmark index when a legacy-shaped row is requested.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, benchmark_dir=None, compression='none'):
+        self.store_dir = store_dir
+        # Compression used for newly written files ('none', 'gz' or 'zst')
+        self.extension = '.jsonl' + COMPRESSION_CHOICES[compression]
+        if is_completion_store(store_dir):
+            info = _load_store_info(store_dir)
+            self.benchmark_dir = benchmark_dir or info["benchmark_dir"]
+        else:
+            self.benchmark_dir = os.path.abspath(benchmark_dir or BENCHMARK_DIR)
+        self._records = {}
+
+    def initialize(self):
+        """Create the store directory and its marker file."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        marker_path = os.path.join(self.store_dir, STORE_MARKER)
+        if not os.path.exists(marker_path):
+            with open(marker_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "format": STORE_FORMAT,
+                    "version": STORE_VERSION,
+                    "benchmark_dir": os.path.relpath(self.benchmark_dir, os.path.abspath(self.store_dir)),
+                }, f, indent=2)
+
+    def file_path(self, language, category, model):
+        """Path of the store file for a model, preferring an existing (possibly compressed) file."""
+        return resolve_jsonl_path(os.path.join(self.store_dir, language, category, f"{category}-{model}{self.extension}"))
+
+    def models(self, language, category) -> List[str]:
+        """List models that have completions for a language/category."""
+        category_dir = os.path.join(self.store_dir, language, category)
+        if not os.path.isdir(category_dir):
+            return []
+        return sorted(model_name_from_filename(path) for path in find_jsonl_files(category_dir)
+                      if os.path.basename(path).startswith(f"{category}-"))
+
+    def _load(self, language, category, model):
+        key = (language, category, model)
+        if key not in self._records:
+            path = self.file_path(language, category, model)
+            records = read_store_records(path) if os.path.exists(path) else []
+            self._records[key] = {str(record.get("id")): record for record in records}
+        return self._records[key]
+
+    def completions(self, language, category, model) -> Dict[str, List[str]]:
+        """Return {test id: [completion per sample]} for one model."""
+        return {test_id: record.get("completions", [])
+                for test_id, record in self._load(language, category, model).items()}
+
+    def get(self, language, category, test_id, model, sample_index=0) -> Optional[str]:
+        """Fetch a single completion by (language, category, test id, model, sample index)."""
+        record = self._load(language, category, model).get(str(test_id))
+        if record is None or sample_index >= len(record.get("completions", [])):
+            return None
+        return record["completions"][sample_index]
+
+    def rows(self, language, category, model, include_benchmark=True) -> List[Dict]:
+        """Return legacy-shaped completion rows for one model, in store order."""
+        return read_completion_rows(self.file_path(language, category, model), include_benchmark)
+
+    def write_records(self, language, category, model, records):
+        """Write the normalized records for one (language, category, model) file."""
+        path = os.path.join(self.store_dir, language, category, f"{category}-{model}{self.extension}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_jsonl_atomic(path, records)
+        self._records.pop((language, category, model), None)
+
+
+def import_completions(completions_dir, store_dir=DEFAULT_STORE_DIR, benchmark_dir=None, verbose=True,
+                       compression='none'):
+    """
+    Import legacy completion files into a normalized completion store.
+
+    Args:
+        completions_dir: Directory with <language>/<category>/<category>-<model>.jsonl files
+        store_dir: Destination store directory
+        benchmark_dir: Benchmark directory used to verify and rejoin the benchmark fields
+        verbose: Whether to print per-file progress
+        compression: Compression for the store files ('none', 'gz' or 'zst')
+
+    Returns:
+        Dictionary with import statistics
+    """
+    store = CompletionStore(store_dir, benchmark_dir, compression)
+    store.initialize()
+    benchmark_index = get_benchmark_index(store.benchmark_dir)
+
+    stats = {"files": 0, "rows": 0, "completions": 0, "bytes_in": 0, "bytes_out": 0}
+
+    for file_path in find_jsonl_files(completions_dir):
+        model_name = model_name_from_filename(file_path)
+        if not model_name:
+            print(f"Warning: Couldn't extract model name from {file_path}")
+            continue
+
+        parts = os.path.normpath(file_path).split(os.sep)
+        language, category = parts[-3], parts[-2]
+
+        records = []
+        for data in iter_jsonl(file_path):
+            record = extract_model_completions(data, model_name)
+            if record is None:
+                print(f"Warning: No completions for {model_name} (id {data.get('id')}) in {file_path}")
+                continue
+
+            # Keep any benchmark field that differs from the current benchmark row
+            benchmark_row = benchmark_index.get(language, category, data.get("id")) or {}
+            overrides = {key: data[key] for key in BENCHMARK_FIELDS
+                         if key in data and benchmark_row.get(key) != data[key]}
+            overrides.pop("id", None)
+            if overrides:
+                record["overrides"] = overrides
+
+            records.append(record)
+            stats["completions"] += len(record["completions"])
+
+        store.write_records(language, category, model_name, records)
+        stats["files"] += 1
+        stats["rows"] += len(records)
+        stats["bytes_in"] += os.path.getsize(file_path)
+        stats["bytes_out"] += os.path.getsize(store.file_path(language, category, model_name))
+        if verbose:
+            print(f"Imported {len(records)} rows from {file_path}")
+
+    ratio = stats["bytes_in"] / stats["bytes_out"] if stats["bytes_out"] else 0
+    print(f"\nImported {stats['files']} files, {stats['rows']} rows, {stats['completions']} completions")
+    print(f"Size: {stats['bytes_in'] / 1e6:.1f} MB -> {stats['bytes_out'] / 1e6:.1f} MB ({ratio:.1f}x smaller)")
+    return stats
+
+
+def export_completions(store_dir, completions_dir, verbose=True):
+    """Write legacy completion files (benchmark row + model fields) from a normalized store."""
+    for file_path in find_jsonl_files(store_dir):
+        relative_path = os.path.relpath(file_path, store_dir)
+        output_path = os.path.join(completions_dir, relative_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        write_jsonl(output_path, read_completion_rows(file_path))
+        if verbose:
+            print(f"Exported {output_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the normalized completion store')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Import legacy completion files into a store')
+    import_parser.add_argument('--completions', default='completions', help='Legacy completions directory (default: completions)')
+    import_parser.add_argument('--store', default=DEFAULT_STORE_DIR, help=f'Store directory (default: {DEFAULT_STORE_DIR})')
+    import_parser.add_argument('--benchmark', default=None, help='Benchmark directory (default: benchmark)')
+    import_parser.add_argument('--compress', choices=list(COMPRESSION_CHOICES), default='none',
+                               help='Compression for the store files: none, gz or zst (default: none)')
+
+    export_parser = subparsers.add_parser('export', help='Write legacy completion files from a store')
+    export_parser.add_argument('--store', default=DEFAULT_STORE_DIR, help=f'Store directory (default: {DEFAULT_STORE_DIR})')
+    export_parser.add_argument('--output', required=True, help='Output directory for the legacy files')
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        import_completions(args.completions, args.store, args.benchmark, compression=args.compress)
+    elif args.command == 'export':
+        export_completions(args.store, args.output)
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -11,6 +12,12 @@ import numpy as np
 from collections import Counter
 import ast
 
+# Make the shared repository-level modules importable when run from this directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmark_index import get_benchmark_index, split_benchmark_path
+from jsonl_io import is_jsonl_file, open_text
+from results_warehouse import ResultsWarehouse
+
 def calculate_ast_depth_python(code_string):
     """Calculate AST depth for Python code."""
     try:
@@ -119,9 +126,9 @@ def count_tokens(code_string):
     return len(get_tokens_list(code_string))
 
 def load_jsonl_data(file_path):
-    """Load data from a JSONL file."""
+    """Load data from a JSONL file (plain, .jsonl.gz or .jsonl.zst)."""
     data = []
-    with open(file_path, 'r', encoding='utf-8') as f:
+    with open_text(file_path, 'r') as f:
         for line in f:
             try:
                 data.append(json.loads(line.strip()))
@@ -488,7 +495,7 @@ def count_tests_in_assertions(assertions_string, language):
     print(f"Total test count for {language}: {result}")
     return result
 
-def analyze_benchmark_data(metrics=None):
+def analyze_benchmark_data(metrics=None, warehouse=None):
     """
     Analyze complexity metrics in benchmark data.
     
@@ -496,6 +503,7 @@ def analyze_benchmark_data(metrics=None):
         metrics (dict): Dictionary of metrics to compute and visualize.
                        Set a metric to True to enable it, False to disable it.
                        If None, only the essential metrics will be enabled.
+        warehouse (str): Optional path to a results warehouse to store the per test case metrics in.
     """
     # Set default metrics - only essential ones enabled by default
     default_metrics = {
@@ -543,6 +551,12 @@ def analyze_benchmark_data(metrics=None):
         print(f"Benchmark directory not found at {benchmark_dir}")
         return
     
+    # Benchmark records are served from the shared cached index
+    benchmark_index = get_benchmark_index(str(benchmark_dir))
+    
+    # Per test case metrics, as (language, category, test id, metrics) for the warehouse
+    case_metrics = []
+    
     # Data structure to hold results
     results = {
         "python": {},
@@ -562,7 +576,7 @@ def analyze_benchmark_data(metrics=None):
     # Walk through benchmark directory
     for root, dirs, files in os.walk(benchmark_dir):
         for file in files:
-            if file.endswith(".jsonl") and not file.endswith("_formatted.jsonl"):
+            if is_jsonl_file(file):
                 file_path = os.path.join(root, file)
                 
                 # Determine language from path
@@ -574,7 +588,7 @@ def analyze_benchmark_data(metrics=None):
                 
                 if language:
                     try:
-                        data = load_jsonl_data(file_path)
+                        data = benchmark_index.records_for_file(file_path)
                         for item in data:
                             if "prefix" in item:
                                 prefix = item["prefix"]
@@ -689,9 +703,16 @@ def analyze_benchmark_data(metrics=None):
                                 # Store computed metrics
                                 for metric_name, value in metrics_data.items():
                                     results[language][metric_name].append(value)
+                                case_metrics.append((language, split_benchmark_path(file_path)[1], item.get("id"), metrics_data))
                     except Exception as e:
                         print(f"Error processing {file_path}: {str(e)}")
     
+    # Store the per test case metrics in the results warehouse
+    if warehouse:
+        with ResultsWarehouse(warehouse) as results_warehouse:
+            stored = results_warehouse.ingest_complexity_metrics(case_metrics)
+        print(f"Stored {stored} complexity metric values in {warehouse}")
+    
     # Create DataFrames for visualization
     dataframes = {}
     
@@ -736,6 +757,13 @@ def analyze_benchmark_data(metrics=None):
     # No plots will be generated
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Calculate complexity metrics for the benchmark test cases')
+    parser.add_argument('--warehouse', type=str, default=None,
+                        help='Path to a results warehouse (SQLite) to store per test case metrics in')
+    args = parser.parse_args()
+    
     # Disable plot generation and only print selected metrics
     metrics = {
         'prefix_length': True,          # Lines in prefix
@@ -766,6 +794,6 @@ if __name__ == "__main__":
     dataframes = {}
     
     # Analyze benchmark data with modified metrics
-    analyze_benchmark_data(metrics)
+    analyze_benchmark_data(metrics, warehouse=args.warehouse)
 
 
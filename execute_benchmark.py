@@ -8,6 +8,13 @@ import json
 import argparse
 import time
 
+from benchmark_index import get_benchmark_index, split_benchmark_path
+from bootstrap import bootstrap_ci, stratified_bootstrap_ci
+from completion_store import read_completion_rows
+from jsonl_io import dedupe_jsonl_variants, is_jsonl_file, open_text, strip_jsonl_extension
+from results_warehouse import ResultsWarehouse
+from subset_selection import estimate_full_score, load_subset, stratum_of, subset_test_ids
+
 dotenv.load_dotenv()
 
 def comb(n, k):
@@ -25,6 +32,7 @@ def comb(n, k):
 def find_jsonl_files(directory):
     """
     Find all JSONL files in the specified directory (excluding _formatted.jsonl files).
+    Compressed .jsonl.gz/.jsonl.zst files are included.
 
     Args:
         directory: Path to the directory to search
@@ -35,9 +43,9 @@ def find_jsonl_files(directory):
     jsonl_files = []
     for root, _, files in os.walk(directory):
         for file in files:
-            if file.endswith('.jsonl') and not file.endswith('_formatted.jsonl'):
+            if is_jsonl_file(file):
                 jsonl_files.append(os.path.join(root, file))
-    return jsonl_files
+    return dedupe_jsonl_variants(jsonl_files)
 
 def calculate_pass_at_k(n: int, c: int, k: int) -> float:
     """
@@ -1861,7 +1869,8 @@ def run_csharp_test_case(prefix: str, golden_completion: str, suffix: str,
             print("  Using simple dotnet run for basic case...")
         return run_csharp_test_case_simple(prefix, golden_completion, suffix, assertions, verbose, timeout)
 
-def execute_test_cases(jsonl_files: List[str], language="python", verbose=True, report_file=None) -> Dict:
+def execute_test_cases(jsonl_files: List[str], language="python", verbose=True, report_file=None,
+                       test_ids=None) -> Dict:
     """
     Execute test cases from the benchmark JSONL files for any supported language.
 
@@ -1870,6 +1879,7 @@ def execute_test_cases(jsonl_files: List[str], language="python", verbose=True,
         language: Programming language of the test cases (default: python)
         verbose: Whether to print detailed information during execution
         report_file: Path to file for saving detailed test results
+        test_ids: Optional collection of test IDs to run (all test cases if None)
 
     Returns:
         Dict: Summary of execution results
@@ -1902,96 +1912,96 @@ def execute_test_cases(jsonl_files: List[str], language="python", verbose=True,
                 report_fp.write("-" * 80 + "\n")
 
             try:
-                with open(jsonl_file, 'r', encoding='utf-8') as f:
-                    for i, line in enumerate(f, 1):
-                        try:
-                            test_case = json.loads(line)
-                            results["total_cases"] += 1
+                for i, test_case in enumerate(get_benchmark_index().records_for_file(jsonl_file), 1):
+                    if test_ids is not None and str(test_case.get('id')) not in test_ids:
+                        continue
+                    try:
+                        results["total_cases"] += 1
 
-                            # Debug test case details
-                            if verbose:
-                                print(f"Running test case #{i} (ID: {test_case['id']})...")
+                        # Debug test case details
+                        if verbose:
+                            print(f"Running test case #{i} (ID: {test_case['id']})...")
 
-                            # Get test case components
-                            prefix = test_case["prefix"]
-                            golden_completion = test_case["golden_completion"]
-                            suffix = test_case["suffix"]
-                            assertions = test_case.get("assertions", "")
+                        # Get test case components
+                        prefix = test_case["prefix"]
+                        golden_completion = test_case["golden_completion"]
+                        suffix = test_case["suffix"]
+                        assertions = test_case.get("assertions", "")
 
-                            # Write test case info to report
+                        # Write test case info to report
+                        if report_fp:
+                            report_fp.write(f"\nTEST CASE #{i} (ID: {test_case['id']})\n")
+                            report_fp.write(f"  Source: {test_case.get('testsource', 'Unknown')}\n\n")
+
+                        # Execute the test case with language-specific function
+                        if language.lower() == "java":
+                            success, error_msg = run_java_test_case(
+                                prefix, golden_completion, suffix, assertions, verbose
+                            )
+                        elif language.lower() == "javascript":
+                            success, error_msg = run_javascript_test_case(
+                                prefix, golden_completion, suffix, assertions, verbose
+                            )
+                        elif language.lower() == "typescript":
+                            success, error_msg = run_typescript_test_case(
+                                prefix, golden_completion, suffix, assertions, verbose
+                            )
+                        elif language.lower() == "c_sharp" or language.lower() == "csharp" or language.lower() == "c#":
+                            success, error_msg = run_csharp_test_case(
+                                prefix, golden_completion, suffix, assertions, verbose
+                            )
+                        elif language.lower() == "cpp" or language.lower() == "c++":
+                            success, error_msg = run_cpp_test_case(
+                                prefix, golden_completion, suffix, assertions, verbose
+                            )
+                        else:  # Default to Python for other languages
+                            success, error_msg = run_python_test_case(
+                                prefix, golden_completion, suffix, assertions, verbose
+                            )
+
+                        if success:
+                            results["successful_cases"] += 1
+                            if verbose:
+                                print(f"Test case #{i} (ID: {test_case['id']}) passed ✓")
                             if report_fp:
-                                report_fp.write(f"\nTEST CASE #{i} (ID: {test_case['id']})\n")
-                                report_fp.write(f"  Source: {test_case.get('testsource', 'Unknown')}\n\n")
-
-                            # Execute the test case with language-specific function
-                            if language.lower() == "java":
-                                success, error_msg = run_java_test_case(
-                                    prefix, golden_completion, suffix, assertions, verbose
-                                )
-                            elif language.lower() == "javascript":
-                                success, error_msg = run_javascript_test_case(
-                                    prefix, golden_completion, suffix, assertions, verbose
-                                )
-                            elif language.lower() == "typescript":
-                                success, error_msg = run_typescript_test_case(
-                                    prefix, golden_completion, suffix, assertions, verbose
-                                )
-                            elif language.lower() == "c_sharp" or language.lower() == "csharp" or language.lower() == "c#":
-                                success, error_msg = run_csharp_test_case(
-                                    prefix, golden_completion, suffix, assertions, verbose
-                                )
-                            elif language.lower() == "cpp" or language.lower() == "c++":
-                                success, error_msg = run_cpp_test_case(
-                                    prefix, golden_completion, suffix, assertions, verbose
-                                )
-                            else:  # Default to Python for other languages
-                                success, error_msg = run_python_test_case(
-                                    prefix, golden_completion, suffix, assertions, verbose
-                                )
-
-                            if success:
-                                results["successful_cases"] += 1
-                                if verbose:
-                                    print(f"Test case #{i} (ID: {test_case['id']}) passed ✓")
-                                if report_fp:
-                                    report_fp.write("  RESULT: PASS\n\n")
-                            else:
-                                results["failed_cases"] += 1
-                                results["failures"].append({
-                                    "file": jsonl_file,
-                                    "test_id": test_case['id'],
-                                    "error": error_msg
-                                })
-                                if verbose:
-                                    print(f"Test case #{i} (ID: {test_case['id']}) failed")
-                                    print(f"  Error: {error_msg}")
-                                if report_fp:
-                                    report_fp.write("  RESULT: FAIL\n")
-                                    report_fp.write(f"  ERROR: {error_msg}\n\n")
-
-                                    # Include the test case code in the report for debugging
-                                    report_fp.write("  PREFIX CODE:\n")
-                                    report_fp.write("  " + prefix.replace("\n", "\n  ") + "\n\n")
-                                    report_fp.write("  GOLDEN COMPLETION:\n")
-                                    report_fp.write("  " + golden_completion.replace("\n", "\n  ") + "\n\n")
-                                    report_fp.write("  SUFFIX CODE:\n")
-                                    report_fp.write("  " + suffix.replace("\n", "\n  ") + "\n\n")
-                                    report_fp.write("  ASSERTIONS:\n")
-                                    report_fp.write("  " + assertions.replace("\n", "\n  ") + "\n\n")
-
-                        except Exception as e:
+                                report_fp.write("  RESULT: PASS\n\n")
+                        else:
                             results["failed_cases"] += 1
                             results["failures"].append({
                                 "file": jsonl_file,
-                                "test_id": f"{i}",
-                                "error": str(e)
+                                "test_id": test_case['id'],
+                                "error": error_msg
                             })
                             if verbose:
-                                print(f"Error processing test case #{i}: {str(e)}")
+                                print(f"Test case #{i} (ID: {test_case['id']}) failed")
+                                print(f"  Error: {error_msg}")
                             if report_fp:
-                                report_fp.write(f"\nTEST CASE #{i}\n")
-                                report_fp.write("  RESULT: ERROR\n")
-                                report_fp.write(f"  ERROR: {str(e)}\n\n")
+                                report_fp.write("  RESULT: FAIL\n")
+                                report_fp.write(f"  ERROR: {error_msg}\n\n")
+
+                                # Include the test case code in the report for debugging
+                                report_fp.write("  PREFIX CODE:\n")
+                                report_fp.write("  " + prefix.replace("\n", "\n  ") + "\n\n")
+                                report_fp.write("  GOLDEN COMPLETION:\n")
+                                report_fp.write("  " + golden_completion.replace("\n", "\n  ") + "\n\n")
+                                report_fp.write("  SUFFIX CODE:\n")
+                                report_fp.write("  " + suffix.replace("\n", "\n  ") + "\n\n")
+                                report_fp.write("  ASSERTIONS:\n")
+                                report_fp.write("  " + assertions.replace("\n", "\n  ") + "\n\n")
+
+                    except Exception as e:
+                        results["failed_cases"] += 1
+                        results["failures"].append({
+                            "file": jsonl_file,
+                            "test_id": f"{i}",
+                            "error": str(e)
+                        })
+                        if verbose:
+                            print(f"Error processing test case #{i}: {str(e)}")
+                        if report_fp:
+                            report_fp.write(f"\nTEST CASE #{i}\n")
+                            report_fp.write("  RESULT: ERROR\n")
+                            report_fp.write(f"  ERROR: {str(e)}\n\n")
             except Exception as e:
                 print(f"Error processing file {jsonl_file}: {str(e)}")
                 if report_fp:
@@ -2043,9 +2053,58 @@ def execute_test_cases(jsonl_files: List[str], language="python", verbose=True,
 
     return results
 
+def pass_at_k_with_ci(pass_at_k_scores: List[float], confidence: float = 0.95) -> Tuple[float, float, float]:
+    """
+    Average per test case pass@k scores, with a bootstrap confidence interval over the test cases.
+
+    Args:
+        pass_at_k_scores: pass@k score of each test case
+        confidence: Confidence level of the interval
+
+    Returns:
+        Tuple of (pass@k, lower_ci, upper_ci), all 0.0 if there are no scores
+    """
+    if not pass_at_k_scores:
+        return 0.0, 0.0, 0.0
+    lower, upper = bootstrap_ci(pass_at_k_scores, confidence=confidence)
+    return sum(pass_at_k_scores) / len(pass_at_k_scores), lower, upper
+
+def print_subset_estimates(subset: Dict, case_scores: Dict, pass_at_k: int = 1, confidence: float = 0.95) -> Dict:
+    """
+    Print the estimated full-benchmark score of each model from its results on a subset.
+
+    Args:
+        subset: Subset definition (see subset_selection.load_subset)
+        case_scores: {model: {"language/category": [per test case pass@k scores]}}
+        pass_at_k: k used for the scores
+        confidence: Confidence level of the intervals
+
+    Returns:
+        Dict: {model: {"estimate", "ci_lower", "ci_upper", "evaluated_cases", "represented_cases"}}
+    """
+    estimates = {}
+    print(f"\n{'='*80}")
+    print(f"ESTIMATED FULL-BENCHMARK SCORES (SUBSET '{subset.get('name', 'custom')}', {int(confidence*100)}% CI)")
+    print(f"{'='*80}")
+    for model_name, scores_by_stratum in case_scores.items():
+        estimate, lower, upper = estimate_full_score(subset, scores_by_stratum, confidence)
+        evaluated = sum(len(scores) for scores in scores_by_stratum.values())
+        represented = sum(size for stratum, size in subset["strata"].items() if scores_by_stratum.get(stratum))
+        estimates[model_name] = {
+            "estimate": round(estimate, 4),
+            "ci_lower": round(lower, 4),
+            "ci_upper": round(upper, 4),
+            "evaluated_cases": evaluated,
+            "represented_cases": represented
+        }
+        print(f"  {model_name}: Pass@{pass_at_k} ~ {estimate:.3f} [{lower:.3f}, {upper:.3f}] "
+              f"({evaluated} cases run, representing {represented})")
+    print(f"  Subset error bound (overall score): +/-{subset.get('error_bound', 0):.3f}")
+    return estimates
+
 def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="completions/python",
                              verbose=True, report_file=None, models_filter=None, json_output_file=None,
-                             pass_at_k=1) -> Dict:
+                             pass_at_k=1, warehouse=None, run_label=None, subset=None) -> Dict:
     """
     Execute Python test cases using model completions instead of golden completions.
 
@@ -2057,6 +2116,10 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
         models_filter: List of model names to filter by (if None, all models are used)
         json_output_file: Path to JSON file for saving detailed results
         pass_at_k: Number of samples to consider for pass@k evaluation
+        warehouse: Optional path to a results warehouse to ingest the per test case results into
+        run_label: Label of the warehouse run (e.g. shared by the languages of one sweep)
+        subset: Optional subset definition; only its test cases are run and the full-benchmark
+            score is estimated from them
 
     Returns:
         Dict: Summary of execution results by model
@@ -2104,7 +2167,7 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
             path_parts = benchmark_file.split(os.sep)
             category = None
             for i, part in enumerate(path_parts):
-                if part.endswith('.jsonl'):
+                if is_jsonl_file(part):
                     # Use immediate parent directory as category
                     category = path_parts[i-1]
 
@@ -2132,7 +2195,7 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
                 }
 
             # For api_usage/api_usage.jsonl, we want to find api_usage/api_usage-*.jsonl
-            base_name = os.path.basename(benchmark_file).replace('.jsonl', '')
+            base_name = strip_jsonl_extension(os.path.basename(benchmark_file))
             completion_dir = os.path.join(models_dir, category)
             os.makedirs(completion_dir, exist_ok=True)
 
@@ -2142,10 +2205,10 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
 
             # Find all model completion files for this category
             model_files = {}
-            for file in os.listdir(completion_dir):
-                if file.startswith(f"{base_name}-") and file.endswith('.jsonl'):
+            for file in dedupe_jsonl_variants(os.listdir(completion_dir)):
+                if file.startswith(f"{base_name}-") and is_jsonl_file(file):
                     # Extract model name from file name
-                    model_name = file.replace(f"{base_name}-", "").replace(".jsonl", "")
+                    model_name = strip_jsonl_extension(file).replace(f"{base_name}-", "")
 
                     # Skip if models_filter is provided and this model doesn't match any filter
                     if models_filter and not any(model_filter in model_name.lower() for model_filter in models_filter):
@@ -2195,12 +2258,9 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
                 for model, path in model_files.items():
                     print(f"  - {model}: {path}")
 
-            # Load benchmark test cases
-            benchmark_tests = []
+            # Load benchmark test cases from the shared cached index
             try:
-                with open(benchmark_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        benchmark_tests.append(json.loads(line))
+                benchmark_tests = get_benchmark_index().records_for_file(benchmark_file)
 
                 if verbose:
                     print(f"Loaded {len(benchmark_tests)} benchmark test cases from {benchmark_file}")
@@ -2208,6 +2268,17 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
                 print(f"Error loading benchmark test cases from {benchmark_file}: {str(e)}")
                 continue
 
+            # Restrict to the subset cases (completions are matched to test cases by position)
+            subset_positions = None
+            if subset is not None:
+                selected_ids = subset_test_ids(subset, benchmark_file) or set()
+                subset_positions = [idx for idx, test in enumerate(benchmark_tests) if str(test.get("id")) in selected_ids]
+                benchmark_tests = [benchmark_tests[idx] for idx in subset_positions]
+                if verbose:
+                    print(f"Running {len(benchmark_tests)} subset test cases from {benchmark_file}")
+                if not benchmark_tests:
+                    continue
+
             # Update total cases count for this category
             results["categories"][category]["total_cases"] += len(benchmark_tests)
             detailed_results["categories"][category]["total_cases"] += len(benchmark_tests)
@@ -2216,19 +2287,20 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
             all_model_completions = {}
             for model_name, model_file in model_files.items():
                 try:
-                    with open(model_file, 'r', encoding='utf-8') as f:
-                        model_completions = []
-                        for line in f:
-                            json_data = json.loads(line)
-                            # Check if we have multiple completions (for pass@k evaluation)
-                            completions_list = json_data.get(f"{model_name}_completions", None)
-                            if completions_list and isinstance(completions_list, list) and len(completions_list) > 1:
-                                # Multiple completions available - store the whole entry with completions list
-                                model_completions.append(json_data)
-                            else:
-                                # Single completion - extract completion using the model name as the key
-                                completion = json_data.get(model_name, "")
-                                model_completions.append({"completion": completion})
+                    model_completions = []
+                    # Works for both regular completion files and the normalized completion store
+                    for json_data in read_completion_rows(model_file):
+                        # Check if we have multiple completions (for pass@k evaluation)
+                        completions_list = json_data.get(f"{model_name}_completions", None)
+                        if completions_list and isinstance(completions_list, list) and len(completions_list) > 1:
+                            # Multiple completions available - store the whole entry with completions list
+                            model_completions.append(json_data)
+                        else:
+                            # Single completion - extract completion using the model name as the key
+                            completion = json_data.get(model_name, "")
+                            model_completions.append({"completion": completion})
+                    if subset_positions is not None:
+                        model_completions = [model_completions[idx] for idx in subset_positions if idx < len(model_completions)]
                     all_model_completions[model_name] = model_completions
                     if verbose:
                         print(f"Loaded {len(model_completions)} completions from {model_file}")
@@ -2552,7 +2624,8 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
 
         # Calculate average pass@k score
         pass_at_k_scores = model_results["pass_at_k_cases"]
-        avg_pass_at_k = sum(pass_at_k_scores) / len(pass_at_k_scores) if pass_at_k_scores else 0.0
+        avg_pass_at_k, lower_ci, upper_ci = pass_at_k_with_ci(pass_at_k_scores)
+        model_results["pass_at_k_ci"] = [lower_ci, upper_ci]
 
         model_pass_at_k_rates.append((model_name, avg_pass_at_k, success_rate, model_results))
 
@@ -2560,8 +2633,9 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
     model_pass_at_k_rates.sort(key=lambda x: x[1], reverse=True)
 
     for model_name, avg_pass_at_k, success_rate, model_results in model_pass_at_k_rates:
+        lower_ci, upper_ci = model_results["pass_at_k_ci"]
         print(f"{model_name}:")
-        print(f"  Pass@{pass_at_k}: {avg_pass_at_k:.3f}")
+        print(f"  Pass@{pass_at_k}: {avg_pass_at_k:.3f} (95% CI: {lower_ci:.3f}-{upper_ci:.3f})")
         print(f"  Success rate: {success_rate:.2f}%")
         print(f"  Total completions: {model_results['total_completions']}")
         print(f"  Correct completions: {model_results['correct_completions']}")
@@ -2589,7 +2663,8 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
                 success_rate = model_category_results["successful_cases"] / total * 100
                 # Calculate average pass@k score for this category
                 pass_at_k_scores = model_category_results["pass_at_k_cases"]
-                avg_pass_at_k = sum(pass_at_k_scores) / len(pass_at_k_scores) if pass_at_k_scores else 0.0
+                avg_pass_at_k, lower_ci, upper_ci = pass_at_k_with_ci(pass_at_k_scores)
+                model_category_results["pass_at_k_ci"] = [lower_ci, upper_ci]
                 category_model_rates.append((model_name, avg_pass_at_k, success_rate, model_category_results))
 
         # Sort by pass@k score in descending order
@@ -2599,18 +2674,31 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
             total = model_category_results["successful_cases"] + model_category_results["failed_cases"]
             timeout_pct = model_category_results["timeout_cases"] / max(model_category_results["failed_cases"], 1) * 100 if model_category_results["failed_cases"] > 0 else 0
 
+            lower_ci, upper_ci = model_category_results["pass_at_k_ci"]
             print(f"  {model_name}:")
-            print(f"    Pass@{pass_at_k}: {avg_pass_at_k:.3f}")
+            print(f"    Pass@{pass_at_k}: {avg_pass_at_k:.3f} (95% CI: {lower_ci:.3f}-{upper_ci:.3f})")
             print(f"    Success rate: {success_rate:.2f}%")
             print(f"    Successful test cases: {model_category_results['successful_cases']}/{total}")
             print(f"    Timeout failures: {model_category_results['timeout_cases']} ({timeout_pct:.1f}% of failures)")
 
+    # Estimate the full-benchmark scores from the subset results
+    if subset is not None:
+        subset_case_scores = {}
+        for model_name, model_results in detailed_results["models"].items():
+            for test_case in model_results["test_cases"]:
+                language = split_benchmark_path(test_case["file"])[0]
+                stratum = stratum_of(language, test_case["category"])
+                subset_case_scores.setdefault(model_name, {}).setdefault(stratum, []).append(test_case["pass_at_k_score"])
+        results["subset_case_scores"] = subset_case_scores
+        results["subset_estimates"] = print_subset_estimates(subset, subset_case_scores, pass_at_k)
+
     # Write results to JSON file if specified
     if json_output_file:
         try:
             # Prepare final JSON output with calculated metrics
             json_output = {
                 "total_cases": detailed_results["total_cases"],
+                "pass_at_k": pass_at_k,
                 "models": {},
                 "categories": {}
             }
@@ -2621,7 +2709,12 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
                 success_rate = model_results["successful_cases"] / total * 100 if total > 0 else 0
                 timeout_pct = model_results["timeout_cases"] / max(model_results["failed_cases"], 1) * 100 if model_results["failed_cases"] > 0 else 0
 
+                avg_pass_at_k, lower_ci, upper_ci = pass_at_k_with_ci(model_results["pass_at_k_cases"])
+
                 json_output["models"][model_name] = {
+                    "pass_at_k": round(avg_pass_at_k, 4),
+                    "pass_at_k_ci_lower": round(lower_ci, 4),
+                    "pass_at_k_ci_upper": round(upper_ci, 4),
                     "success_rate": round(success_rate, 2),
                     "successful_cases": model_results["successful_cases"],
                     "failed_cases": model_results["failed_cases"],
@@ -2643,7 +2736,12 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
                         success_rate = model_category_results["successful_cases"] / total * 100
                         timeout_pct = model_category_results["timeout_cases"] / max(model_category_results["failed_cases"], 1) * 100 if model_category_results["failed_cases"] > 0 else 0
 
+                        avg_pass_at_k, lower_ci, upper_ci = pass_at_k_with_ci(model_category_results["pass_at_k_cases"])
+
                         json_output["categories"][category]["models"][model_name] = {
+                            "pass_at_k": round(avg_pass_at_k, 4),
+                            "pass_at_k_ci_lower": round(lower_ci, 4),
+                            "pass_at_k_ci_upper": round(upper_ci, 4),
                             "success_rate": round(success_rate, 2),
                             "successful_cases": model_category_results["successful_cases"],
                             "failed_cases": model_category_results["failed_cases"],
@@ -2653,7 +2751,10 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
                             "test_cases": detailed_results["categories"][category]["models"][model_name]["test_cases"]
                         }
 
-            with open(json_output_file, 'w', encoding='utf-8') as json_fp:
+            if subset is not None:
+                json_output["subset_estimates"] = results["subset_estimates"]
+
+            with open_text(json_output_file, 'w') as json_fp:
                 json.dump(json_output, json_fp, indent=2)
 
             if verbose:
@@ -2662,6 +2763,17 @@ def execute_model_completions(benchmark_jsonl_files: List[str], models_dir="comp
         except Exception as e:
             print(f"Error writing results to JSON file: {e}")
 
+    # Ingest the per test case results into the results warehouse if specified
+    if warehouse and detailed_results["models"]:
+        try:
+            with ResultsWarehouse(warehouse) as results_warehouse:
+                run_id = results_warehouse.ingest_execution_results(
+                    detailed_results["models"], run_label, json_output_file, pass_at_k)
+            if verbose:
+                print(f"\nResults ingested into {warehouse} (run {run_id})")
+        except Exception as e:
+            print(f"Error ingesting results into warehouse: {e}")
+
     return results
 
 def main():
@@ -2682,8 +2794,15 @@ def main():
                        help='Evaluate pass@k where k is the number of samples to consider (default: 1)')
     parser.add_argument('--language', type=str, default='python', choices=['python', 'javascript', 'c_sharp', 'cpp', 'typescript', 'java', 'all'],
                         help='Programming language for benchmark execution (use "all" for all languages with --model-eval)')
+    parser.add_argument('--warehouse', type=str, default=None,
+                        help='Path to a results warehouse (SQLite) to ingest model evaluation results into')
+    parser.add_argument('--run-label', type=str, default=None,
+                        help='Label for the warehouse run (default: timestamp)')
+    parser.add_argument('--subset', type=str, default=None,
+                        help='Only run the cases of a subset (name in subsets/ or path, e.g. "quick") and estimate the full-benchmark score (with --model-eval)')
 
     args = parser.parse_args()
+    run_label = args.run_label or time.strftime("%Y-%m-%d %H:%M:%S")
 
     if not args.execute:
         print("Error: --execute flag is required to run this script.")
@@ -2697,6 +2816,16 @@ def main():
         print("in the root directory with the format API_KEY=your_api_key. These will be")
         print("available to the test cases during execution.\n")
 
+    # Load the quick-eval subset if requested
+    subset = None
+    if args.subset:
+        if not args.model_eval:
+            print("Error: --subset is only supported with --model-eval")
+            return
+        subset = load_subset(args.subset)
+        subset.setdefault("name", args.subset)
+        print(f"Using subset '{subset['name']}': {subset['total_cases']} of {subset['benchmark_cases']} test cases")
+
     # Handle 'all' language option for non-model-eval execution
     if args.language == 'all' and not args.model_eval:
         print("Error: --language all is only supported with --model-eval")
@@ -2738,53 +2867,34 @@ def main():
     # If a specific test ID is provided, filter for just that test case
     if args.id:
         print(f"Looking for test case with ID: {args.id}")
-        # We'll collect the test case here if found
-        found_test_case = None
         found_file_path = None
 
-        # Search through all relevant files for the specified test ID
+        # Look the test ID up in the cached benchmark index instead of re-parsing every file
+        benchmark_index = get_benchmark_index()
         for jsonl_file in jsonl_files:
-            with open(jsonl_file, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    try:
-                        test_case = json.loads(line)
-                        if str(test_case.get('id')) == str(args.id):
-                            found_test_case = test_case
-                            found_file_path = jsonl_file
-                            print(f"Found test case with ID {args.id} in file {jsonl_file}")
-                            break
-                    except json.JSONDecodeError:
-                        print(f"Warning: Invalid JSON at line {line_num} in {jsonl_file}")
-
-            if found_test_case:
+            category = os.path.basename(os.path.dirname(jsonl_file))
+            if benchmark_index.find(args.id, args.language, [category]):
+                found_file_path = jsonl_file
+                print(f"Found test case with ID {args.id} in file {jsonl_file}")
                 break
 
-        if not found_test_case:
+        if not found_file_path:
             print(f"No test case found with ID: {args.id}")
             return
 
-        # Set up a temporary JSONL file with just the one test case
-        temp_jsonl = "temp_single_test.jsonl"
-        with open(temp_jsonl, 'w', encoding='utf-8') as f:
-            f.write(json.dumps(found_test_case) + '\n')
-
-        try:
-            # Execute just this single test case
-            results = execute_test_cases(
-                [temp_jsonl],
-                language=args.language,
-                verbose=args.verbose,
-                report_file=args.report
-            )
+        # Execute just this single test case
+        execute_test_cases(
+            [found_file_path],
+            language=args.language,
+            verbose=args.verbose,
+            report_file=args.report,
+            test_ids={str(args.id)}
+        )
 
-            # Print source file information
-            print(f"\nTest case ID {args.id} from file: {found_file_path}")
+        # Print source file information
+        print(f"\nTest case ID {args.id} from file: {found_file_path}")
 
-            return
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_jsonl):
-                os.remove(temp_jsonl)
+        return
 
     # If model evaluation is requested
     if args.model_eval:
@@ -2838,13 +2948,20 @@ def main():
                     report_file=lang_report_file,
                     models_filter=models_filter,
                     json_output_file=lang_json_file,
-                    pass_at_k=args.pass_at_k
+                    pass_at_k=args.pass_at_k,
+                    warehouse=args.warehouse,
+                    run_label=run_label,
+                    subset=subset
                 )
 
                 # Aggregate results
                 overall_results["languages"][lang] = lang_results
                 overall_results["total_cases"] += lang_results.get("total_cases", 0)
 
+                # Collect subset scores so the estimate covers all languages
+                for model_name, scores_by_stratum in lang_results.get("subset_case_scores", {}).items():
+                    overall_results.setdefault("subset_case_scores", {}).setdefault(model_name, {}).update(scores_by_stratum)
+
                 # Aggregate model results
                 for model_name, model_data in lang_results.get("models", {}).items():
                     if model_name not in overall_results["models"]:
@@ -2893,9 +3010,16 @@ def main():
                 if total > 0:
                     pass_at_k_scores = model_data["pass_at_k_cases"]
                     avg_pass_at_k = sum(pass_at_k_scores) / len(pass_at_k_scores) if pass_at_k_scores else 0.0
+                    # The test cases of each language are resampled separately (stratified bootstrap)
+                    _, lower_ci, upper_ci = stratified_bootstrap_ci({
+                        lang: lang_data["models"][model_name]["pass_at_k_cases"]
+                        for lang, lang_data in overall_results["languages"].items()
+                        if model_name in lang_data.get("models", {})
+                    }) if pass_at_k_scores else (0.0, 0.0, 0.0)
+                    model_data["pass_at_k_ci"] = [lower_ci, upper_ci]
                     success_rate = model_data["successful_cases"] / total * 100
                     print(f"\n{model_name}:")
-                    print(f"  Pass@{args.pass_at_k}: {avg_pass_at_k:.3f}")
+                    print(f"  Pass@{args.pass_at_k}: {avg_pass_at_k:.3f} (95% CI: {lower_ci:.3f}-{upper_ci:.3f})")
                     print(f"  Success rate: {success_rate:.2f}%")
                     print(f"  Successful: {model_data['successful_cases']}/{total}")
 
@@ -2907,9 +3031,10 @@ def main():
                     total = model_cat_data["successful_cases"] + model_cat_data["failed_cases"]
                     if total > 0:
                         pass_at_k_scores = model_cat_data["pass_at_k_cases"]
-                        avg_pass_at_k = sum(pass_at_k_scores) / len(pass_at_k_scores) if pass_at_k_scores else 0.0
+                        avg_pass_at_k, lower_ci, upper_ci = pass_at_k_with_ci(pass_at_k_scores)
+                        model_cat_data["pass_at_k_ci"] = [lower_ci, upper_ci]
                         success_rate = model_cat_data["successful_cases"] / total * 100
-                        print(f"    {model_name}: Pass@{args.pass_at_k}={avg_pass_at_k:.3f}, Success={success_rate:.1f}%")
+                        print(f"    {model_name}: Pass@{args.pass_at_k}={avg_pass_at_k:.3f} [{lower_ci:.3f}, {upper_ci:.3f}], Success={success_rate:.1f}%")
 
             print(f"\nRESULTS BY LANGUAGE:")
             for lang, lang_data in overall_results["languages"].items():
@@ -2918,13 +3043,18 @@ def main():
                     total = model_data["successful_cases"] + model_data["failed_cases"]
                     if total > 0:
                         pass_at_k_scores = model_data["pass_at_k_cases"]
-                        avg_pass_at_k = sum(pass_at_k_scores) / len(pass_at_k_scores) if pass_at_k_scores else 0.0
+                        avg_pass_at_k, lower_ci, upper_ci = pass_at_k_with_ci(pass_at_k_scores)
                         success_rate = model_data["successful_cases"] / total * 100
-                        print(f"  {model_name}: Pass@{args.pass_at_k}={avg_pass_at_k:.3f}, Success={success_rate:.1f}% ({model_data['successful_cases']}/{total})")
+                        print(f"  {model_name}: Pass@{args.pass_at_k}={avg_pass_at_k:.3f} [{lower_ci:.3f}, {upper_ci:.3f}], Success={success_rate:.1f}% ({model_data['successful_cases']}/{total})")
+
+            # Estimate the full-benchmark scores across all languages from the subset
+            if subset is not None and overall_results.get("subset_case_scores"):
+                overall_results["subset_estimates"] = print_subset_estimates(
+                    subset, overall_results["subset_case_scores"], args.pass_at_k)
 
             # Save overall JSON if specified
             if args.json_output:
-                with open(args.json_output, 'w') as f:
+                with open_text(args.json_output, 'w') as f:
                     json.dump(overall_results, f, indent=2)
                 print(f"\nOverall JSON results saved to {args.json_output}")
 
@@ -2938,7 +3068,10 @@ def main():
             report_file=args.report,
             models_filter=models_filter,
             json_output_file=args.json_output,
-            pass_at_k=args.pass_at_k
+            pass_at_k=args.pass_at_k,
+            warehouse=args.warehouse,
+            run_label=run_label,
+            subset=subset
         )
         return
 
@@ -1,50 +1,138 @@
 import json
 import os
-from openai import AzureOpenAI
-import dotenv
-# Add imports for Azure AI Inference SDK
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
-import openai
-import requests
-import anthropic
-import glob
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
 import re
+import time
+from types import SimpleNamespace
 import argparse  # Import for command-line argument parsing
 
-# Import Azure identity for token-based authentication
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-
-dotenv.load_dotenv()
-
-# Parse command-line arguments
-parser = argparse.ArgumentParser(description='Generate completions for code benchmarks')
-parser.add_argument('--output_dir', type=str, default='completions',
-                    help='Output directory for completions (default: completions)')
-parser.add_argument('--temperature', type=float, default=0.0,
-                    help='Temperature for model generation (default: 0.0)')
-parser.add_argument('--num_completions', type=int, default=1,
-                    help='Number of completions to generate per test case (default: 1)')
-args = parser.parse_args()
+# The provider SDKs (openai, anthropic, azure-ai-inference) are imported when their client
+# is first built, so the prompt and formatting helpers can be imported cheaply
+from local_model import BACKEND_CHOICES, load_local_model
+from jsonl_io import (COMPRESSION_CHOICES, find_jsonl_files, iter_jsonl, open_text, read_jsonl, resolve_jsonl_path,
+                      strip_jsonl_extension, write_jsonl_atomic)
+from request_scheduler import estimate_tokens, get_scheduler, print_scheduler_stats
+from response_cache import ResponseCache, make_cache_key
+from results_warehouse import ResultsWarehouse
 
+# Generation settings, overridden from the command line by main() (see apply_args)
 # Output directory for completions
-OUTPUT_DIR = args.output_dir  # Set from command-line arguments
+OUTPUT_DIR = "completions"
 # Temperature for model generation
-TEMPERATURE = args.temperature  # Set from command-line arguments
+TEMPERATURE = 0.0
 # Number of completions per test case
-NUM_COMPLETIONS = args.num_completions  # Set from command-line arguments
-
-print(f"Using output directory: {OUTPUT_DIR}")
-print(f"Using temperature: {TEMPERATURE}")
-print(f"Using num_completions: {NUM_COMPLETIONS}")
+NUM_COMPLETIONS = 1
+# Extension of the output JSONL files (.jsonl, .jsonl.gz or .jsonl.zst)
+OUTPUT_EXTENSION = '.jsonl'
+# Maximum number of requests in flight per deployment (a deployment entry may override it with "max_in_flight")
+MAX_IN_FLIGHT = 8
+# Rate limits per deployment (a deployment entry may override them with "requests_per_minute"/"tokens_per_minute")
+REQUESTS_PER_MINUTE = None
+TOKENS_PER_MINUTE = None
+# Retries of throttled or transiently failing requests
+MAX_RETRIES = 6
+# Maximum completion tokens per request
+MAX_TOKENS = 800
+# Base sampling seed, sample i of a prompt is requested with SEED + i
+SEED = None
+# Whether model responses are read from and written to the response cache
+USE_CACHE = True
+# Stream the responses and stop reading once the completion is over (see CompletionTerminator)
+STREAM = False
+# Results warehouse (SQLite) to ingest generated completions into
+WAREHOUSE = None
+# Marker written in place of a completion when a request failed after all retries
+ERROR_MARKER = "Error: API request failed"
+# Shared response cache, opened on first use unless --no_cache is given
+RESPONSE_CACHE = None
+RESPONSE_CACHE_LOCK = threading.Lock()
+
+def parse_args(argv=None):
+    """Parse the command-line arguments of the generation script."""
+    parser = argparse.ArgumentParser(description='Generate completions for code benchmarks')
+    parser.add_argument('--output_dir', type=str, default='completions',
+                        help='Output directory for completions (default: completions)')
+    parser.add_argument('--temperature', type=float, default=0.0,
+                        help='Temperature for model generation (default: 0.0)')
+    parser.add_argument('--num_completions', type=int, default=1,
+                        help='Number of completions to generate per test case (default: 1)')
+    parser.add_argument('--compress', type=str, default='none', choices=list(COMPRESSION_CHOICES),
+                        help='Compress the output JSONL files: none, gz or zst (default: none)')
+    parser.add_argument('--warehouse', type=str, default=None,
+                        help='Path to a results warehouse (SQLite) to ingest generated completions into')
+    parser.add_argument('--max_in_flight', type=int, default=8,
+                        help='Maximum number of concurrent requests per deployment (default: 8)')
+    parser.add_argument('--requests_per_minute', type=float, default=None,
+                        help='Requests per minute allowed per deployment (default: unlimited)')
+    parser.add_argument('--tokens_per_minute', type=float, default=None,
+                        help='Estimated tokens per minute allowed per deployment (default: unlimited)')
+    parser.add_argument('--max_retries', type=int, default=6,
+                        help='Maximum retries of a throttled or failed request (default: 6)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Base sampling seed; sample i of a prompt uses seed + i and the seeds are recorded (default: no seed)')
+    parser.add_argument('--repair', action='store_true',
+                        help='Re-request only the failed completions found by the validation scan and patch them in place')
+    parser.add_argument('--no_cache', '--no-cache', dest='no_cache', action='store_true',
+                        help='Do not read or write the response cache (always send the requests)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream the responses, stop at the end of the first code block and record '
+                             'time to first token and latency per request')
+    parser.add_argument('--local_model', type=str, default=None,
+                        help='Add a deployment served from a local model: a GGUF file (llama.cpp) or a '
+                             'Hugging Face model directory (transformers, CPU)')
+    parser.add_argument('--local_model_name', type=str, default=None,
+                        help='Deployment name of the local model (default: the model file or directory name)')
+    parser.add_argument('--local_backend', type=str, default='auto', choices=list(BACKEND_CHOICES),
+                        help='Backend of the local model (default: auto, llama_cpp for .gguf files)')
+    parser.add_argument('--models', type=str, nargs='+', default=None,
+                        help='Only generate with these deployments (default: all)')
+    return parser.parse_args(argv)
+
+def apply_args(args):
+    """Set the module-level generation settings from parsed command-line arguments."""
+    global OUTPUT_DIR, TEMPERATURE, NUM_COMPLETIONS, OUTPUT_EXTENSION, MAX_IN_FLIGHT
+    global REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, MAX_RETRIES, SEED, USE_CACHE, WAREHOUSE, STREAM
+
+    OUTPUT_DIR = args.output_dir
+    TEMPERATURE = args.temperature
+    NUM_COMPLETIONS = args.num_completions
+    OUTPUT_EXTENSION = '.jsonl' + COMPRESSION_CHOICES[args.compress]
+    MAX_IN_FLIGHT = max(1, args.max_in_flight)
+    REQUESTS_PER_MINUTE = args.requests_per_minute
+    TOKENS_PER_MINUTE = args.tokens_per_minute
+    MAX_RETRIES = args.max_retries
+    SEED = args.seed
+    USE_CACHE = not args.no_cache
+    WAREHOUSE = args.warehouse
+    STREAM = args.stream
+
+    if args.local_model:
+        name = args.local_model_name or os.path.basename(os.path.normpath(args.local_model))
+        if name.lower().endswith('.gguf'):
+            name = name[:-len('.gguf')]
+        DEPLOYMENTS.append({"name": name, "type": MODEL_TYPE_LOCAL, "model_path": args.local_model,
+                            "backend": args.local_backend})
+    if args.models:
+        unknown = set(args.models) - {deployment_info["name"] for deployment_info in DEPLOYMENTS}
+        if unknown:
+            print(f"Warning: unknown deployments: {', '.join(sorted(unknown))}")
+        DEPLOYMENTS[:] = [deployment_info for deployment_info in DEPLOYMENTS if deployment_info["name"] in args.models]
+
+    print(f"Using output directory: {OUTPUT_DIR}")
+    print(f"Using temperature: {TEMPERATURE}")
+    print(f"Using num_completions: {NUM_COMPLETIONS}")
+    print(f"Using max_in_flight per deployment: {MAX_IN_FLIGHT}")
+    if STREAM:
+        print("Using streaming responses")
 
 # Hardcoded Azure OpenAI Endpoint and API Key
 ENDPOINT = "[ANONYMIZED-ENDPOINT-1]"
 
 # Add Claude API configuration
-CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
+CLAUDE_API_KEY_ENV = "CLAUDE_API_KEY"
 
 # Add Claude endpoints and model names (only approved models)
 CLAUDE_37_MODEL = "claude-3-7-sonnet-20250219"
@@ -62,7 +150,7 @@ MINISTRAL_MODEL = "Ministral-3B"
 MODEL_TYPE_MINISTRAL = "ministral_3b"
 
 # Add API key environment variable
-MINISTRAL_API_KEY = os.getenv("MINISTRAL_API_KEY")
+MINISTRAL_API_KEY_ENV = "MINISTRAL_API_KEY"
 
 # Add DeepSeek V3 (0324 version) endpoint and model details
 DEEPSEEK_V3_ENDPOINT = "[ANONYMIZED-ENDPOINT-6]"
@@ -72,7 +160,7 @@ DEEPSEEK_V3_MODEL = "DeepSeek-V3-0324"
 MODEL_TYPE_DEEPSEEK_V3 = "deepseek_v3"
 
 # Add API key environment variable
-DEEPSEEK_V3_API_KEY = os.getenv("DEEPSEEK_V3_API_KEY")
+DEEPSEEK_V3_API_KEY_ENV = "DEEPSEEK_V3_API_KEY"
 
 # Add DeepSeek V3.1 endpoint and model details
 DEEPSEEK_V31_ENDPOINT = "[ANONYMIZED-ENDPOINT-7]"
@@ -82,7 +170,7 @@ DEEPSEEK_V31_MODEL = "DeepSeek-V3.1"
 MODEL_TYPE_DEEPSEEK_V31 = "deepseek_v31"
 
 # Add API key environment variable
-DEEPSEEK_V31_API_KEY = os.getenv("DEEPSEEK_V31_API_KEY")
+DEEPSEEK_V31_API_KEY_ENV = "DEEPSEEK_V31_API_KEY"
 
 # Add GPT-4.1 mini endpoint and model details
 GPT41MINI_ENDPOINT = "[ANONYMIZED-ENDPOINT-8]"
@@ -94,7 +182,7 @@ GPT41MINI_API_VERSION = "2025-01-01-preview"
 MODEL_TYPE_GPT41MINI = "gpt41_mini"
 
 # Add API key environment variable for GPT-4.1 mini
-GPT41MINI_API_KEY = os.getenv("GPT41MINI_API_KEY")
+GPT41MINI_API_KEY_ENV = "GPT41MINI_API_KEY"
 
 # Add GPT-4.1 endpoint and model details
 GPT41_ENDPOINT = "[ANONYMIZED-ENDPOINT-9]"
@@ -106,7 +194,7 @@ GPT41_API_VERSION = "2025-01-01-preview"
 MODEL_TYPE_GPT41 = "gpt41"
 
 # Add API key environment variable for GPT-4.1
-GPT41_API_KEY = os.getenv("GPT41_API_KEY")
+GPT41_API_KEY_ENV = "GPT41_API_KEY"
 
 # Add GPT-4.1 nano endpoint and model details
 GPT41NANO_ENDPOINT = "[ANONYMIZED-ENDPOINT-10]"
@@ -118,7 +206,7 @@ GPT41NANO_API_VERSION = "2025-01-01-preview"
 MODEL_TYPE_GPT41NANO = "gpt41_nano"
 
 # Add API key environment variable for GPT-4.1 nano
-GPT41NANO_API_KEY = os.getenv("GPT41NANO_API_KEY")
+GPT41NANO_API_KEY_ENV = "GPT41NANO_API_KEY"
 
 # Add GPT-4o endpoint and model details
 GPT4O_ENDPOINT = "[ANONYMIZED-ENDPOINT-11]"
@@ -130,7 +218,18 @@ GPT4O_API_VERSION = "2025-01-01-preview"
 MODEL_TYPE_GPT4O = "gpt4o"
 
 # Add API key environment variable (loaded from .env)
-GPT4O_API_KEY = os.getenv("GPT4O_API_KEY")
+GPT4O_API_KEY_ENV = "GPT4O_API_KEY"
+
+# Model type of local models (llama.cpp or transformers), served by local_model.py. A local deployment
+# entry also has a "model_path" and optionally a "backend"; --local_model adds one to DEPLOYMENTS
+MODEL_TYPE_LOCAL = "local"
+
+# Model types whose API returns several samples from one request (n parameter)
+NATIVE_N_MODEL_TYPES = [MODEL_TYPE_GPT4O, MODEL_TYPE_GPT41, MODEL_TYPE_GPT41MINI, MODEL_TYPE_GPT41NANO,
+                        MODEL_TYPE_LOCAL]
+
+# Model types whose API has no seed parameter
+UNSEEDED_MODEL_TYPES = [MODEL_TYPE_CLAUDE_37, MODEL_TYPE_CLAUDE_4]
 
 # Add to DEPLOYMENTS list
 DEPLOYMENTS = [
@@ -175,69 +274,117 @@ languages = [
 ]
 
 
-API_KEY = os.getenv("COMPLETIONS_API_KEY")
+API_KEY_ENV = "COMPLETIONS_API_KEY"
 
 # # Initialize Azure OpenAI Client
 # client = AzureOpenAI(
 #     azure_endpoint=ENDPOINT,
-#     api_key=API_KEY,
+#     api_key=os.getenv(API_KEY_ENV),
 #     api_version="2024-12-01-preview",
 # )
 
-# Initialize GPT-4.1 mini client with Azure AD authentication
-token_provider = get_bearer_token_provider(
-    DefaultAzureCredential(),
-    "https://cognitiveservices.azure.com/.default"
-)
-
-# Initialize Claude client
-claude_client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
-
-# Initialize Ministral-3B client
-ministral_client = ChatCompletionsClient(
-    endpoint=MINISTRAL_ENDPOINT,
-    credential=AzureKeyCredential(MINISTRAL_API_KEY),
-)
-
-# Initialize DeepSeek V3 (0324) client
-deepseek_v3_client = ChatCompletionsClient(
-    endpoint=DEEPSEEK_V3_ENDPOINT,
-    credential=AzureKeyCredential(DEEPSEEK_V3_API_KEY),
-)
-
-# Initialize DeepSeek V3.1 client
-deepseek_v31_client = ChatCompletionsClient(
-    endpoint=DEEPSEEK_V31_ENDPOINT,
-    credential=AzureKeyCredential(DEEPSEEK_V31_API_KEY),
-)
-
-# Initialize GPT-4.1 mini client with API key authentication
-gpt41mini_client = AzureOpenAI(
-    azure_endpoint=GPT41MINI_ENDPOINT,
-    api_key=GPT41MINI_API_KEY,
-    api_version=GPT41MINI_API_VERSION,
-)
-
-# Initialize GPT-4.1 client with API key authentication
-gpt41_client = AzureOpenAI(
-    azure_endpoint=GPT41_ENDPOINT,
-    api_key=GPT41_API_KEY,
-    api_version=GPT41_API_VERSION,
-)
-
-# Initialize GPT-4.1 nano client with API key authentication
-gpt41nano_client = AzureOpenAI(
-    azure_endpoint=GPT41NANO_ENDPOINT,
-    api_key=GPT41NANO_API_KEY,
-    api_version=GPT41NANO_API_VERSION,
-)
-
-# Initialize GPT-4o client with API key authentication
-gpt4o_client = AzureOpenAI(
-    api_version=GPT4O_API_VERSION,
-    azure_endpoint=GPT4O_ENDPOINT,
-    api_key=GPT4O_API_KEY,
-)
+# Clients are built by get_client() the first time a deployment is used and then shared by
+# all threads. Retries are disabled in the clients, they are handled by the shared request
+# scheduler, and the HTTP connection pools are sized for MAX_IN_FLIGHT concurrent requests.
+
+def get_connection_pool_size():
+    """Return the number of pooled HTTP connections a client needs for its concurrent requests."""
+    return max([MAX_IN_FLIGHT] + [get_max_in_flight(deployment_info) for deployment_info in DEPLOYMENTS])
+
+def build_azure_openai_client(endpoint, api_key_env, api_version):
+    """Build an Azure OpenAI client with API key authentication and a pooled HTTP client."""
+    import httpx
+    from openai import AzureOpenAI, DefaultHttpxClient
+
+    pool_size = get_connection_pool_size()
+    return AzureOpenAI(
+        azure_endpoint=endpoint,
+        api_key=os.getenv(api_key_env),
+        api_version=api_version,
+        max_retries=0,
+        http_client=DefaultHttpxClient(limits=httpx.Limits(max_connections=pool_size,
+                                                           max_keepalive_connections=pool_size)),
+    )
+
+def build_inference_client(endpoint, api_key_env):
+    """Build an Azure AI Inference client with API key authentication and a pooled HTTP session."""
+    import requests
+    from azure.ai.inference import ChatCompletionsClient
+    from azure.core.credentials import AzureKeyCredential
+    from azure.core.pipeline.transport import RequestsTransport
+
+    pool_size = get_connection_pool_size()
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    return ChatCompletionsClient(
+        endpoint=endpoint,
+        credential=AzureKeyCredential(os.getenv(api_key_env)),
+        retry_total=0,
+        transport=RequestsTransport(session=session, session_owner=False),
+    )
+
+def build_claude_client():
+    """Build the Anthropic client with a pooled HTTP client."""
+    import anthropic
+    import httpx
+
+    pool_size = get_connection_pool_size()
+    return anthropic.Anthropic(
+        api_key=os.getenv(CLAUDE_API_KEY_ENV),
+        max_retries=0,
+        http_client=anthropic.DefaultHttpxClient(limits=httpx.Limits(max_connections=pool_size,
+                                                                     max_keepalive_connections=pool_size)),
+    )
+
+def get_endpoint(name, default):
+    """
+    Return the endpoint of a deployment, overridden by the environment variable of the same name.
+
+    Read when the client is built, so overrides set in .env (loaded by main()) are applied.
+    """
+    return os.getenv(name, default)
+
+# Client builders by client name
+CLIENT_BUILDERS = {
+    # Claude client (shared by Claude 3.7 and Claude 4)
+    "claude": build_claude_client,
+    # Ministral-3B client
+    "ministral": lambda: build_inference_client(get_endpoint("MINISTRAL_ENDPOINT", MINISTRAL_ENDPOINT), MINISTRAL_API_KEY_ENV),
+    # DeepSeek V3 (0324) client
+    "deepseek_v3": lambda: build_inference_client(get_endpoint("DEEPSEEK_V3_ENDPOINT", DEEPSEEK_V3_ENDPOINT), DEEPSEEK_V3_API_KEY_ENV),
+    # DeepSeek V3.1 client
+    "deepseek_v31": lambda: build_inference_client(get_endpoint("DEEPSEEK_V31_ENDPOINT", DEEPSEEK_V31_ENDPOINT), DEEPSEEK_V31_API_KEY_ENV),
+    # GPT-4.1 mini client
+    "gpt41mini": lambda: build_azure_openai_client(get_endpoint("GPT41MINI_ENDPOINT", GPT41MINI_ENDPOINT), GPT41MINI_API_KEY_ENV, GPT41MINI_API_VERSION),
+    # GPT-4.1 client
+    "gpt41": lambda: build_azure_openai_client(get_endpoint("GPT41_ENDPOINT", GPT41_ENDPOINT), GPT41_API_KEY_ENV, GPT41_API_VERSION),
+    # GPT-4.1 nano client
+    "gpt41nano": lambda: build_azure_openai_client(get_endpoint("GPT41NANO_ENDPOINT", GPT41NANO_ENDPOINT), GPT41NANO_API_KEY_ENV, GPT41NANO_API_VERSION),
+    # GPT-4o client
+    "gpt4o": lambda: build_azure_openai_client(get_endpoint("GPT4O_ENDPOINT", GPT4O_ENDPOINT), GPT4O_API_KEY_ENV, GPT4O_API_VERSION),
+}
+
+# Clients built so far, by client name
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_client(name, builder=None):
+    """
+    Return the shared client of a provider, building it on first use.
+
+    Args:
+        name: Client name (a key of CLIENT_BUILDERS)
+        builder: Optional callable building the client, for clients not in CLIENT_BUILDERS
+
+    Returns:
+        The client, reused by all threads and tasks
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(name)
+        if client is None:
+            client = (builder or CLIENT_BUILDERS[name])()
+            _CLIENTS[name] = client
+        return client
 
 def get_prompt_template(prefix, suffix):
     """
@@ -384,7 +531,7 @@ def process_jsonl_file(input_file: str, output_file: str, deployment: str) -> No
         output_file: Path to output text file
         deployment: The model deployment name
     """
-    with open(input_file, 'r', encoding='utf-8') as f_in:
+    with open_text(input_file, 'r') as f_in:
         with open(output_file, 'w', encoding='utf-8') as f_out:
             for line_number, line in enumerate(f_in, 1):
                 # Write separator for each test case
@@ -419,8 +566,260 @@ def process_jsonl_file(input_file: str, output_file: str, deployment: str) -> No
                     sys.stdout = original_stdout
                     output_buffer.close()
 
+def get_sample_indices(sample_indices=None):
+    """Return the sample indices to request: the given ones, or all NUM_COMPLETIONS samples."""
+    return list(sample_indices) if sample_indices is not None else list(range(NUM_COMPLETIONS))
+
+def format_completions(completions, sample_indices=None):
+    """
+    Shape the completions returned by a model call.
+
+    Returns:
+        The completion string in single-completion mode, otherwise the list of
+        completions (one per requested sample index)
+    """
+    if sample_indices is None and NUM_COMPLETIONS == 1:
+        return completions[0]
+    return completions
+
+def get_sample_seed(sample_index):
+    """Return the seed of a sample, or None when no --seed is given."""
+    return None if SEED is None else SEED + sample_index
+
+def seed_kwargs(seed):
+    """Return the seed request argument, or no argument when there is no seed."""
+    return {} if seed is None else {"seed": seed}
+
+def get_sample_seeds(deployment_info, sample_indices=None):
+    """
+    Return the seed each sample was requested with, for recording in the output.
+
+    Samples of a native-n request share the seed of the request; providers without
+    a seed parameter get None.
+    """
+    samples = get_sample_indices(sample_indices)
+    if SEED is None or deployment_info["type"] in UNSEEDED_MODEL_TYPES:
+        return [None] * len(samples)
+    if deployment_info["type"] in NATIVE_N_MODEL_TYPES:
+        return [get_sample_seed(samples[0])] * len(samples)
+    return [get_sample_seed(i) for i in samples]
+
+def extract_choice_contents(response):
+    """Return the message contents of all choices of a chat completions response."""
+    return [choice.message.content for choice in response.choices]
+
+# Shortest suffix line the echo heuristic looks for; shorter lines ("}", "else:", "end") are too common
+MIN_ECHO_LINE_LENGTH = 8
+
+def get_echo_line(suffix):
+    """
+    Return the first significant line of the suffix, stripped, or None if there is none.
+
+    Lines without an identifier character (closing braces, brackets, separators) or shorter
+    than MIN_ECHO_LINE_LENGTH are skipped: in C-like languages and Python they occur in
+    almost every completion, so they say nothing about the model repeating the suffix.
+    """
+    for line in (suffix or "").split('\n'):
+        line = line.strip()
+        if len(line) >= MIN_ECHO_LINE_LENGTH and re.search(r'[A-Za-z_]', line):
+            return line
+    return None
+
+class CompletionTerminator:
+    """
+    Follow one streamed completion and decide when the rest of the stream can be dropped.
+
+    A completion that opens with a fenced code block is over once the block closes;
+    clean_markdown_formatting discards everything after the closing fence anyway, so the
+    cleaned completion is the same as without streaming. A completion without a fence is
+    stopped when it starts repeating the first significant line of the suffix (see
+    get_echo_line), which the prompt tells the model not to do; the repeated part is dropped.
+    """
+
+    def __init__(self, suffix=""):
+        self.text = ""
+        self.done = False
+        self.stopped_early = False
+        self.echo_line = get_echo_line(suffix)
+        # Whether the completion opens with a code fence, unknown until its first characters arrive
+        self.fenced = None
+        self.in_block = False
+        self.line_start = 0
+
+    def feed(self, delta):
+        """Append a streamed piece of text and check the lines it completes."""
+        if self.done:
+            return
+        self.text += delta
+        if self.fenced is None:
+            head = self.text.lstrip()
+            if len(head) >= 3 or (head and not "```".startswith(head)):
+                self.fenced = head.startswith("```")
+            else:
+                return
+
+        while not self.done:
+            end = self.text.find('\n', self.line_start)
+            if end < 0:
+                return
+            line = self.text[self.line_start:end]
+            if self.fenced:
+                # Same markers as clean_markdown_formatting
+                if not self.in_block:
+                    self.in_block = line.lstrip().startswith("```")
+                elif line.rstrip() == "```":
+                    self.stop(end)
+            elif line.strip() == self.echo_line and self.text[:self.line_start].strip():
+                self.stop(self.line_start - 1)
+            self.line_start = end + 1
+
+    def stop(self, length):
+        """Keep the first length characters and ignore the rest of the stream."""
+        self.text = self.text[:length]
+        self.done = True
+        self.stopped_early = True
+
+class StreamedResponse:
+    """
+    Completions read from a streamed response, shaped like a non-streamed response.
+
+    Exposes choices[i].message.content (chat completions) and content[i].text (Anthropic
+    messages), so the usual extract functions apply, plus the timings of the request.
+    """
+
+    def __init__(self, texts, ttft, latency, stopped_early):
+        self.choices = [SimpleNamespace(message=SimpleNamespace(content=text)) for text in texts]
+        self.content = [SimpleNamespace(text=text) for text in texts]
+        self.ttft = ttft
+        self.latency = latency
+        self.stopped_early = stopped_early
+
+def chat_stream_deltas(chunk):
+    """Return the (choice index, text) pairs of a chat completions stream chunk (OpenAI or Azure AI Inference)."""
+    return [(choice.index, choice.delta.content) for choice in (chunk.choices or [])
+            if choice.delta is not None and choice.delta.content]
+
+def claude_stream_deltas(event):
+    """Return the (index, text) pairs of an Anthropic messages stream event."""
+    if event.type == "content_block_delta" and getattr(event.delta, "text", None):
+        return [(0, event.delta.text)]
+    return []
+
+def read_stream(open_stream, get_deltas, suffix, n=1):
+    """
+    Send a streaming request and read it until every completion in it is over.
+
+    Args:
+        open_stream: Callable sending the request with streaming enabled and returning the event stream
+        get_deltas: Callable returning the (choice index, text) pairs of a stream event
+        suffix: The code suffix, for the end-of-completion heuristic
+        n: Number of completions (choices) in the stream
+
+    Returns:
+        StreamedResponse with the completions, the time to first token and the total latency in seconds
+    """
+    start = time.monotonic()
+    ttft = None
+    terminators = [CompletionTerminator(suffix) for _ in range(n)]
+    stream = open_stream()
+    try:
+        for event in stream:
+            for index, text in get_deltas(event):
+                if index < n:
+                    if ttft is None:
+                        ttft = time.monotonic() - start
+                    terminators[index].feed(text)
+            if all(terminator.done for terminator in terminators):
+                break
+    finally:
+        # Closing the stream drops the connection, so the endpoint stops generating
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    return StreamedResponse([terminator.text for terminator in terminators], ttft, time.monotonic() - start,
+                            any(terminator.stopped_early for terminator in terminators))
+
+def build_request(send, get_deltas, suffix, n=1):
+    """
+    Build the request callable of a model call, streamed when --stream is given.
+
+    Args:
+        send: Callable taking the stream flag, sending the request and returning the response or event stream
+        get_deltas: Callable returning the (choice index, text) pairs of a stream event
+        suffix: The code suffix, for the end-of-completion heuristic
+        n: Number of completions requested
+
+    Returns:
+        Callable sending the request and returning the response (a StreamedResponse when streaming)
+    """
+    if not STREAM:
+        return lambda: send(False)
+    return lambda: read_stream(lambda: send(True), get_deltas, suffix, n)
+
+def get_response_cache():
+    """Return the shared response cache, or None when caching is disabled."""
+    global RESPONSE_CACHE
+    with RESPONSE_CACHE_LOCK:
+        if RESPONSE_CACHE is None and USE_CACHE:
+            RESPONSE_CACHE = ResponseCache()
+    return RESPONSE_CACHE
+
+def send_request(deployment_info, request, messages, extract, model_id, n=1, sample=None, seed=None, timings=None):
+    """
+    Send a request through the deployment's shared scheduler and extract its completion(s).
+
+    Identical requests are answered from the response cache. Otherwise the scheduler
+    applies the deployment's rate limits and adaptive concurrency and retries throttled
+    or transiently failing requests; only the final failure is raised (and not cached).
+
+    Args:
+        deployment_info: Dictionary containing model name and type
+        request: Callable sending the request and returning the response
+        messages: Chat messages of the request, used for the cache key and the token estimate
+        extract: Callable returning the completion text(s) of a response
+        model_id: Model id or deployment used in the request
+        n: Number of completions requested
+        sample: Sample index when the samples of a prompt are requested one by one
+        seed: Sampling seed sent with the request, if any
+        timings: Optional list the timings of the request are appended to, one entry per completion
+
+    Returns:
+        The value returned by extract(response)
+    """
+    def compute():
+        response = scheduler.call(request, estimated_tokens=estimate_tokens(messages, MAX_TOKENS, n))
+        if timings is not None and isinstance(response, StreamedResponse):
+            timings.extend({
+                "ttft": None if response.ttft is None else round(response.ttft, 3),
+                "latency": round(response.latency, 3),
+                "stopped_early": response.stopped_early,
+                "cached": False,
+            } for _ in range(n))
+        return extract(response)
+
+    scheduler = get_scheduler(
+        deployment_info["name"],
+        requests_per_minute=deployment_info.get("requests_per_minute", REQUESTS_PER_MINUTE),
+        tokens_per_minute=deployment_info.get("tokens_per_minute", TOKENS_PER_MINUTE),
+        max_concurrency=get_max_in_flight(deployment_info),
+        max_retries=MAX_RETRIES,
+    )
+    cache = get_response_cache()
+    recorded = len(timings) if timings is not None else 0
+    if cache is None:
+        result = compute()
+    else:
+        # Streamed completions may be cut short, so they are cached apart from the full responses
+        key = make_cache_key(deployment_info["name"], model_id, messages, TEMPERATURE, MAX_TOKENS, sample=sample, n=n,
+                             **seed_kwargs(seed), **({"stream": True} if STREAM else {}))
+        result = cache.fetch(key, compute, namespace=deployment_info["name"])
+    if timings is not None and len(timings) == recorded:
+        # Answered from the cache, nothing was sent
+        timings.extend({"ttft": None, "latency": None, "stopped_early": False, "cached": True} for _ in range(n))
+    return result
+
 # Consolidated function to call Azure AI Inference models
-def call_inference_model(prefix, suffix, deployment_info):
+def call_inference_model(prefix, suffix, deployment_info, sample_indices=None, timings=None):
     """
     Call any model using the Azure AI Inference SDK.
     
@@ -428,24 +827,26 @@ def call_inference_model(prefix, suffix, deployment_info):
         prefix: The code prefix
         suffix: The code suffix
         deployment_info: Dictionary containing model name and type
+        sample_indices: Optional sample indices to request instead of all NUM_COMPLETIONS samples
+        timings: Optional list collecting the timings of the requests (see send_request)
     
     Returns:
-        Model completion as string
+        Model completion as string, or a list of completions for multiple samples
     """
     deployment_type = deployment_info["type"]
     deployment_name = deployment_info["name"]
     
     # Select appropriate client and model based on deployment type
     if deployment_type == MODEL_TYPE_DEEPSEEK_V3:
-        client = deepseek_v3_client
+        client = get_client("deepseek_v3")
         model_name = DEEPSEEK_V3_MODEL
         use_chat_api = False
     elif deployment_type == MODEL_TYPE_DEEPSEEK_V31:
-        client = deepseek_v31_client
+        client = get_client("deepseek_v31")
         model_name = DEEPSEEK_V31_MODEL
         use_chat_api = False
     elif deployment_type == MODEL_TYPE_MINISTRAL:
-        client = ministral_client
+        client = get_client("ministral")
         model_name = MINISTRAL_MODEL
         use_chat_api = False
     else:
@@ -459,7 +860,7 @@ def call_inference_model(prefix, suffix, deployment_info):
             completion = client.chat.completions.create(
                 model=model_name,
                 messages=messages,
-                max_tokens=800,
+                max_tokens=MAX_TOKENS,
                 temperature=TEMPERATURE,
                 stream=False
             )
@@ -467,6 +868,8 @@ def call_inference_model(prefix, suffix, deployment_info):
             return completion.choices[0].message.content
         else:
             # For ChatCompletionsClient (other models)
+            from azure.ai.inference.models import SystemMessage, UserMessage
+
             # Convert to SDK format
             sdk_messages = []
             for msg in messages:
@@ -475,99 +878,47 @@ def call_inference_model(prefix, suffix, deployment_info):
                 elif msg["role"] == "user":
                     sdk_messages.append(UserMessage(content=msg["content"]))
             
-            # Model-specific API calls
+            # Model-specific request arguments
             if deployment_type in [MODEL_TYPE_DEEPSEEK_V3, MODEL_TYPE_DEEPSEEK_V31]:
-                max_retries = 3
-                retry_count = 0
-                
-                while retry_count < max_retries:
-                    try:
-                        # Set timeout for DeepSeek models
-                        timeout = 600 if deployment_type in [MODEL_TYPE_DEEPSEEK_V3, MODEL_TYPE_DEEPSEEK_V31] else 300
-                        
-                        if NUM_COMPLETIONS == 1:
-                            response = client.complete(
-                                messages=sdk_messages,
-                                model=model_name,
-                                stream=False,
-                                timeout=timeout
-                            )
-                        else:
-                            # Sequential API calls with small delay
-                            responses = []
-                            for i in range(NUM_COMPLETIONS):
-                                # Add small delay for DeepSeek models between requests
-                                if deployment_type in [MODEL_TYPE_DEEPSEEK_V3, MODEL_TYPE_DEEPSEEK_V31] and i > 0:
-                                    import time
-                                    time.sleep(1)  # Small 1 second delay between requests
-                                
-                                single_response = client.complete(
-                                    messages=sdk_messages,
-                                    model=model_name,
-                                    stream=False,
-                                    timeout=timeout
-                                )
-                                responses.append(single_response)
-                                print(f"Completed DeepSeek request {i+1}/{NUM_COMPLETIONS}")
-                            response = responses
-                        break
-                    except Exception as retry_error:
-                        retry_count += 1
-                        if retry_count < max_retries:
-                            print(f"Attempt {retry_count} failed for {deployment_name}. Retrying in {retry_count * 5} seconds...")
-                            import time
-                            time.sleep(retry_count * 5)
-                        else:
-                            raise retry_error
-            elif deployment_type == MODEL_TYPE_MINISTRAL:
-                if NUM_COMPLETIONS == 1:
-                    response = client.complete(
-                        messages=sdk_messages,
-                        max_tokens=800,
-                        temperature=TEMPERATURE,
-                        top_p=1.0,
-                        model=model_name,
-                        stream=False
-                    )
-                else:
-                    # For multiple completions, make multiple API calls
-                    responses = []
-                    for _ in range(NUM_COMPLETIONS):
-                        single_response = client.complete(
-                            messages=sdk_messages,
-                            max_tokens=800,
-                            temperature=TEMPERATURE,
-                            top_p=1.0,
-                            model=model_name,
-                            stream=False
-                        )
-                        responses.append(single_response)
-                    response = responses
-            
-            if NUM_COMPLETIONS == 1:
-                response_content = response.choices[0].message.content
-                return response_content
-            else:
-                # Handle multiple responses
-                if isinstance(response, list):
-                    response_contents = []
-                    for single_response in response:
-                        content = single_response.choices[0].message.content
-                        response_contents.append(content)
-                    return response_contents
-                else:
-                    response_contents = []
-                    for choice in response.choices:
-                        content = choice.message.content
-                        response_contents.append(content)
-                    return response_contents
+                # Set timeout for DeepSeek models
+                request_kwargs = {"timeout": 600}
+            else:  # MODEL_TYPE_MINISTRAL
+                request_kwargs = {
+                    "max_tokens": MAX_TOKENS,
+                    "temperature": TEMPERATURE,
+                    "top_p": 1.0,
+                }
+
+            def make_request(seed):
+                return build_request(lambda stream: client.complete(
+                    messages=sdk_messages,
+                    model=model_name,
+                    stream=stream,
+                    **request_kwargs,
+                    **seed_kwargs(seed)
+                ), chat_stream_deltas, suffix)
+
+            def extract(response):
+                return response.choices[0].message.content
+
+            # Throttling and transient failures are retried by the deployment's scheduler
+            # For multiple completions, make one API call per sample
+            samples = get_sample_indices(sample_indices)
+            response_contents = []
+            for i in samples:
+                seed = get_sample_seed(i)
+                response_contents.append(send_request(deployment_info, make_request(seed), messages, extract, model_name,
+                                                      sample=i, seed=seed, timings=timings))
+                if len(samples) > 1:
+                    print(f"Completed {deployment_name} request {len(response_contents)}/{len(samples)}")
+            return format_completions(response_contents, sample_indices)
 
     except Exception as e:
         print(f"Error calling {deployment_name} endpoint: {str(e)}")
         return f"Error: API request failed - {str(e)}"
 
 # Function to call Claude models
-def call_claude(prefix, suffix, deployment_info):
+def call_claude(prefix, suffix, deployment_info, sample_indices=None, timings=None):
     """
     Call Claude API using Anthropic client.
     
@@ -575,9 +926,11 @@ def call_claude(prefix, suffix, deployment_info):
         prefix: The code prefix
         suffix: The code suffix
         deployment_info: Dictionary containing model name and type
+        sample_indices: Optional sample indices to request instead of all NUM_COMPLETIONS samples
+        timings: Optional list collecting the timings of the requests (see send_request)
     
     Returns:
-        Model completion as string
+        Model completion as string, or a list of completions for multiple samples
     """
     try:
         model_type = deployment_info["type"]
@@ -602,71 +955,131 @@ def call_claude(prefix, suffix, deployment_info):
                 user_messages.append({"role": "user", "content": msg["content"]})
         
         # Call Claude API with system as top-level parameter
-        if NUM_COMPLETIONS == 1:
-            response = claude_client.messages.create(
-                model=model,
-                max_tokens=800,
-                temperature=TEMPERATURE,
-                system=system_content,
-                messages=user_messages
-            )
+        request = build_request(lambda stream: get_client("claude").messages.create(
+            model=model,
+            max_tokens=MAX_TOKENS,
+            temperature=TEMPERATURE,
+            system=system_content,
+            messages=user_messages,
+            stream=stream
+        ), claude_stream_deltas, suffix)
+
+        def extract(response):
             return response.content[0].text
-        else:
-            # For multiple completions, make multiple API calls
-            completions = []
-            for _ in range(NUM_COMPLETIONS):
-                response = claude_client.messages.create(
-                    model=model,
-                    max_tokens=800,
-                    temperature=TEMPERATURE,
-                    system=system_content,
-                    messages=user_messages
-                )
-                completions.append(response.content[0].text)
-            return completions
+
+        # For multiple completions, make one API call per sample
+        completions = []
+        for i in get_sample_indices(sample_indices):
+            completions.append(send_request(deployment_info, request, template_messages, extract, model, sample=i,
+                                            timings=timings))
+        return format_completions(completions, sample_indices)
         
     except Exception as e:
         print(f"Error calling Claude endpoint: {str(e)}")
         return f"Error: API request failed - {str(e)}"
 
 
+# Function to call local models
+def call_local_model(prefix, suffix, deployment_info, sample_indices=None, timings=None):
+    """
+    Generate completions with a local model (see local_model.py).
+
+    The model is loaded on first use. Concurrent requests are batched by the model's
+    client, up to the deployment's max_in_flight completions per batch. Local models
+    are not streamed.
+
+    Args:
+        prefix: The code prefix
+        suffix: The code suffix
+        deployment_info: Dictionary containing model name, type and model_path
+        sample_indices: Optional sample indices to request instead of all NUM_COMPLETIONS samples
+        timings: Unused, local generation is not streamed
+
+    Returns:
+        Model completion as string, or a list of completions for multiple samples
+    """
+    deployment_name = deployment_info["name"]
+    try:
+        model_path = deployment_info["model_path"]
+        client = get_client(f"local:{model_path}", lambda: load_local_model(
+            model_path, deployment_info.get("backend", "auto"), max_batch_size=get_max_in_flight(deployment_info)))
+
+        messages = get_prompt_template(prefix, suffix)
+        samples = get_sample_indices(sample_indices)
+        # All samples come from one request, seeded with the first sample's seed
+        seed = get_sample_seed(samples[0])
+
+        completions = send_request(deployment_info, lambda: client.complete(
+            messages,
+            max_tokens=MAX_TOKENS,
+            temperature=TEMPERATURE,
+            n=len(samples),
+            seed=seed
+        ), messages, extract_choice_contents, model_path, n=len(samples), seed=seed)
+
+        return format_completions(completions, sample_indices)
+
+    except Exception as e:
+        print(f"Error calling {deployment_name} local model: {str(e)}")
+        return f"Error: API request failed - {str(e)}"
+
 # Updated function to route to appropriate API based on model type
-def call_endpoint(prefix, suffix, deployment_info):
+def call_endpoint(prefix, suffix, deployment_info, sample_indices=None, timings=None):
+    """
+    Request completions for a test case from the deployment's endpoint.
+
+    Args:
+        prefix: The code prefix
+        suffix: The code suffix
+        deployment_info: Dictionary containing model name and type
+        sample_indices: Optional sample indices to request (e.g. only the failed samples of an entry);
+            by default all NUM_COMPLETIONS samples are requested
+        timings: Optional list collecting the timings of the requests, one entry per completion
+            (see send_request)
+
+    Returns:
+        The completion string in single-completion mode, otherwise the list of completions
+        (one per sample index), or an error string if the request failed
+    """
     # Extract deployment name and type
     deployment_name = deployment_info["name"]
     deployment_type = deployment_info["type"]
     
     # Call appropriate endpoint based on model type
     if deployment_type in [MODEL_TYPE_DEEPSEEK_V3, MODEL_TYPE_DEEPSEEK_V31, MODEL_TYPE_MINISTRAL]:
-        return call_inference_model(prefix, suffix, deployment_info)
+        return call_inference_model(prefix, suffix, deployment_info, sample_indices, timings)
     # o3-mini removed - only used in llm_judge.py
     elif deployment_type in [MODEL_TYPE_CLAUDE_37, MODEL_TYPE_CLAUDE_4]:
-        return call_claude(prefix, suffix, deployment_info)
+        return call_claude(prefix, suffix, deployment_info, sample_indices, timings)
+    elif deployment_type == MODEL_TYPE_LOCAL:
+        return call_local_model(prefix, suffix, deployment_info, sample_indices, timings)
     elif deployment_type == MODEL_TYPE_GPT4O:
         try:
             # Use new message format for chat models
             messages = get_prompt_template(prefix, suffix)
+            samples = get_sample_indices(sample_indices)
+            # Native n: all samples come from one request, seeded with the first sample's seed
+            seed = get_sample_seed(samples[0])
             
             # GPT-4o configuration
-            token_param = {"max_tokens": 800}
-            client_to_use = gpt4o_client
+            token_param = {"max_tokens": MAX_TOKENS}
+            client_to_use = get_client("gpt4o")
             model_deployment = GPT4O_DEPLOYMENT
             
             # Send request
-            completion = client_to_use.chat.completions.create(
+            completions = send_request(deployment_info, build_request(lambda stream: client_to_use.chat.completions.create(
                 model=model_deployment,
                 messages=messages,
                 temperature=TEMPERATURE,
                 top_p=1.0,
-                n=NUM_COMPLETIONS,
-                stream=False,
+                n=len(samples),
+                **seed_kwargs(seed),
+                stream=stream,
                 **token_param
-            )
+            ), chat_stream_deltas, suffix, len(samples)), messages, extract_choice_contents,
+                model_deployment, n=len(samples), seed=seed, timings=timings)
             
-            if NUM_COMPLETIONS == 1:
-                return completion.choices[0].message.content
-            else:
-                return [choice.message.content for choice in completion.choices]
+            return format_completions(completions, sample_indices)
             
         except Exception as e:
             print(f"Error calling {deployment_name} endpoint: {str(e)}")
@@ -675,32 +1088,34 @@ def call_endpoint(prefix, suffix, deployment_info):
         try:
             # Use new message format for chat models
             messages = get_prompt_template(prefix, suffix)
+            samples = get_sample_indices(sample_indices)
+            # Native n: all samples come from one request, seeded with the first sample's seed
+            seed = get_sample_seed(samples[0])
             
             # Select the correct client and deployment
             if deployment_type == MODEL_TYPE_GPT41MINI:
-                client_to_use = gpt41mini_client
+                client_to_use = get_client("gpt41mini")
                 model_deployment = GPT41MINI_DEPLOYMENT
             else:  # MODEL_TYPE_GPT41
-                client_to_use = gpt41_client
+                client_to_use = get_client("gpt41")
                 model_deployment = GPT41_DEPLOYMENT
             
             # Send request to GPT-4.1 or GPT-4.1 mini
-            completion = client_to_use.chat.completions.create(
+            completions = send_request(deployment_info, build_request(lambda stream: client_to_use.chat.completions.create(
                 model=model_deployment,
                 messages=messages,
-                max_tokens=800,
+                max_tokens=MAX_TOKENS,
                 temperature=TEMPERATURE,
                 top_p=1.0,
                 frequency_penalty=0,  
                 presence_penalty=0,
-                n=NUM_COMPLETIONS,
-                stream=False
-            )
+                n=len(samples),
+                **seed_kwargs(seed),
+                stream=stream
+            ), chat_stream_deltas, suffix, len(samples)), messages, extract_choice_contents,
+                model_deployment, n=len(samples), seed=seed, timings=timings)
             
-            if NUM_COMPLETIONS == 1:
-                return completion.choices[0].message.content
-            else:
-                return [choice.message.content for choice in completion.choices]
+            return format_completions(completions, sample_indices)
             
         except Exception as e:
             print(f"Error calling {deployment_name} endpoint: {str(e)}")
@@ -709,24 +1124,26 @@ def call_endpoint(prefix, suffix, deployment_info):
         try:
             # Use new message format for chat models
             messages = get_prompt_template(prefix, suffix)
+            samples = get_sample_indices(sample_indices)
+            # Native n: all samples come from one request, seeded with the first sample's seed
+            seed = get_sample_seed(samples[0])
             
             # Send request to GPT-4.1 nano
-            completion = gpt41nano_client.chat.completions.create(
+            completions = send_request(deployment_info, build_request(lambda stream: get_client("gpt41nano").chat.completions.create(
                 model=GPT41NANO_DEPLOYMENT,
                 messages=messages,
-                max_tokens=800,
+                max_tokens=MAX_TOKENS,
                 temperature=TEMPERATURE,
                 top_p=1.0,
                 frequency_penalty=0,  
                 presence_penalty=0,
-                n=NUM_COMPLETIONS,
-                stream=False
-            )
+                n=len(samples),
+                **seed_kwargs(seed),
+                stream=stream
+            ), chat_stream_deltas, suffix, len(samples)), messages, extract_choice_contents,
+                GPT41NANO_DEPLOYMENT, n=len(samples), seed=seed, timings=timings)
             
-            if NUM_COMPLETIONS == 1:
-                return completion.choices[0].message.content
-            else:
-                return [choice.message.content for choice in completion.choices]
+            return format_completions(completions, sample_indices)
             
         except Exception as e:
             print(f"Error calling {deployment_name} endpoint: {str(e)}")
@@ -735,6 +1152,9 @@ def call_endpoint(prefix, suffix, deployment_info):
         try:
             # Use new message format but adjust for Azure OpenAI content format
             messages = get_prompt_template(prefix, suffix)
+            samples = get_sample_indices(sample_indices)
+            # Native n: all samples come from one request, seeded with the first sample's seed
+            seed = get_sample_seed(samples[0])
             
             # Convert to Azure OpenAI format
             chat_prompt = []
@@ -751,113 +1171,303 @@ def call_endpoint(prefix, suffix, deployment_info):
                     })
             
             # Send request to Azure OpenAI
-            completion = client.chat.completions.create(
+            completions = send_request(deployment_info, build_request(lambda stream: client.chat.completions.create(
                 model=deployment_name,
                 messages=chat_prompt,
-                max_completion_tokens=800,
+                max_completion_tokens=MAX_TOKENS,
                 temperature=TEMPERATURE,
                 top_p=1,
                 frequency_penalty=0.2,
                 presence_penalty=0.2,
                 stop=None,
-                n=NUM_COMPLETIONS,
-                stream=False
-            )
+                n=len(samples),
+                **seed_kwargs(seed),
+                stream=stream
+            ), chat_stream_deltas, suffix, len(samples)), messages, extract_choice_contents,
+                deployment_name, n=len(samples), seed=seed, timings=timings)
             
-            if NUM_COMPLETIONS == 1:
-                return completion.choices[0].message.content
-            else:
-                return [choice.message.content for choice in completion.choices]
+            return format_completions(completions, sample_indices)
             
         except Exception as e:
             print(f"Error calling endpoint: {str(e)}")
-            return "Error: API request failed"
+            return f"Error: API request failed - {str(e)}"
 
-# Function to process JSONL file for a single deployment
-def process_jsonl(input_file, output_file, deployment_info):
+def add_completion(data, completion, deployment_name, seeds=None):
+    """
+    Store the completion(s) returned by call_endpoint in a benchmark entry.
+
+    Args:
+        data: Benchmark entry (updated in place)
+        completion: A completion string, or a list of completions when NUM_COMPLETIONS > 1
+        deployment_name: The model deployment name
+        seeds: Optional per-sample seeds, recorded as "<model>_seeds" with multiple completions
+    """
+    if NUM_COMPLETIONS == 1:
+        # Clean any markdown formatting from the completion
+        completion = clean_markdown_formatting(completion)
+        # Store result in field with deployment name
+        data[deployment_name] = completion
+    else:
+        # Handle multiple completions
+        if isinstance(completion, list):
+            completions = [clean_markdown_formatting(comp) for comp in completion]
+            # Store multiple completions with indexed keys
+            for i, comp in enumerate(completions):
+                data[f"{deployment_name}_completion_{i}"] = comp
+            # Also store the list for easy access
+            data[f"{deployment_name}_completions"] = completions
+            # Record the seed of every sample for reproducibility
+            if seeds is not None and any(seed is not None for seed in seeds):
+                data[f"{deployment_name}_seeds"] = seeds
+        else:
+            # Fallback for single completion
+            completion = clean_markdown_formatting(completion)
+            data[deployment_name] = completion
+
+async def request_completions(prefix, suffix, deployment_info, semaphore, sample_indices=None, timings=None):
+    """
+    Request the completions of a test case, fanning the samples out where needed.
+
+    Providers with a native n parameter get all samples in one request. For the others
+    (Claude, DeepSeek, Ministral) every sample is a separate request, so the samples are
+    issued concurrently, each holding its own slot of the deployment's semaphore. The
+    samples are returned in order; a sample that failed keeps its error message so it
+    can be repaired on its own.
+
+    Args:
+        prefix: The code prefix
+        suffix: The code suffix
+        deployment_info: Dictionary containing model name and type
+        semaphore: asyncio.Semaphore limiting the requests in flight for this deployment
+        sample_indices: Optional sample indices to request, as for call_endpoint
+        timings: Optional list collecting the timings of the requests in sample order
+            (None for a sample whose request failed)
+
+    Returns:
+        Same as call_endpoint
+    """
+    samples = get_sample_indices(sample_indices)
+    if len(samples) == 1 or deployment_info["type"] in NATIVE_N_MODEL_TYPES:
+        # The client libraries are blocking, so each request runs in a worker thread
+        async with semaphore:
+            return await asyncio.to_thread(call_endpoint, prefix, suffix, deployment_info, sample_indices, timings)
+
+    sample_timings = [[] if timings is not None else None for _ in samples]
+
+    async def request_sample(sample_index, sample_timing):
+        async with semaphore:
+            completion = await asyncio.to_thread(call_endpoint, prefix, suffix, deployment_info, [sample_index],
+                                                 sample_timing)
+        return completion[0] if isinstance(completion, list) else completion
+
+    completions = list(await asyncio.gather(*[request_sample(i, t) for i, t in zip(samples, sample_timings)]))
+    if timings is not None:
+        for sample_timing in sample_timings:
+            timings.extend(sample_timing or [None])
+    return completions
+
+def get_max_in_flight(deployment_info):
+    """Return the maximum number of concurrent requests allowed for a deployment."""
+    return max(1, deployment_info.get("max_in_flight", MAX_IN_FLIGHT))
+
+def get_checkpoint_path(output_file):
+    """Return the checkpoint file that collects the entries of an output file while it is generated."""
+    return strip_jsonl_extension(output_file) + '.jsonl.partial'
+
+def has_valid_completion(data, deployment_name):
+    """
+    Check whether an output entry holds the expected completion(s) without API errors.
+
+    Args:
+        data: Output entry
+        deployment_name: The model deployment name
+
+    Returns:
+        True if the entry has NUM_COMPLETIONS completions and none of them is an error
+    """
+    if NUM_COMPLETIONS == 1:
+        completions = [data.get(deployment_name)]
+    else:
+        completions = data.get(f"{deployment_name}_completions")
+        if not isinstance(completions, list) or len(completions) != NUM_COMPLETIONS:
+            return False
+    return all(isinstance(comp, str) and ERROR_MARKER not in comp for comp in completions)
+
+def load_completed_entries(file_paths, deployment_name):
+    """
+    Collect the entries that already have valid completions, by test id.
+
+    Files that do not exist are ignored; a truncated file (e.g. from an interrupted
+    run) contributes the entries read before the truncation.
+
+    Args:
+        file_paths: Output and checkpoint files to read, later files win
+        deployment_name: The model deployment name
+
+    Returns:
+        Dictionary mapping test id to the completed entry
+    """
+    completed = {}
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            continue
+        try:
+            for data in iter_jsonl(file_path, verbose=False):
+                if data.get("id") is not None and has_valid_completion(data, deployment_name):
+                    completed[data["id"]] = data
+        except Exception as e:
+            print(f"Warning: stopped reading {file_path} early: {str(e)}")
+    return completed
+
+def is_output_complete(input_file, output_file, deployment_name):
+    """Check whether every benchmark entry already has valid completions in the output file."""
+    if os.path.exists(get_checkpoint_path(output_file)):
+        return False
+    completed = load_completed_entries([output_file], deployment_name)
+    try:
+        return all(data.get("id") in completed for data in iter_jsonl(input_file, verbose=False))
+    except Exception:
+        return False
+
+async def process_jsonl_async(input_file, output_file, deployment_info, semaphore):
+    """
+    Generate completions for every entry of a JSONL file concurrently.
+
+    Requests are dispatched as soon as a slot of the deployment's semaphore is free.
+    Each finished entry is appended to a checkpoint file, and entries that already have
+    valid completions in the output or checkpoint file are reused instead of requested
+    again, so an interrupted run resumes where it stopped. Once all entries are done the
+    output file is written in input order via a temporary file and an atomic rename, so
+    it is identical to the one produced by processing the lines one by one.
+
+    Args:
+        input_file: Path to the benchmark JSONL file
+        output_file: Path to the output JSONL file
+        deployment_info: Dictionary containing model name and type
+        semaphore: asyncio.Semaphore limiting the requests in flight for this deployment
+    """
     deployment_name = deployment_info["name"]
-    
-    with open(input_file, 'r', encoding='utf-8') as infile, open(output_file, 'w', encoding='utf-8') as outfile:
+    checkpoint_file = get_checkpoint_path(output_file)
+
+    async def complete_entry(data, checkpoint):
+        # Extract prefix and suffix
+        prefix = data.get("prefix", "")
+        suffix = data.get("suffix", "")
+
+        # Per-request timings are only meaningful (and recorded) for streamed responses
+        timings = [] if STREAM else None
+        completion = await request_completions(prefix, suffix, deployment_info, semaphore, timings=timings)
+        add_completion(data, completion, deployment_name, get_sample_seeds(deployment_info))
+        if timings:
+            data[f"{deployment_name}_timings"] = timings
+
+        # Checkpoint the entry right away so it survives an interruption
+        checkpoint.write(json.dumps(data) + "\n")
+        checkpoint.flush()
+
+        # Print output for debugging
+        print(f"Processed entry with model {deployment_name} ({NUM_COMPLETIONS} completions)")
+        return data
+
+    rows = []
+    with open_text(input_file, 'r') as infile:
         for line in infile:
             try:
                 # Parse JSON line
-                data = json.loads(line.strip())
+                rows.append(json.loads(line.strip()))
+            except json.JSONDecodeError as e:
+                print(f"Skipping invalid JSON line: {e}")
 
-                # Extract prefix and suffix
-                prefix = data.get("prefix", "")
-                suffix = data.get("suffix", "")
+    # Entries completed by an earlier, interrupted run
+    completed = load_completed_entries([output_file, checkpoint_file], deployment_name)
+    reused = sum(1 for data in rows if data.get("id") in completed)
+    if reused:
+        print(f"↻ Resuming {output_file}: {reused}/{len(rows)} entries already completed")
+
+    with open(checkpoint_file, 'a', encoding='utf-8') as checkpoint:
+        entries = []
+        for data in rows:
+            if data.get("id") in completed:
+                entries.append(completed[data["id"]])
+            else:
+                entries.append(asyncio.ensure_future(complete_entry(data, checkpoint)))
 
-                # Call the endpoint and get completion(s)
-                completion = call_endpoint(prefix, suffix, deployment_info)
-                
-                if NUM_COMPLETIONS == 1:
-                    # Clean any markdown formatting from the completion
-                    completion = clean_markdown_formatting(completion)
-                    # Store result in field with deployment name
-                    data[deployment_name] = completion
-                else:
-                    # Handle multiple completions
-                    if isinstance(completion, list):
-                        completions = [clean_markdown_formatting(comp) for comp in completion]
-                        # Store multiple completions with indexed keys
-                        for i, comp in enumerate(completions):
-                            data[f"{deployment_name}_completion_{i}"] = comp
-                        # Also store the list for easy access
-                        data[f"{deployment_name}_completions"] = completions
-                    else:
-                        # Fallback for single completion
-                        completion = clean_markdown_formatting(completion)
-                        data[deployment_name] = completion
-
-                # Write updated entry back to the output file
-                json.dump(data, outfile)
-                outfile.write("\n")  # Ensure each JSON object is on a new line
-
-                # Print output for debugging
-                print(f"Processed entry with model {deployment_name} ({NUM_COMPLETIONS} completions)")
+        try:
+            # Collect the entries in input order
+            results = [await entry if asyncio.isfuture(entry) else entry for entry in entries]
+        finally:
+            for entry in entries:
+                if asyncio.isfuture(entry):
+                    entry.cancel()
 
-            except json.JSONDecodeError as e:
-                print(f"Skipping invalid JSON line: {e}")
+    write_jsonl_atomic(output_file, results)
+    os.remove(checkpoint_file)
+
+# Function to process JSONL file for a single deployment
+def process_jsonl(input_file, output_file, deployment_info):
+    async def run():
+        semaphore = asyncio.Semaphore(get_max_in_flight(deployment_info))
+        await process_jsonl_async(input_file, output_file, deployment_info, semaphore)
+
+    asyncio.run(run())
+
+def find_errored_samples(data, deployment_name):
+    """
+    Find the samples of an output entry that contain an API error.
+
+    Args:
+        data: Output entry
+        deployment_name: The model deployment name
+
+    Returns:
+        None if the whole entry failed (the error is stored in place of the completion),
+        otherwise the list of errored sample indices (empty if the entry is fine)
+    """
+    if isinstance(data.get(deployment_name), str) and ERROR_MARKER in data[deployment_name]:
+        return None
+    completions = data.get(f"{deployment_name}_completions")
+    if not isinstance(completions, list):
+        return []
+    return [i for i, comp in enumerate(completions) if isinstance(comp, str) and ERROR_MARKER in comp]
 
 def validate_completions():
     """
     Validate the generated completions by checking for API request failures.
     Iterates through all JSONL files in the output directory and counts
     error occurrences per file.
+
+    Returns:
+        Dictionary mapping each file with errors to {test id: errored sample indices,
+        or None when the whole entry failed}
     """
     print("\n" + "="*80)
     print("VALIDATING COMPLETIONS - CHECKING FOR API ERRORS")
     print("="*80)
     
-    # File pattern for JSONL files
-    file_pattern = "*.jsonl"
-    
     # Dictionary to store error counts per file
     error_counts = defaultdict(int)
     # Dictionary to track total processed lines per file
     total_lines = defaultdict(int)
     # Dictionary to track models with errors
     model_error_counts = defaultdict(int)
+    # Errored entries per file, used by --repair
+    errored_entries = defaultdict(dict)
     
-    # Walk through the output directory
-    for file_path in glob.glob(f"{OUTPUT_DIR}/**/{file_pattern}", recursive=True):
-        # Skip formatted text files
-        if "_formatted" in file_path:
-            continue
-            
+    # Walk through the output directory (plain and compressed JSONL files)
+    for file_path in find_jsonl_files(OUTPUT_DIR):
         # Extract deployment name more carefully from filename
         base_filename = os.path.basename(file_path)
         # We need to find the model name part after the first hyphen
         if '-' in base_filename:
             # Get everything after the first hyphen but before the .jsonl extension
-            deployment_name = base_filename.split('-', 1)[1].replace('.jsonl', '')
+            deployment_name = strip_jsonl_extension(base_filename.split('-', 1)[1])
         else:
             # Fallback if filename doesn't contain expected format
             print(f"Warning: Couldn't extract deployment name from {file_path}")
             continue
             
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open_text(file_path, 'r') as f:
                 for line_num, line in enumerate(f, 1):
                     try:
                         # Parse the JSON line
@@ -867,16 +1477,22 @@ def validate_completions():
                         # Check if the completion contains an error message (as substring)
                         error_found = False
                         
-                        # Check completion
-                        if deployment_name in data and isinstance(data[deployment_name], str) and "Error: API request failed" in data[deployment_name]:
+                        # Check the completion, or each sample when there are several
+                        errored_samples = find_errored_samples(data, deployment_name)
+                        if errored_samples is None or errored_samples:
                             error_counts[file_path] += 1
                             model_error_counts[deployment_name] += 1
+                            errored_entries[file_path][data.get("id")] = errored_samples
                             error_found = True
                                 
                         # Print first error found for debugging
                         if error_found and error_counts[file_path] == 1:
+                            if errored_samples is None:
+                                error_message = data[deployment_name]
+                            else:
+                                error_message = data[f"{deployment_name}_completions"][errored_samples[0]]
                             print(f"Found error in {file_path}, line {line_num}:")
-                            print(f"Error message: {data[deployment_name][:500]}...")  # Print first 500 chars
+                            print(f"Error message: {error_message[:500]}...")  # Print first 500 chars
                             
                     except json.JSONDecodeError:
                         print(f"Warning: Invalid JSON at line {line_num} in {file_path}")
@@ -913,6 +1529,107 @@ def validate_completions():
     print(f"Total errors found: {total_error_count} ({overall_error_rate:.2f}%)")
     print("="*80)
 
+    return errored_entries
+
+async def repair_entry(data, errored_samples, deployment_info, semaphore):
+    """
+    Re-request the failed completions of an output entry and patch them in place.
+
+    Args:
+        data: Output entry (updated in place)
+        errored_samples: Errored sample indices, or None when the whole entry failed
+        deployment_info: Dictionary containing model name and type
+        semaphore: asyncio.Semaphore limiting the requests in flight for this deployment
+
+    Returns:
+        Number of samples that now have a valid completion
+    """
+    deployment_name = deployment_info["name"]
+    prefix = data.get("prefix", "")
+    suffix = data.get("suffix", "")
+
+    if errored_samples is None:
+        # The whole request failed: request all samples again, as a normal generation would
+        completion = await request_completions(prefix, suffix, deployment_info, semaphore)
+        if NUM_COMPLETIONS > 1 and isinstance(completion, list):
+            # Drop the error stored in place of the completions
+            data.pop(deployment_name, None)
+        add_completion(data, completion, deployment_name, get_sample_seeds(deployment_info))
+        if not has_valid_completion(data, deployment_name):
+            return 0
+        return NUM_COMPLETIONS
+
+    # Only some samples failed: request just those and put them back at their index
+    completions = await request_completions(prefix, suffix, deployment_info, semaphore, errored_samples)
+    if not isinstance(completions, list):
+        return 0
+    repaired = 0
+    for i, comp in zip(errored_samples, completions):
+        comp = clean_markdown_formatting(comp)
+        data[f"{deployment_name}_completions"][i] = comp
+        data[f"{deployment_name}_completion_{i}"] = comp
+        if isinstance(comp, str) and ERROR_MARKER not in comp:
+            repaired += 1
+    return repaired
+
+async def repair_completions(errored_entries):
+    """
+    Re-request the failed completions found by validate_completions and patch the files in place.
+
+    Only the errored (file, test id, sample) entries are requested again, concurrently and
+    under the same per-deployment limits as the generation. Patched files are rewritten
+    atomically and their formatted text files regenerated.
+
+    Args:
+        errored_entries: Result of validate_completions()
+
+    Returns:
+        Dictionary mapping each file to (repaired samples, errored samples)
+    """
+    print("\n" + "="*80)
+    print("REPAIRING FAILED COMPLETIONS")
+    print("="*80)
+
+    deployments = {deployment_info["name"]: deployment_info for deployment_info in DEPLOYMENTS}
+    semaphores = {name: asyncio.Semaphore(get_max_in_flight(deployment_info))
+                  for name, deployment_info in deployments.items()}
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=sum(get_max_in_flight(d) for d in DEPLOYMENTS)))
+
+    repair_counts = {}
+
+    async def repair_file(file_path, entries):
+        deployment_name = strip_jsonl_extension(os.path.basename(file_path).split('-', 1)[1])
+        deployment_info = deployments.get(deployment_name)
+        if deployment_info is None:
+            print(f"Warning: {deployment_name} is not a known deployment, cannot repair {file_path}")
+            return
+        semaphore = semaphores[deployment_name]
+
+        rows = read_jsonl(file_path)
+        repaired = await asyncio.gather(*[repair_entry(data, entries[data.get("id")], deployment_info, semaphore)
+                                          for data in rows if data.get("id") in entries])
+        errored = sum(NUM_COMPLETIONS if samples is None else len(samples) for samples in entries.values())
+        repair_counts[file_path] = (sum(repaired), errored)
+
+        if sum(repaired) > 0:
+            write_jsonl_atomic(file_path, rows)
+            process_jsonl_file(file_path, strip_jsonl_extension(file_path) + '_formatted.txt', deployment_name)
+        print(f"Repaired {sum(repaired)}/{errored} failed completions in {file_path}")
+
+    await asyncio.gather(*[repair_file(file_path, entries) for file_path, entries in sorted(errored_entries.items())])
+
+    # Print the per-file repair counts
+    print("\nRepair Results:")
+    print("-" * 40)
+    for file_path, (repaired, errored) in sorted(repair_counts.items()):
+        print(f"{file_path}: {repaired}/{errored} completions repaired")
+    total_repaired = sum(repaired for repaired, _ in repair_counts.values())
+    total_errored = sum(errored for _, errored in repair_counts.values())
+    print(f"\nTotal: {total_repaired}/{total_errored} completions repaired in {len(repair_counts)} files")
+    print("="*80)
+    return repair_counts
+
 def generate_all_formatted_text_files():
     """
     Generate formatted text files for all JSONL files in the output directory.
@@ -927,25 +1644,21 @@ def generate_all_formatted_text_files():
     total_files = 0
     successful_files = 0
     
-    # Walk through the output directory to find JSONL files
-    for file_path in glob.glob(f"{OUTPUT_DIR}/**/*.jsonl", recursive=True):
-        # Skip files that already have _formatted in the name
-        if "_formatted" in file_path:
-            continue
-            
+    # Walk through the output directory to find JSONL files (plain and compressed)
+    for file_path in find_jsonl_files(OUTPUT_DIR):
         total_files += 1
         
         # Extract deployment name from filename
         base_filename = os.path.basename(file_path)
         if '-' in base_filename:
             # Extract deployment name
-            deployment_name = base_filename.split('-', 1)[1].replace('.jsonl', '')
+            deployment_name = strip_jsonl_extension(base_filename.split('-', 1)[1])
         else:
             print(f"Warning: Couldn't extract deployment name from {file_path}")
             continue
             
         # Generate the formatted text file path
-        output_txt_file = file_path.replace('.jsonl', '_formatted.txt')
+        output_txt_file = strip_jsonl_extension(file_path) + '_formatted.txt'
         
         try:
             print(f"Generating formatted output for {file_path}")
@@ -1003,42 +1716,111 @@ def clean_markdown_formatting(text):
     # return the original text to avoid data loss
     return text
 
-def main():
-    print(f"Output directory: {OUTPUT_DIR}")
-    
-    # Process each deployment separately
+async def generate_output_file(input_jsonl, output_jsonl, deployment_info, semaphore):
+    """
+    Generate one completion file, then ingest it and write its formatted text version.
+
+    Args:
+        input_jsonl: Path to the benchmark JSONL file
+        output_jsonl: Path to the output JSONL file
+        deployment_info: Dictionary containing model name and type
+        semaphore: asyncio.Semaphore shared by all files of the deployment
+    """
+    deployment_name = deployment_info["name"]
+    try:
+        await process_jsonl_async(input_jsonl, output_jsonl, deployment_info, semaphore)
+    except Exception as e:
+        print(f"Error processing {output_jsonl}: {str(e)}")
+        return
+    print(f"Processing completed for {deployment_name}. JSONL saved to {output_jsonl}.")
+
+    # Ingest the new completions into the results warehouse
+    if WAREHOUSE:
+        with ResultsWarehouse(WAREHOUSE) as warehouse:
+            count = warehouse.ingest_completion_file(output_jsonl)
+        print(f"Ingested {count} completions into {WAREHOUSE}")
+
+    # Generate formatted text output
+    output_txt_file = strip_jsonl_extension(output_jsonl) + '_formatted.txt'
+    print(f"\nGenerating formatted output in {output_txt_file}...")
+    process_jsonl_file(output_jsonl, output_txt_file, deployment_name)
+    print("Formatting complete!")
+
+async def generate_all_completions():
+    """
+    Generate the completion files of all deployments, languages and categories concurrently.
+
+    Each deployment gets its own semaphore, so at most max_in_flight requests are
+    outstanding per endpoint while every endpoint is kept busy at the same time.
+    """
+    semaphores = {deployment_info["name"]: asyncio.Semaphore(get_max_in_flight(deployment_info))
+                  for deployment_info in DEPLOYMENTS}
+
+    # Every in-flight request occupies a worker thread, so size the pool for all deployments at once
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=sum(get_max_in_flight(d) for d in DEPLOYMENTS)))
+
+    jobs = []
     for deployment_info in DEPLOYMENTS:
         deployment_name = deployment_info["name"]
-        
-        for language in languages:            
+
+        for language in languages:
             # Process common directories for all languages
             for i in range(len(common_dirs)):
                 curr_dir = common_dirs[i]
                 curr_file = common_files[i]
-                input_jsonl = f"benchmark/{language}/{curr_dir}/{curr_file}.jsonl"
-                
+                # Benchmark files may be stored compressed
+                input_jsonl = resolve_jsonl_path(f"benchmark/{language}/{curr_dir}/{curr_file}.jsonl")
+
                 # Set output filename
-                output_jsonl = f"{OUTPUT_DIR}/{language}/{curr_dir}/{curr_file}-{deployment_name}.jsonl"
+                output_jsonl = f"{OUTPUT_DIR}/{language}/{curr_dir}/{curr_file}-{deployment_name}{OUTPUT_EXTENSION}"
 
                 # Create output directory if it doesn't exist
                 os.makedirs(os.path.dirname(output_jsonl), exist_ok=True)
-                
-                # Skip if output file already exists and has content
-                if os.path.exists(output_jsonl):
-                    file_size = os.path.getsize(output_jsonl)
-                    if file_size > 0:
-                        print(f"✓ Skipping {output_jsonl} - already exists ({file_size} bytes)")
+
+                # Skip if output file already exists (plain or compressed) and every entry has valid completions;
+                # incomplete files are resumed in place, keeping their compression
+                existing_jsonl = resolve_jsonl_path(output_jsonl)
+                if os.path.exists(existing_jsonl):
+                    output_jsonl = existing_jsonl
+                    if is_output_complete(input_jsonl, existing_jsonl, deployment_name):
+                        print(f"✓ Skipping {existing_jsonl} - already complete ({os.path.getsize(existing_jsonl)} bytes)")
                         continue
-                
-                # Process with the current deployment
-                process_jsonl(input_jsonl, output_jsonl, deployment_info)
-                print(f"Processing completed for {deployment_name} ({language}/{curr_dir}). JSONL saved to {output_jsonl}.")
-
-                # Generate formatted text output
-                output_txt_file = output_jsonl.replace('.jsonl', '_formatted.txt')
-                print(f"\nGenerating formatted output in {output_txt_file}...")
-                process_jsonl_file(output_jsonl, output_txt_file, deployment_name)
-                print("Formatting complete!")
+
+                jobs.append(generate_output_file(input_jsonl, output_jsonl, deployment_info,
+                                                 semaphores[deployment_name]))
+
+    print(f"Generating {len(jobs)} completion files across {len(DEPLOYMENTS)} deployments")
+    await asyncio.gather(*jobs)
+
+def main(argv=None):
+    import dotenv
+
+    # Load the API keys from .env and apply the command-line settings
+    dotenv.load_dotenv()
+    args = parse_args(argv)
+    apply_args(args)
+
+    print(f"Output directory: {OUTPUT_DIR}")
+
+    if args.repair:
+        # Re-request only the failed completions, then validate again
+        errored_entries = validate_completions()
+        if errored_entries:
+            asyncio.run(repair_completions(errored_entries))
+            print_scheduler_stats()
+            if RESPONSE_CACHE is not None:
+                RESPONSE_CACHE.print_stats()
+            validate_completions()
+        return
+
+    # Generate all missing completion files concurrently
+    asyncio.run(generate_all_completions())
+
+    # Report request counts, retries and throttling per deployment
+    print_scheduler_stats()
+    if RESPONSE_CACHE is not None:
+        RESPONSE_CACHE.print_stats()
 
     # Call validate_completions after processing all files
     validate_completions()
@@ -0,0 +1,257 @@
+import io
+import os
+import gzip
+import json
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Supported JSONL file extensions, plain first
+JSONL_EXTENSIONS = ('.jsonl', '.jsonl.gz', '.jsonl.zst')
+
+# Compression suffix -> codec name
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd'}
+
+# Codec name -> file suffix, as accepted by the conversion command
+COMPRESSION_CHOICES = {'none': '', 'gz': '.gz', 'zst': '.zst'}
+
+
+def compression_of(file_path) -> Optional[str]:
+    """Return 'gzip', 'zstd' or None depending on the file extension."""
+    for suffix, codec in COMPRESSION_SUFFIXES.items():
+        if str(file_path).endswith(suffix):
+            return codec
+    return None
+
+
+def is_jsonl_file(file_path, include_formatted=False) -> bool:
+    """
+    Check whether a path is a (possibly compressed) JSONL file.
+
+    Args:
+        file_path: File name or path
+        include_formatted: Whether to accept '_formatted.jsonl' files
+
+    Returns:
+        True for .jsonl, .jsonl.gz and .jsonl.zst files
+    """
+    name = os.path.basename(str(file_path))
+    if not name.endswith(JSONL_EXTENSIONS):
+        return False
+    return include_formatted or not strip_jsonl_extension(name).endswith('_formatted')
+
+
+def strip_jsonl_extension(file_path) -> str:
+    """Remove the .jsonl / .jsonl.gz / .jsonl.zst extension from a path."""
+    file_path = str(file_path)
+    for extension in reversed(JSONL_EXTENSIONS):
+        if file_path.endswith(extension):
+            return file_path[:-len(extension)]
+    return file_path
+
+
+def jsonl_extension(file_path) -> str:
+    """Return the JSONL extension of a path (e.g. '.jsonl.gz'), or '' if it has none."""
+    file_path = str(file_path)
+    for extension in reversed(JSONL_EXTENSIONS):
+        if file_path.endswith(extension):
+            return extension
+    return ''
+
+
+def resolve_jsonl_path(file_path) -> str:
+    """
+    Resolve a '.jsonl' path to an existing compressed variant if only that exists.
+
+    Returns:
+        The existing path, or file_path unchanged if no variant exists
+    """
+    if os.path.exists(file_path):
+        return file_path
+    base = strip_jsonl_extension(file_path)
+    for extension in JSONL_EXTENSIONS:
+        if os.path.exists(base + extension):
+            return base + extension
+    return file_path
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading or writing .zst files requires the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+def open_binary(file_path, mode='rb'):
+    """
+    Open a file in binary mode, transparently (de)compressing .gz and .zst files.
+
+    Decompression is streamed, so large files are never fully loaded in memory.
+    """
+    codec = compression_of(file_path)
+    if codec == 'gzip':
+        return gzip.open(file_path, mode)
+    if codec == 'zstd':
+        zstandard = _import_zstandard()
+        raw = open(file_path, mode)
+        if 'r' in mode:
+            # The raw zstd reader has no readline(), buffer it so it can be iterated by line
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True))
+        return zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+    return open(file_path, mode)
+
+
+def open_text(file_path, mode='r', encoding='utf-8', newline=None):
+    """
+    Open a file in text mode, transparently (de)compressing .gz and .zst files.
+
+    Args:
+        file_path: Path to the file
+        mode: 'r', 'w' or 'a'
+        encoding: Text encoding (default: utf-8)
+        newline: Newline handling, as for open() (use '' to keep line endings untouched)
+
+    Returns:
+        A text file object
+    """
+    mode = mode.replace('t', '')
+    codec = compression_of(file_path)
+    if codec is None:
+        return open(file_path, mode, encoding=encoding, newline=newline)
+    if codec == 'gzip':
+        return gzip.open(file_path, mode + 't', encoding=encoding, newline=newline)
+    return io.TextIOWrapper(open_binary(file_path, mode + 'b'), encoding=encoding, newline=newline)
+
+
+def iter_jsonl(file_path, verbose=True) -> Iterator[Dict]:
+    """
+    Stream the records of a (possibly compressed) JSONL file.
+
+    Blank lines are skipped; invalid lines are reported and skipped.
+    """
+    with open_text(file_path, 'r') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if verbose:
+                    print(f"Warning: Invalid JSON at line {line_num} in {file_path}")
+
+
+def read_jsonl(file_path, verbose=True) -> List[Dict]:
+    """Read all records of a (possibly compressed) JSONL file."""
+    return list(iter_jsonl(file_path, verbose))
+
+
+def write_jsonl(file_path, records: Iterable[Dict]):
+    """Write records to a (possibly compressed) JSONL file, one JSON object per line."""
+    with open_text(file_path, 'w') as f:
+        for record in records:
+            json.dump(record, f)
+            f.write("\n")
+
+
+def temporary_path(file_path) -> str:
+    """
+    Return a temporary path next to file_path for writing it atomically.
+
+    The temporary file keeps the compression suffix, so it is written with the right codec,
+    but does not end with a JSONL extension, so a leftover one is never read as data.
+    """
+    file_path = str(file_path)
+    codec_suffix = next((suffix for suffix in COMPRESSION_SUFFIXES if file_path.endswith(suffix)), '')
+    return f"{file_path}.tmp{os.getpid()}{codec_suffix}"
+
+
+def write_jsonl_atomic(file_path, records: Iterable[Dict]):
+    """Write a (possibly compressed) JSONL file via a temporary file and an atomic rename."""
+    tmp_path = temporary_path(file_path)
+    try:
+        write_jsonl(tmp_path, records)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def dedupe_jsonl_variants(file_paths) -> List[str]:
+    """
+    Keep a single variant when the same file exists both plain and compressed.
+
+    The plain .jsonl file wins, then .jsonl.gz, then .jsonl.zst, so a file that was
+    converted without removing the source is not read twice.
+    """
+    chosen = {}
+    for file_path in file_paths:
+        base = strip_jsonl_extension(file_path)
+        current = chosen.get(base)
+        if current is None or JSONL_EXTENSIONS.index(jsonl_extension(file_path)) < JSONL_EXTENSIONS.index(jsonl_extension(current)):
+            chosen[base] = file_path
+    return sorted(chosen.values())
+
+
+def find_jsonl_files(directory, include_formatted=False) -> List[str]:
+    """Recursively find (possibly compressed) JSONL files under a directory, sorted."""
+    jsonl_files = []
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if is_jsonl_file(file, include_formatted):
+                jsonl_files.append(os.path.join(root, file))
+    return dedupe_jsonl_variants(jsonl_files)
+
+
+def convert_file(file_path, compression, remove_source=False) -> str:
+    """
+    Convert a JSONL file to another compression.
+
+    Args:
+        file_path: Source .jsonl/.jsonl.gz/.jsonl.zst file
+        compression: Target compression ('none', 'gz' or 'zst')
+        remove_source: Whether to delete the source file after a successful conversion
+
+    Returns:
+        Path of the converted file
+    """
+    output_path = strip_jsonl_extension(file_path) + '.jsonl' + COMPRESSION_CHOICES[compression]
+    if output_path == file_path:
+        return file_path
+    tmp_path = temporary_path(output_path)
+    # Copy line by line so the conversion is streamed and keeps the bytes of every record
+    with open_text(file_path, 'r', newline='') as f_in, open_text(tmp_path, 'w', newline='') as f_out:
+        for line in f_in:
+            f_out.write(line)
+    os.replace(tmp_path, output_path)
+    if remove_source:
+        os.remove(file_path)
+    return output_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert JSONL files between plain, gzip and zstd compression')
+    parser.add_argument('paths', nargs='+', help='JSONL files or directories to convert')
+    parser.add_argument('--to', choices=list(COMPRESSION_CHOICES), required=True,
+                        help='Target compression: none, gz or zst')
+    parser.add_argument('--remove-source', action='store_true', help='Delete the source files after conversion')
+    args = parser.parse_args()
+
+    total_in = 0
+    total_out = 0
+    for path in args.paths:
+        if os.path.isdir(path):
+            files = [os.path.join(root, file) for root, _, names in os.walk(path)
+                     for file in sorted(names) if is_jsonl_file(file, include_formatted=True)]
+        else:
+            files = [path]
+        for file_path in files:
+            size_in = os.path.getsize(file_path)
+            output_path = convert_file(file_path, args.to, args.remove_source)
+            size_out = os.path.getsize(output_path)
+            total_in += size_in
+            total_out += size_out
+            print(f"{file_path} -> {output_path} ({size_in / 1e6:.2f} MB -> {size_out / 1e6:.2f} MB)")
+
+    print(f"\nTotal: {total_in / 1e6:.1f} MB -> {total_out / 1e6:.1f} MB")
@@ -0,0 +1,252 @@
+import os
+import json
+import sqlite3
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# File name of the index kept in every llm_judge results directory (safe to delete, it is rebuilt)
+JUDGE_INDEX_NAME = "judge_scores.db"
+
+# Suffix of the llm_judge result files indexed
+RESULT_FILE_SUFFIX = "_single_evaluation.json"
+
+# Bump whenever the schema changes; an index of another version is rebuilt
+INDEX_VERSION = 1
+
+# Sub-scores of structured judgements, stored next to the score
+SUB_SCORE_FIELDS = ("relevance", "helpfulness")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Result files the scores were read from, with the size/mtime they had
+CREATE TABLE IF NOT EXISTS result_files (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+
+-- One row per judged sample; test cases without samples keep a row with a NULL sample_index.
+-- test_id has no type so the ids keep the type they have in the result files
+CREATE TABLE IF NOT EXISTS scores (
+    filename TEXT NOT NULL,
+    entry_index INTEGER NOT NULL,
+    test_id,
+    model TEXT NOT NULL,
+    language TEXT,
+    category TEXT,
+    sample_index INTEGER,
+    score REAL,
+    relevance REAL,
+    helpfulness REAL
+);
+
+-- Results of deterministic computations over the scores (e.g. bootstrap intervals), by their inputs
+CREATE TABLE IF NOT EXISTS memo (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_scores_file ON scores (filename, entry_index, sample_index);
+CREATE INDEX IF NOT EXISTS idx_scores_model ON scores (model, language, category);
+"""
+
+
+def get_model_from_filename(filename: str, language: Optional[str], category: Optional[str]) -> str:
+    """Return the model part of a '<language>_<category>_<model>_single_evaluation.json' file name."""
+    base = filename.split(RESULT_FILE_SUFFIX)[0]
+    prefix = f"{language}_{category}_"
+    return base[len(prefix):] if base.startswith(prefix) else base
+
+
+class JudgeScoreIndex:
+    """
+    Compact SQLite index of the scores in an llm_judge results directory.
+
+    The result files keep the full judge responses and are large; the index only holds
+    (id, model, language, category, sample, score) rows, so summaries, plots and heatmaps
+    read it instead of parsing every file. Files written by the judge are added directly,
+    and sync() picks up files that were added, changed or removed by other means.
+    """
+
+    def __init__(self, results_dir: str, path: Optional[str] = None):
+        self.results_dir = results_dir
+        self.path = path or os.path.join(results_dir, JUDGE_INDEX_NAME)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(INDEX_VERSION):
+                self.conn.execute("DELETE FROM scores")
+                self.conn.execute("DELETE FROM result_files")
+                self.conn.execute("DELETE FROM memo")
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                                  (str(INDEX_VERSION),))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _is_current(self, filename: str, stat) -> bool:
+        row = self.conn.execute("SELECT size, mtime_ns FROM result_files WHERE filename = ?", (filename,)).fetchone()
+        return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns
+
+    def add_file(self, file_path: str, entries: Optional[List[Dict]] = None):
+        """
+        Index (or re-index) the scores of a result file.
+
+        Args:
+            file_path: Path of the result file in the results directory
+            entries: The entries just written to the file; read from the file if not given
+        """
+        filename = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        if entries is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        if not isinstance(entries, list):
+            entries = []
+
+        rows = []
+        for entry_index, entry in enumerate(entries):
+            language = entry.get("language")
+            category = entry.get("category")
+            model = get_model_from_filename(filename, language, category)
+            scores = entry.get("individual_scores")
+            if scores is None:
+                scores = [entry.get("score")]
+            sub_scores = entry.get("individual_sub_scores") or [None] * len(scores)
+            if not scores:
+                rows.append((filename, entry_index, entry.get("id"), model, language, category,
+                             None, None, None, None))
+            for sample_index, (score, sample_sub_scores) in enumerate(zip(scores, sub_scores)):
+                sample_sub_scores = sample_sub_scores or {}
+                rows.append((filename, entry_index, entry.get("id"), model, language, category, sample_index,
+                             score, *(sample_sub_scores.get(field) for field in SUB_SCORE_FIELDS)))
+        with self.conn:
+            self.conn.execute("DELETE FROM scores WHERE filename = ?", (filename,))
+            self.conn.executemany("INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO result_files (filename, size, mtime_ns) VALUES (?, ?, ?)",
+                              (filename, stat.st_size, stat.st_mtime_ns))
+
+    def remove_file(self, filename: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM scores WHERE filename = ?", (filename,))
+            self.conn.execute("DELETE FROM result_files WHERE filename = ?", (filename,))
+
+    def sync(self, verbose: bool = True) -> int:
+        """
+        Bring the index up to date with the result files of the directory.
+
+        Only files whose size or modification time changed since they were indexed are read.
+
+        Returns:
+            Number of files (re-)indexed
+        """
+        present = set()
+        indexed = 0
+        for filename in sorted(os.listdir(self.results_dir)):
+            if not filename.endswith(RESULT_FILE_SUFFIX):
+                continue
+            present.add(filename)
+            file_path = os.path.join(self.results_dir, filename)
+            if self._is_current(filename, os.stat(file_path)):
+                continue
+            try:
+                self.add_file(file_path)
+                indexed += 1
+            except (OSError, ValueError) as e:
+                print(f"Error indexing {file_path}: {str(e)}")
+        for (filename,) in self.conn.execute("SELECT filename FROM result_files").fetchall():
+            if filename not in present:
+                self.remove_file(filename)
+        if verbose and indexed:
+            print(f"Indexed the scores of {indexed} result file(s) in {self.path}")
+        return indexed
+
+    def entry_count(self, file_path: str) -> Optional[int]:
+        """Return the number of test cases of a result file, or None if it is not indexed as it is now."""
+        filename = os.path.basename(file_path)
+        if not self._is_current(filename, os.stat(file_path)):
+            return None
+        return self.conn.execute("SELECT COUNT(DISTINCT entry_index) FROM scores WHERE filename = ?",
+                                 (filename,)).fetchone()[0]
+
+    def read_entries(self) -> Dict[str, List[Dict]]:
+        """
+        Rebuild the per-test-case results of every indexed file without the judge responses.
+
+        Returns:
+            {filename: [entry]} in file name order, each entry with the id, score (mean of the
+            valid sample scores), individual_scores, individual_sub_scores, num_completions,
+            num_valid_scores, language and category fields of the result file
+        """
+        entries = defaultdict(dict)
+        rows = self.conn.execute("""
+            SELECT filename, entry_index, test_id, language, category, sample_index, score, relevance, helpfulness
+            FROM scores ORDER BY filename, entry_index, sample_index""")
+        for filename, entry_index, test_id, language, category, sample_index, score, *sub_scores in rows:
+            entry = entries[filename].get(entry_index)
+            if entry is None:
+                entry = entries[filename][entry_index] = {
+                    "id": test_id, "language": language, "category": category,
+                    "individual_scores": [], "individual_sub_scores": []}
+            if sample_index is None:
+                continue
+            entry["individual_scores"].append(score)
+            has_sub_scores = any(value is not None for value in sub_scores)
+            entry["individual_sub_scores"].append(dict(zip(SUB_SCORE_FIELDS, sub_scores)) if has_sub_scores else None)
+
+        results = {}
+        for filename, file_entries in entries.items():
+            results[filename] = []
+            for entry in file_entries.values():
+                valid_scores = [score for score in entry["individual_scores"] if score is not None]
+                entry["score"] = sum(valid_scores) / len(valid_scores) if valid_scores else None
+                entry["num_completions"] = len(entry["individual_scores"])
+                entry["num_valid_scores"] = len(valid_scores)
+                results[filename].append(entry)
+        return results
+
+    def file_means(self) -> Dict[str, float]:
+        """Return {filename: mean test case score} of every indexed file with scores."""
+        rows = self.conn.execute("""
+            SELECT filename, AVG(entry_score) FROM (
+                SELECT filename, entry_index, AVG(score) AS entry_score FROM scores GROUP BY filename, entry_index)
+            WHERE entry_score IS NOT NULL GROUP BY filename ORDER BY filename""")
+        return {filename: mean for filename, mean in rows}
+
+    def memoize(self, name: str, inputs, compute):
+        """
+        Return compute(), stored under (name, inputs) so later summaries of the same scores reuse it.
+
+        Only for deterministic computations (e.g. seeded bootstrap intervals) returning JSON
+        values; lists come back as tuples.
+
+        Args:
+            name: Name of the computation, including any parameter besides inputs
+            inputs: JSON-serializable inputs the result depends on
+            compute: Callable computing the result
+        """
+        payload = json.dumps([name, inputs], sort_keys=True, default=str)
+        key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        row = self.conn.execute("SELECT value FROM memo WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            value = json.loads(row[0])
+        else:
+            value = compute()
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO memo (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        return tuple(value) if isinstance(value, (list, tuple)) else value
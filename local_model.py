@@ -0,0 +1,250 @@
+import os
+import copy
+import time
+import queue
+import importlib
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+# Seconds the first request of a batch waits for concurrent requests to join it
+DEFAULT_BATCH_WAIT = 0.05
+
+# Context window of llama.cpp models, in tokens
+DEFAULT_CONTEXT_SIZE = 8192
+
+# Memory for llama.cpp prompt-prefix states (the KV cache of the shared system prompt)
+DEFAULT_PREFIX_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+BACKEND_CHOICES = ('auto', 'llama_cpp', 'transformers')
+
+
+def _import_optional(module: str, package: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise ImportError(f"The local model backend requires the '{package}' package (pip install {package})")
+
+
+def make_chat_response(texts: List[str]):
+    """Wrap completion texts in a chat-completions shaped response (choices[i].message.content)."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text)) for text in texts])
+
+
+class LlamaCppBackend:
+    """
+    GGUF models run on the CPU with llama.cpp (llama-cpp-python).
+
+    llama-cpp-python evaluates one sequence at a time, so a batch is generated prompt by
+    prompt. The prompts share the system prompt, whose KV state is kept in a RAM cache and
+    restored for every prompt, so only the tokens after it are evaluated.
+    """
+
+    def __init__(self, model_path: str, n_ctx: int = DEFAULT_CONTEXT_SIZE, n_threads: Optional[int] = None,
+                 prefix_cache_bytes: int = DEFAULT_PREFIX_CACHE_BYTES):
+        llama_cpp = _import_optional('llama_cpp', 'llama-cpp-python')
+        self.llm = llama_cpp.Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads or os.cpu_count(),
+                                   verbose=False)
+        # States are looked up by the longest cached token prefix of a prompt
+        self.llm.set_cache(llama_cpp.LlamaRAMCache(capacity_bytes=prefix_cache_bytes))
+
+    def generate(self, prompts: List[List[Dict]], max_tokens: int, temperature: float = 0.0,
+                 seed: Optional[int] = None) -> List[str]:
+        texts = []
+        for messages in prompts:
+            kwargs = {} if seed is None else {"seed": seed}
+            response = self.llm.create_chat_completion(messages=messages, max_tokens=max_tokens,
+                                                       temperature=temperature, top_p=1.0, **kwargs)
+            texts.append(response["choices"][0]["message"]["content"])
+        return texts
+
+
+class TransformersBackend:
+    """
+    Hugging Face causal language models run with transformers (on the CPU by default).
+
+    A batch is generated in one generate() call. Every row starts with the tokens of the
+    shared system prompt, whose KV cache is computed once and copied into each batch; the
+    rest of each prompt is padded on the left of its own part, and the attention mask
+    hides the padding.
+    """
+
+    def __init__(self, model_path: str, device: str = "cpu"):
+        self.torch = _import_optional('torch', 'torch')
+        transformers = _import_optional('transformers', 'transformers')
+        self.DynamicCache = transformers.DynamicCache
+        self.tokenizer = transformers.AutoTokenizer.from_pretrained(model_path)
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = transformers.AutoModelForCausalLM.from_pretrained(
+            model_path, torch_dtype=self.torch.float32).to(device).eval()
+        self.device = device
+        # (token ids, KV cache) of the last shared prompt prefix
+        self._prefix = None
+
+    def encode(self, messages: List[Dict], add_generation_prompt: bool = True) -> List[int]:
+        return list(self.tokenizer.apply_chat_template(messages, add_generation_prompt=add_generation_prompt,
+                                                       tokenize=True))
+
+    def shared_prefix(self, prompts: List[List[Dict]], encoded: List[List[int]]) -> List[int]:
+        """Return the token ids of the system prompt that every encoded prompt of the batch starts with."""
+        system = [message for message in prompts[0][:1] if message["role"] == "system"]
+        if not system:
+            return []
+        try:
+            prefix = self.encode(system, add_generation_prompt=False)
+        except Exception:
+            # Some chat templates refuse a conversation without a user message
+            return []
+        length = 0
+        # Keep at least one token of every prompt outside the cache for generate()
+        limit = min(len(prefix), min(len(ids) for ids in encoded) - 1)
+        while length < limit and all(ids[length] == prefix[length] for ids in encoded):
+            length += 1
+        return prefix[:length]
+
+    def get_prefix_cache(self, prefix: List[int]):
+        if self._prefix is None or self._prefix[0] != prefix:
+            with self.torch.no_grad():
+                output = self.model(self.torch.tensor([prefix], device=self.device), use_cache=True)
+            cache = output.past_key_values
+            if isinstance(cache, tuple):
+                cache = self.DynamicCache.from_legacy_cache(cache)
+            self._prefix = (prefix, cache)
+        return self._prefix[1]
+
+    def generate(self, prompts: List[List[Dict]], max_tokens: int, temperature: float = 0.0,
+                 seed: Optional[int] = None) -> List[str]:
+        torch = self.torch
+        encoded = [self.encode(messages) for messages in prompts]
+        prefix = self.shared_prefix(prompts, encoded)
+        rest = [ids[len(prefix):] for ids in encoded]
+        width = max(len(ids) for ids in rest)
+        pad = self.tokenizer.pad_token_id
+        input_ids = [prefix + [pad] * (width - len(ids)) + ids for ids in rest]
+        attention_mask = [[1] * len(prefix) + [0] * (width - len(ids)) + [1] * len(ids) for ids in rest]
+
+        kwargs = {"max_new_tokens": max_tokens, "pad_token_id": pad, "do_sample": temperature > 0}
+        if temperature > 0:
+            kwargs.update(temperature=temperature, top_p=1.0)
+        if prefix:
+            cache = copy.deepcopy(self.get_prefix_cache(prefix))
+            cache.batch_repeat_interleave(len(prompts))
+            kwargs["past_key_values"] = cache
+        if seed is not None:
+            torch.manual_seed(seed)
+
+        with torch.no_grad():
+            output = self.model.generate(input_ids=torch.tensor(input_ids, device=self.device),
+                                         attention_mask=torch.tensor(attention_mask, device=self.device), **kwargs)
+        start = len(prefix) + width
+        return [self.tokenizer.decode(row[start:], skip_special_tokens=True) for row in output]
+
+
+class LocalModelClient:
+    """
+    Thread-safe client of a local model that batches the requests of concurrent callers.
+
+    Callers block in complete() while a worker thread collects the requests that arrive
+    within batch_wait seconds (up to max_batch_size completions) and generates them together.
+    Responses have the chat-completions shape, so they are read like the API responses.
+    """
+
+    def __init__(self, backend, max_batch_size: int = 8, batch_wait: float = DEFAULT_BATCH_WAIT):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_wait = batch_wait
+        self.stats = {'requests': 0, 'batches': 0, 'completions': 0}
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def complete(self, messages: List[Dict], max_tokens: int = 800, temperature: float = 0.0, n: int = 1,
+                 seed: Optional[int] = None):
+        """
+        Generate n completions of a chat prompt.
+
+        Args:
+            messages: Chat messages (role/content dictionaries)
+            max_tokens: Maximum new tokens per completion
+            temperature: Sampling temperature (0 decodes greedily)
+            n: Number of completions
+            seed: Sampling seed of the batch the request is generated in
+
+        Returns:
+            Response with choices[i].message.content
+        """
+        future = Future()
+        self._queue.put(((messages, max_tokens, temperature, n, seed), future))
+        return make_chat_response(future.result())
+
+    def _run(self):
+        # Request that did not fit in the previous batch
+        pending = None
+        while True:
+            batch = [pending or self._queue.get()]
+            pending = None
+            size = batch[0][0][3]
+            deadline = time.monotonic() + self.batch_wait
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if size + item[0][3] > self.max_batch_size:
+                    pending = item
+                    break
+                batch.append(item)
+                size += item[0][3]
+
+            # Requests with different generation settings cannot share a generate() call
+            groups = {}
+            for request, future in batch:
+                groups.setdefault(request[1:3] + request[4:], []).append((request, future))
+            for (max_tokens, temperature, seed), requests in groups.items():
+                self._generate(requests, max_tokens, temperature, seed)
+
+    def _generate(self, requests, max_tokens, temperature, seed):
+        prompts = [request[0] for request, _ in requests for _ in range(request[3])]
+        try:
+            texts = self.backend.generate(prompts, max_tokens, temperature, seed)
+        except Exception as e:
+            for _, future in requests:
+                future.set_exception(e)
+            return
+        self.stats['requests'] += len(requests)
+        self.stats['batches'] += 1
+        self.stats['completions'] += len(texts)
+        position = 0
+        for request, future in requests:
+            future.set_result(texts[position:position + request[3]])
+            position += request[3]
+
+
+def load_local_model(model_path: str, backend: str = 'auto', max_batch_size: int = 8, **backend_kwargs):
+    """
+    Load a local model and wrap it in a batching client.
+
+    Args:
+        model_path: GGUF file (llama.cpp) or Hugging Face model directory / id (transformers)
+        backend: 'llama_cpp', 'transformers', or 'auto' to choose by the model path
+        max_batch_size: Maximum completions generated together
+        **backend_kwargs: Extra arguments of the backend (e.g. n_ctx, n_threads or device)
+
+    Returns:
+        LocalModelClient serving the model
+    """
+    if backend == 'auto':
+        backend = 'llama_cpp' if model_path.lower().endswith('.gguf') else 'transformers'
+    if backend == 'llama_cpp':
+        model = LlamaCppBackend(model_path, **backend_kwargs)
+    elif backend == 'transformers':
+        model = TransformersBackend(model_path, **backend_kwargs)
+    else:
+        raise ValueError(f"Unknown local model backend: {backend} (choose from {', '.join(BACKEND_CHOICES)})")
+    print(f"Loaded local model {model_path} with the {backend} backend")
+    return LocalModelClient(model, max_batch_size=max_batch_size)
@@ -0,0 +1,492 @@
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from request_scheduler import percentile
+
+# Repository root, where generate_completions.py lives
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Default response: a fenced completion followed by a judge verdict, so the same canned text
+# works for generate_completions.py (cleaned to "pass") and llm_judge.py (score 7)
+DEFAULT_CANNED_TEXT = ("```\npass\n```\n"
+                       "Final Sum Score for Completion: 7\n"
+                       "Detailed Reasoning:\nMock response, the completion was not looked at.")
+
+# Characters per streamed chunk (about one token)
+CHUNK_CHARS = 4
+
+# Environment variables pointing the generation and judge clients at an endpoint
+ENDPOINT_ENV_VARS = [
+    "MINISTRAL_ENDPOINT", "DEEPSEEK_V3_ENDPOINT", "DEEPSEEK_V31_ENDPOINT", "GPT41MINI_ENDPOINT",
+    "GPT41_ENDPOINT", "GPT41NANO_ENDPOINT", "GPT4O_ENDPOINT", "O3MINI_ENDPOINT",
+]
+# Read by the Anthropic SDK when no base_url is given
+ANTHROPIC_BASE_URL_ENV = "ANTHROPIC_BASE_URL"
+API_KEY_ENV_VARS = [
+    "CLAUDE_API_KEY", "MINISTRAL_API_KEY", "DEEPSEEK_V3_API_KEY", "DEEPSEEK_V31_API_KEY", "GPT41MINI_API_KEY",
+    "GPT41_API_KEY", "GPT41NANO_API_KEY", "GPT4O_API_KEY", "O3MINI_API_KEY",
+]
+
+
+def parse_latency(spec: str):
+    """
+    Parse a latency distribution into a sampler returning seconds.
+
+    Supported specs: 'fixed:S', 'uniform:MIN,MAX', 'normal:MEAN,STDDEV' (clipped at 0)
+    and 'lognormal:MEDIAN,SIGMA', all in seconds.
+
+    Returns:
+        Callable taking a random.Random and returning a latency in seconds
+    """
+    kind, _, params = spec.partition(':')
+    try:
+        values = [float(value) for value in params.split(',')] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency parameters: {spec}")
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal' and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal' and len(values) == 2:
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Invalid latency distribution: {spec} (use fixed:S, uniform:A,B, normal:M,SD or lognormal:MEDIAN,SIGMA)")
+
+
+class MockBehavior:
+    """Latency, fault injection and response settings of the mock server."""
+
+    def __init__(self, latency: str = 'fixed:0.2', token_delay: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, response: str = 'canned',
+                 canned_text: str = DEFAULT_CANNED_TEXT, seed: Optional[int] = None):
+        self.latency = parse_latency(latency)
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.response = response
+        self.canned_text = canned_text
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """Return (fault, latency) for a request; fault is 429, 500 or None."""
+        with self._lock:
+            roll = self._rng.random()
+            latency = self.latency(self._rng)
+        if roll < self.throttle_rate:
+            return 429, latency
+        if roll < self.throttle_rate + self.error_rate:
+            return 500, latency
+        return None, latency
+
+    def completion_text(self, messages: List[Dict], max_tokens: Optional[int]) -> str:
+        """Return the canned text, or in echo mode the content of the last user message."""
+        if self.response != 'echo':
+            return self.canned_text
+        text = ""
+        for message in messages:
+            if message.get("role") == "user":
+                content = message.get("content", "")
+                if isinstance(content, list):
+                    content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+                text = content
+        # Roughly respect the token budget (about 4 characters per token)
+        return text[:max_tokens * 4] if max_tokens else text
+
+
+class MockStats:
+    """Thread-safe log of the requests handled by the mock server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = []
+
+    def record(self, route: str, status: int, start: float, end: float, body_hash: str, aborted: bool = False):
+        with self._lock:
+            self.requests.append({"route": route, "status": status, "start": start, "end": end,
+                                  "hash": body_hash, "aborted": aborted})
+
+    def reset(self):
+        with self._lock:
+            self.requests = []
+
+    def summary(self, retry_after: Optional[float] = None) -> Dict:
+        """
+        Summarize the requests: throughput, latency percentiles and retry behavior.
+
+        A request is counted as a retry when the same request body was sent before and
+        failed. Retries of a 429 that come sooner than the Retry-After delay are counted
+        as early retries.
+        """
+        with self._lock:
+            requests = list(self.requests)
+        if not requests:
+            return {"requests": 0}
+        duration = max(r["end"] for r in requests) - min(r["start"] for r in requests)
+        latencies = [r["end"] - r["start"] for r in requests if r["status"] == 200]
+        by_hash = defaultdict(list)
+        for request in requests:
+            by_hash[request["hash"]].append(request)
+
+        retries = 0
+        early_retries = 0
+        retry_gaps = []
+        for attempts in by_hash.values():
+            attempts.sort(key=lambda r: r["start"])
+            for previous, current in zip(attempts, attempts[1:]):
+                if previous["status"] == 200:
+                    continue
+                retries += 1
+                gap = current["start"] - previous["end"]
+                retry_gaps.append(gap)
+                if previous["status"] == 429 and retry_after is not None and gap < retry_after * 0.95:
+                    early_retries += 1
+
+        return {
+            "requests": len(requests),
+            "duration": duration,
+            "requests_per_second": len(requests) / duration if duration > 0 else None,
+            "status_counts": dict(Counter(r["status"] for r in requests)),
+            "route_counts": dict(Counter(r["route"] for r in requests)),
+            "streams_closed_early": sum(1 for r in requests if r["aborted"]),
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "latency_p99": percentile(latencies, 99),
+            "retries": retries,
+            "early_retries": early_retries,
+            "retry_gap_p50": percentile(retry_gaps, 50),
+        }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Request handler speaking the subsets of the provider APIs used by the repository.
+
+    - POST .../chat/completions: Azure OpenAI chat completions and Azure AI Inference complete()
+      (both use the chat-completions JSON and SSE formats; n > 1 returns n choices)
+    - POST .../v1/messages: Anthropic messages
+    - GET /stats: JSON summary of the requests handled so far
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "MockLLM/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path.rstrip('/') == '/stats':
+            self.send_json(200, self.server.stats.summary(self.server.behavior.retry_after))
+        else:
+            self.send_json(404, {"error": {"code": "NotFound", "message": "Unknown path"}})
+
+    def do_POST(self):
+        start = time.monotonic()
+        path = urlparse(self.path).path.rstrip('/')
+        raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        body_hash = hashlib.sha256(raw).hexdigest()
+        try:
+            body = json.loads(raw or b'{}')
+        except json.JSONDecodeError:
+            body = None
+
+        if path.endswith('/v1/messages'):
+            route = 'anthropic'
+        elif path.endswith('/chat/completions'):
+            route = 'chat'
+        else:
+            self.send_json(404, {"error": {"code": "NotFound", "message": f"Unknown path {path}"}})
+            return
+        if not isinstance(body, dict):
+            self.send_error_response(route, 400, "Request body is not a JSON object")
+            self.server.stats.record(route, 400, start, time.monotonic(), body_hash)
+            return
+
+        behavior = self.server.behavior
+        fault, latency = behavior.draw()
+        time.sleep(latency)
+        if fault is not None:
+            self.send_error_response(route, fault, "Injected failure")
+            self.server.stats.record(route, fault, start, time.monotonic(), body_hash)
+            return
+
+        messages = list(body.get("messages", []))
+        if route == 'anthropic' and body.get("system"):
+            messages.insert(0, {"role": "system", "content": body["system"]})
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        n = (body.get("n") or 1) if route == 'chat' else 1
+        texts = [behavior.completion_text(messages, max_tokens) for _ in range(n)]
+
+        aborted = False
+        try:
+            if body.get("stream"):
+                self.stream_response(route, body.get("model", "mock"), texts)
+            else:
+                time.sleep(behavior.token_delay * sum(len(text) for text in texts) / CHUNK_CHARS)
+                self.send_json(200, self.make_response(route, body.get("model", "mock"), texts))
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed a stream once it had what it needed
+            aborted = True
+            self.close_connection = True
+        self.server.stats.record(route, 200, start, time.monotonic(), body_hash, aborted)
+
+    def send_error_response(self, route: str, status: int, message: str):
+        headers = {}
+        if status == 429:
+            retry_after = self.server.behavior.retry_after
+            # Whole seconds are rounded up, so clients reading only retry-after never retry early
+            headers = {"retry-after": str(math.ceil(retry_after)), "retry-after-ms": str(int(retry_after * 1000))}
+        if route == 'anthropic':
+            error_type = {429: "rate_limit_error", 400: "invalid_request_error"}.get(status, "api_error")
+            payload = {"type": "error", "error": {"type": error_type, "message": message}}
+        else:
+            payload = {"error": {"code": str(status), "message": message}}
+        self.send_json(status, payload, headers)
+
+    @staticmethod
+    def make_response(route: str, model: str, texts: List[str]) -> Dict:
+        usage_tokens = sum(len(text) for text in texts) // CHUNK_CHARS
+        if route == 'anthropic':
+            return {
+                "id": f"msg_{uuid.uuid4().hex}", "type": "message", "role": "assistant", "model": model,
+                "content": [{"type": "text", "text": texts[0]}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": 0, "output_tokens": usage_tokens},
+            }
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                        for i, text in enumerate(texts)],
+            "usage": {"prompt_tokens": 0, "completion_tokens": usage_tokens, "total_tokens": usage_tokens},
+        }
+
+    def write_event(self, data: Dict, event: Optional[str] = None):
+        message = (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+        self.wfile.write(message.encode('utf-8'))
+        self.wfile.flush()
+
+    def stream_response(self, route: str, model: str, texts: List[str]):
+        """Send the completions as server-sent events, one chunk of CHUNK_CHARS characters at a time."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        delay = self.server.behavior.token_delay
+
+        if route == 'anthropic':
+            message_id = f"msg_{uuid.uuid4().hex}"
+            self.write_event({"type": "message_start", "message": {
+                "id": message_id, "type": "message", "role": "assistant", "model": model, "content": [],
+                "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 0, "output_tokens": 0}}},
+                "message_start")
+            self.write_event({"type": "content_block_start", "index": 0,
+                              "content_block": {"type": "text", "text": ""}}, "content_block_start")
+            for i in range(0, len(texts[0]), CHUNK_CHARS):
+                time.sleep(delay)
+                self.write_event({"type": "content_block_delta", "index": 0,
+                                  "delta": {"type": "text_delta", "text": texts[0][i:i + CHUNK_CHARS]}},
+                                 "content_block_delta")
+            self.write_event({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            self.write_event({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                              "usage": {"output_tokens": len(texts[0]) // CHUNK_CHARS}}, "message_delta")
+            self.write_event({"type": "message_stop"}, "message_stop")
+            return
+
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def chunk(choices):
+            return {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model, "choices": choices}
+
+        for position in range(0, max(len(text) for text in texts), CHUNK_CHARS):
+            time.sleep(delay)
+            choices = [{"index": i, "delta": {"content": text[position:position + CHUNK_CHARS]}, "finish_reason": None}
+                       for i, text in enumerate(texts) if position < len(text)]
+            self.write_event(chunk(choices))
+        self.write_event(chunk([{"index": i, "delta": {}, "finish_reason": "stop"} for i in range(len(texts))]))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_server(behavior: MockBehavior, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """
+    Start the mock server in a background thread.
+
+    Args:
+        behavior: MockBehavior of the server
+        host: Interface to listen on
+        port: Port to listen on (0 picks a free port)
+
+    Returns:
+        The running server; its URL is http://{host}:{server.server_address[1]}
+    """
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.behavior = behavior
+    server.stats = MockStats()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def mock_environment(url: str) -> Dict[str, str]:
+    """Return a copy of the environment with every endpoint pointed at the mock server."""
+    env = dict(os.environ)
+    for name in ENDPOINT_ENV_VARS:
+        env[name] = url
+    env[ANTHROPIC_BASE_URL_ENV] = url
+    for name in API_KEY_ENV_VARS:
+        env[name] = "mock-key"
+    return env
+
+
+def print_report(summary: Dict, wall_time: float, exit_code: int):
+    print("\n" + "="*80)
+    print("MOCK BENCHMARK REPORT")
+    print("="*80)
+    print(f"Wall time: {wall_time:.1f}s (exit code {exit_code})")
+    if not summary.get("requests"):
+        print("No requests reached the mock server")
+        print("="*80)
+        return
+    throughput = summary["requests_per_second"]
+    print(f"Requests: {summary['requests']} in {summary['duration']:.1f}s"
+          + (f" ({throughput:.1f} req/s)" if throughput else ""))
+    print(f"Requests by route: {summary['route_counts']}")
+    print(f"Responses by status: {summary['status_counts']}")
+    if summary["latency_p50"] is not None:
+        print(f"Server latency of successful requests: p50 {summary['latency_p50']:.3f}s, "
+              f"p95 {summary['latency_p95']:.3f}s, p99 {summary['latency_p99']:.3f}s")
+    if summary["streams_closed_early"]:
+        print(f"Streams closed early by the client: {summary['streams_closed_early']}")
+    failures = sum(count for status, count in summary["status_counts"].items() if int(status) != 200)
+    print(f"Failed responses: {failures}, retried: {summary['retries']}"
+          + (f" (median wait {summary['retry_gap_p50']:.2f}s)" if summary['retry_gap_p50'] is not None else "")
+          + f", retried before Retry-After: {summary['early_retries']}")
+    print("="*80)
+
+
+def run_benchmark(target: str, behavior: MockBehavior, script_args: List[str], completions_dir: str = None) -> Dict:
+    """
+    Run generate_completions.py or llm_judge.py against a mock server and report the results.
+
+    The script runs in a subprocess with every endpoint pointed at the mock server, so the
+    real client, scheduler and retry code is exercised over HTTP.
+
+    Args:
+        target: 'generate' or 'judge'
+        behavior: MockBehavior of the server
+        script_args: Extra command-line arguments of the script
+        completions_dir: Completions judged by the judge target
+
+    Returns:
+        Request summary of the mock server
+    """
+    server = start_server(behavior)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Mock server listening on {url}")
+
+    with tempfile.TemporaryDirectory(prefix="mock_benchmark_") as output_dir:
+        if target == 'generate':
+            command = [sys.executable, "generate_completions.py", "--output_dir", output_dir, "--no_cache"]
+            cwd = REPO_ROOT
+        else:
+            command = [sys.executable, "llm_judge.py", "--completions_dir", os.path.abspath(completions_dir),
+                       "--output_dir", output_dir, "--no_cache"]
+            cwd = os.path.join(REPO_ROOT, "completion_evaluations")
+        command += script_args
+        print(f"Running: {' '.join(command)}")
+
+        start = time.monotonic()
+        exit_code = subprocess.call(command, cwd=cwd, env=mock_environment(url))
+        wall_time = time.monotonic() - start
+
+    summary = server.stats.summary(behavior.retry_after)
+    server.shutdown()
+    print_report(summary, wall_time, exit_code)
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Local mock of the Azure OpenAI, Azure AI Inference and Anthropic chat APIs',
+        epilog='Arguments after "--" are passed to the benchmarked script')
+    parser.add_argument('command', choices=['serve', 'benchmark'],
+                        help='serve: run the mock server; benchmark: run a script against it and report')
+    parser.add_argument('--target', choices=['generate', 'judge'], default='generate',
+                        help='Script driven by the benchmark command (default: generate)')
+    parser.add_argument('--completions_dir', type=str, default=os.path.join(REPO_ROOT, 'completions'),
+                        help='Completions judged by the judge benchmark (default: completions)')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to listen on (serve only)')
+    parser.add_argument('--port', type=int, default=8800, help='Port to listen on (serve only, default: 8800)')
+    parser.add_argument('--latency', type=str, default='fixed:0.2',
+                        help='Time to first token: fixed:S, uniform:A,B, normal:M,SD or lognormal:MEDIAN,SIGMA '
+                             '(default: fixed:0.2)')
+    parser.add_argument('--token_delay', type=float, default=0.0,
+                        help='Seconds per generated chunk of about one token (default: 0)')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='Fraction of requests failing with 500')
+    parser.add_argument('--throttle_rate', type=float, default=0.0, help='Fraction of requests rejected with 429')
+    parser.add_argument('--retry_after', type=float, default=1.0,
+                        help='Retry-After seconds sent with 429 responses (default: 1)')
+    parser.add_argument('--response', choices=['canned', 'echo'], default='canned',
+                        help='canned: fixed text (--canned_file); echo: the last user message')
+    parser.add_argument('--canned_file', type=str, default=None,
+                        help='File with the canned response (default: a fenced "pass" plus a judge score)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the latency and fault draws')
+    argv = sys.argv[1:]
+    script_args = []
+    if '--' in argv:
+        script_args = argv[argv.index('--') + 1:]
+        argv = argv[:argv.index('--')]
+    args = parser.parse_args(argv)
+
+    canned_text = DEFAULT_CANNED_TEXT
+    if args.canned_file:
+        with open(args.canned_file, 'r', encoding='utf-8') as f:
+            canned_text = f.read()
+    behavior = MockBehavior(args.latency, args.token_delay, args.error_rate, args.throttle_rate, args.retry_after,
+                            args.response, canned_text, args.seed)
+
+    if args.command == 'serve':
+        server = start_server(behavior, args.host, args.port)
+        start = time.monotonic()
+        print(f"Mock server listening on http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)")
+        print(f"Point the clients at it with: {', '.join(ENDPOINT_ENV_VARS + [ANTHROPIC_BASE_URL_ENV])}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print_report(server.stats.summary(behavior.retry_after), time.monotonic() - start, 0)
+            server.shutdown()
+    else:
+        run_benchmark(args.target, behavior, script_args, args.completions_dir)
@@ -0,0 +1,349 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+# HTTP status codes that are worth retrying
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Status codes that mean the endpoint is overloaded and the concurrency should be reduced
+THROTTLE_STATUS_CODES = {429, 503}
+
+# Seconds of the per-minute budget that may be spent in a single burst
+DEFAULT_BURST_SECONDS = 10
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at a per-minute rate.
+
+    Used both for requests/min (one token per request) and for tokens/min
+    (the estimated prompt + completion tokens of each request).
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = DEFAULT_BURST_SECONDS):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Take tokens from the bucket, blocking until enough are available.
+
+        Requests larger than the bucket only wait for a full bucket, so they cannot block forever.
+
+        Returns:
+            The time spent waiting, in seconds
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Concurrency limit adjusted with additive-increase / multiplicative-decrease (AIMD).
+
+    Every successful request raises the limit by 1/limit (about +1 per round of requests),
+    every throttled request halves it, at most once per cooldown period so that a burst
+    of 429s caused by the same overload only counts once.
+    """
+
+    def __init__(self, max_limit: int, initial_limit: Optional[int] = None, min_limit: int = 1,
+                 decrease_factor: float = 0.5, cooldown: float = 2.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(min(initial_limit or self.max_limit, self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a request slot is free under the current limit."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False, succeeded: bool = False):
+        """
+        Free a request slot and adapt the limit.
+
+        Args:
+            throttled: The request was rejected because the endpoint is overloaded
+            succeeded: The request completed successfully
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            elif succeeded:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """Extract the HTTP status code from an OpenAI, Anthropic or Azure SDK exception."""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    Read the Retry-After delay (in seconds) sent with a failed response, if any.
+
+    Supports 'retry-after-ms', and 'retry-after' given in seconds or as an HTTP date.
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after-ms')
+        if value is not None:
+            return max(0.0, float(value) / 1000.0)
+        value = headers.get('retry-after')
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether a failed request should be retried.
+
+    HTTP errors are retried for timeouts, conflicts, throttling and server errors.
+    Errors without a status code are retried when they look like connection or timeout failures.
+    """
+    status = get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    name = type(error).__name__
+    return any(marker in name for marker in ('Timeout', 'Connection', 'ServiceRequest', 'ServiceResponse'))
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: int = 0, n: int = 1) -> int:
+    """
+    Roughly estimate the tokens a chat request consumes (about 4 characters per token).
+
+    Args:
+        messages: Chat messages with string contents
+        max_tokens: Maximum completion tokens per choice
+        n: Number of choices requested
+
+    Returns:
+        Estimated prompt + completion tokens
+    """
+    prompt_chars = sum(len(str(message.get('content', ''))) for message in messages)
+    return prompt_chars // 4 + max_tokens * n
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Return the q-th percentile of values (nearest rank), or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class RequestScheduler:
+    """
+    Shared scheduler for the requests sent to one deployment.
+
+    It enforces requests/min and tokens/min budgets with token buckets, adapts the
+    number of concurrent requests (AIMD), honors Retry-After on throttled responses
+    (pausing the whole deployment, not just the failed request) and retries transient
+    failures with jittered exponential backoff. The scheduler is thread-safe.
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_concurrency: int = 8,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrencyLimit(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'succeeded': 0,
+            'retries': 0,
+            'throttled': 0,
+            'failed': 0,
+            'wait_seconds': 0.0,
+        }
+        # Latency and time to first token (streamed responses) of the successful requests, in seconds
+        self.latencies = []
+        self.ttfts = []
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _pause(self, delay: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def _wait_for_pause(self):
+        while True:
+            with self._lock:
+                delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+            self._count('wait_seconds', delay)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, request, estimated_tokens: int = 0):
+        """
+        Run a request under the deployment's limits, retrying transient failures.
+
+        Args:
+            request: Callable sending the request and returning the response
+            estimated_tokens: Estimated tokens of the request, charged to the tokens/min budget
+
+        Returns:
+            The response returned by request()
+
+        Raises:
+            The last exception when the request is not retryable or all retries failed
+        """
+        attempt = 0
+        while True:
+            self._wait_for_pause()
+            if self.request_bucket:
+                self._count('wait_seconds', self.request_bucket.acquire(1))
+            if self.token_bucket and estimated_tokens:
+                self._count('wait_seconds', self.token_bucket.acquire(estimated_tokens))
+
+            self.concurrency.acquire()
+            self._count('requests')
+            start = time.monotonic()
+            try:
+                response = request()
+            except Exception as e:
+                status = get_status_code(e)
+                throttled = status in THROTTLE_STATUS_CODES
+                self.concurrency.release(throttled=throttled)
+                if throttled:
+                    self._count('throttled')
+
+                attempt += 1
+                if not is_retryable(e) or attempt > self.max_retries:
+                    self._count('failed')
+                    raise
+
+                retry_after = get_retry_after(e)
+                delay = min(self.max_delay, retry_after) if retry_after is not None else self.backoff_delay(attempt)
+                if throttled:
+                    # The whole deployment is over its quota, hold back the other requests as well
+                    self._pause(delay)
+                self._count('retries')
+                print(f"Request to {self.name} failed ({status or type(e).__name__}), "
+                      f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.concurrency.release(succeeded=True)
+            self._count('succeeded')
+            # Streamed responses carry their own timings, measured from the moment the request was sent
+            ttft = getattr(response, 'ttft', None)
+            latency = getattr(response, 'latency', None)
+            with self._lock:
+                self.latencies.append(latency if latency is not None else time.monotonic() - start)
+                if ttft is not None:
+                    self.ttfts.append(ttft)
+            return response
+
+    def summary(self) -> Dict:
+        """Return the request statistics together with the current concurrency limit."""
+        with self._lock:
+            summary = dict(self.stats)
+            summary['latency_p50'] = percentile(self.latencies, 50)
+            summary['latency_p95'] = percentile(self.latencies, 95)
+            summary['ttft_p50'] = percentile(self.ttfts, 50)
+            summary['ttft_p95'] = percentile(self.ttfts, 95)
+        summary['concurrency_limit'] = int(self.concurrency.limit)
+        return summary
+
+
+# Schedulers shared by all callers in the process, keyed by deployment name
+_SCHEDULERS: Dict[str, RequestScheduler] = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+
+def get_scheduler(name: str, **limits) -> RequestScheduler:
+    """
+    Return the shared scheduler of a deployment, creating it on first use.
+
+    Args:
+        name: Deployment name
+        **limits: RequestScheduler arguments, only used when the scheduler is created
+
+    Returns:
+        The RequestScheduler for the deployment
+    """
+    with _SCHEDULERS_LOCK:
+        scheduler = _SCHEDULERS.get(name)
+        if scheduler is None:
+            scheduler = RequestScheduler(name, **limits)
+            _SCHEDULERS[name] = scheduler
+        return scheduler
+
+
+def print_scheduler_stats():
+    """Print the request statistics of every scheduler used in this process."""
+    if not _SCHEDULERS:
+        return
+    print("\nRequest Statistics:")
+    print("-" * 40)
+    for name, scheduler in sorted(_SCHEDULERS.items()):
+        stats = scheduler.summary()
+        print(f"{name}: {stats['requests']} requests, {stats['succeeded']} succeeded, "
+              f"{stats['retries']} retries ({stats['throttled']} throttled), {stats['failed']} failed, "
+              f"{stats['wait_seconds']:.1f}s waiting for rate limits, concurrency limit {stats['concurrency_limit']}")
+        if stats['latency_p50'] is not None:
+            timings = f"  latency p50 {stats['latency_p50']:.2f}s, p95 {stats['latency_p95']:.2f}s"
+            if stats['ttft_p50'] is not None:
+                timings += f"; time to first token p50 {stats['ttft_p50']:.2f}s, p95 {stats['ttft_p95']:.2f}s"
+            print(timings)
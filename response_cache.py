@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Dict, List
+
+# Repository root, used to resolve the default cache location
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Default location of the response cache (safe to delete, responses are requested again)
+CACHE_DIR = os.path.join(REPO_ROOT, ".cache", "responses")
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "responses.db")
+
+# Default size limit of the cached responses before the least recently used ones are evicted
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Eviction removes entries until the cache is below this fraction of the limit
+EVICTION_TARGET = 0.9
+
+
+def hash_messages(messages: List[Dict]) -> str:
+    """Return the SHA-256 hex digest of a chat message list."""
+    payload = json.dumps(messages, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_cache_key(endpoint: str, model: str, messages: List[Dict], temperature=None, max_tokens=None,
+                   sample=None, **extra) -> str:
+    """
+    Build the cache key of a model request.
+
+    Args:
+        endpoint: Endpoint or deployment name the request is sent to
+        model: Model id / deployment used in the request
+        messages: Full chat message list
+        temperature: Sampling temperature
+        max_tokens: Maximum completion tokens
+        sample: Sample index or seed, so the k samples of a prompt are cached separately
+        **extra: Any other request parameter that changes the response (e.g. n)
+
+    Returns:
+        SHA-256 hex digest identifying the request
+    """
+    fields = {
+        'endpoint': endpoint,
+        'model': model,
+        'messages': hash_messages(messages),
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        'sample': sample,
+    }
+    fields.update(extra)
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Disk-backed cache of model responses, shared by the generation and judge scripts.
+
+    Responses are stored as JSON in a SQLite file keyed by make_cache_key(). The cache
+    is thread-safe, counts hits and misses per namespace (usually the deployment name)
+    and evicts the least recently used responses once it grows beyond max_bytes.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                namespace TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'stored': 0})
+        self.evicted = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, key: str, namespace: str = ''):
+        """
+        Look up a cached response.
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats[namespace]['misses'] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.stats[namespace]['hits'] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, response, namespace: str = ''):
+        """Store a JSON-serializable response, evicting old entries if the cache is full."""
+        payload = json.dumps(response)
+        size = len(payload.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, payload, size, now, now))
+            self.total_bytes += size - (previous[0] if previous else 0)
+            self.stats[namespace]['stored'] += 1
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def fetch(self, key: str, compute, namespace: str = ''):
+        """
+        Return the cached response for key, or compute and cache it.
+
+        Exceptions raised by compute() propagate and nothing is cached, so failed
+        requests are always sent again.
+        """
+        response = self.get(key, namespace)
+        if response is None:
+            response = compute()
+            if response is not None:
+                self.put(key, response, namespace)
+        return response
+
+    def _evict(self):
+        """Delete least recently used responses until the cache is below the eviction target."""
+        target = self.max_bytes * EVICTION_TARGET
+        while self.total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 500").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            evicted_keys = []
+            for key, size in rows:
+                evicted_keys.append((key,))
+                self.total_bytes -= size
+                if self.total_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+            self.evicted += len(evicted_keys)
+
+    def clear(self):
+        """Delete every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("VACUUM")
+            self.total_bytes = 0
+
+    def entry_counts(self) -> Dict[str, int]:
+        """Return the number of cached responses per namespace."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, COUNT(*) FROM responses GROUP BY namespace ORDER BY namespace").fetchall()
+        return {namespace or '': count for namespace, count in rows}
+
+    def print_stats(self):
+        """Print the hit/miss statistics of this run."""
+        print("\nResponse Cache Statistics:")
+        print("-" * 40)
+        total_hits = sum(s['hits'] for s in self.stats.values())
+        total_lookups = total_hits + sum(s['misses'] for s in self.stats.values())
+        for namespace, stats in sorted(self.stats.items()):
+            lookups = stats['hits'] + stats['misses']
+            hit_rate = stats['hits'] / lookups * 100 if lookups else 0
+            print(f"{namespace or '(default)'}: {stats['hits']}/{lookups} hits ({hit_rate:.1f}%), {stats['stored']} stored")
+        hit_rate = total_hits / total_lookups * 100 if total_lookups else 0
+        print(f"Total: {total_hits}/{total_lookups} hits ({hit_rate:.1f}%), "
+              f"{self.total_bytes / 1e6:.1f} MB cached in {self.path}"
+              + (f", {self.evicted} responses evicted" if self.evicted else ""))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect or clear the model response cache')
+    parser.add_argument('--cache', type=str, default=DEFAULT_CACHE_PATH, help='Path to the response cache')
+    parser.add_argument('--clear', action='store_true', help='Delete every cached response')
+    parser.add_argument('--max-mb', type=float, default=None,
+                        help='Evict least recently used responses until the cache fits in this many MB')
+    args = parser.parse_args()
+
+    with ResponseCache(args.cache) as cache:
+        if args.clear:
+            cache.clear()
+            print(f"Cleared {args.cache}")
+        elif args.max_mb is not None:
+            cache.max_bytes = int(args.max_mb * 1024 * 1024)
+            with cache._lock:
+                cache._evict()
+            print(f"Evicted {cache.evicted} responses")
+        counts = cache.entry_counts()
+        print(f"{sum(counts.values())} responses, {cache.total_bytes / 1e6:.1f} MB")
+        for namespace, count in counts.items():
+            print(f"  {namespace or '(default)'}: {count}")
@@ -0,0 +1,623 @@
+import os
+import json
+import time
+import sqlite3
+from typing import Dict, List
+
+from benchmark_index import REPO_ROOT, file_sha256, get_benchmark_index, split_benchmark_path
+from jsonl_io import find_jsonl_files, open_text
+
+# Default location of the results warehouse
+DEFAULT_WAREHOUSE = os.path.join(REPO_ROOT, "results_warehouse.db")
+
+# Bump whenever the schema changes
+SCHEMA_VERSION = 1
+
+# Execution errors can be whole compiler logs - only keep the beginning
+MAX_ERROR_CHARS = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- One row per ingestion (an execute_benchmark run, a judge results file, ...)
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tool TEXT NOT NULL,
+    label TEXT,
+    source TEXT,
+    pass_at_k INTEGER,
+    created_at TEXT NOT NULL
+);
+
+-- Files already ingested, so re-running an ingestion only picks up what changed
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    run_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS test_cases (
+    language TEXT NOT NULL,
+    category TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    testsource TEXT,
+    prefix TEXT,
+    suffix TEXT,
+    golden_completion TEXT,
+    assertions TEXT,
+    PRIMARY KEY (language, category, test_id)
+);
+
+CREATE TABLE IF NOT EXISTS completions (
+    language TEXT NOT NULL,
+    category TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    sample_index INTEGER NOT NULL,
+    completion TEXT,
+    PRIMARY KEY (language, category, test_id, model, sample_index)
+);
+
+-- Per test case execution outcome (all samples of the case)
+CREATE TABLE IF NOT EXISTS executions (
+    run_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    category TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    total_completions INTEGER,
+    correct_completions INTEGER,
+    pass_at_k_score REAL,
+    PRIMARY KEY (run_id, language, category, test_id, model)
+);
+
+-- Per sample execution outcome
+CREATE TABLE IF NOT EXISTS execution_samples (
+    run_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    category TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    sample_index INTEGER NOT NULL,
+    success INTEGER NOT NULL,
+    is_timeout INTEGER NOT NULL,
+    error TEXT,
+    PRIMARY KEY (run_id, language, category, test_id, model, sample_index)
+);
+
+CREATE TABLE IF NOT EXISTS judge_scores (
+    run_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    category TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    sample_index INTEGER NOT NULL,
+    score REAL,
+    PRIMARY KEY (run_id, language, category, test_id, model, sample_index)
+);
+
+CREATE TABLE IF NOT EXISTS complexity_metrics (
+    language TEXT NOT NULL,
+    category TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (language, category, test_id, metric)
+);
+
+CREATE INDEX IF NOT EXISTS idx_executions_model ON executions (model, language, category);
+CREATE INDEX IF NOT EXISTS idx_executions_case ON executions (language, category, test_id);
+CREATE INDEX IF NOT EXISTS idx_judge_model ON judge_scores (model, language, category);
+CREATE INDEX IF NOT EXISTS idx_judge_case ON judge_scores (language, category, test_id);
+CREATE INDEX IF NOT EXISTS idx_completions_model ON completions (model, language, category);
+CREATE INDEX IF NOT EXISTS idx_complexity_metric ON complexity_metrics (metric);
+
+-- Most recent result per (test case, model) across all runs
+CREATE VIEW IF NOT EXISTS latest_executions AS
+SELECT e.* FROM executions e
+JOIN (SELECT language, category, test_id, model, MAX(run_id) AS run_id
+      FROM executions GROUP BY language, category, test_id, model) latest
+USING (language, category, test_id, model, run_id);
+
+-- Most recent result per (test case, model) for every pass@k k, so pass@1 and pass@5 runs are kept apart
+CREATE VIEW IF NOT EXISTS latest_executions_by_k AS
+SELECT e.* FROM executions e
+JOIN (SELECT x.language, x.category, x.test_id, x.model, MAX(x.run_id) AS run_id
+      FROM executions x JOIN runs r ON r.run_id = x.run_id
+      GROUP BY x.language, x.category, x.test_id, x.model, r.pass_at_k) latest
+USING (language, category, test_id, model, run_id);
+
+CREATE VIEW IF NOT EXISTS latest_judge_scores AS
+SELECT j.* FROM judge_scores j
+JOIN (SELECT language, category, test_id, model, MAX(run_id) AS run_id
+      FROM judge_scores GROUP BY language, category, test_id, model) latest
+USING (language, category, test_id, model, run_id);
+"""
+
+
+class ResultsWarehouse:
+    """
+    Single-file SQLite store for benchmark results.
+
+    Holds the test cases, model completions, execution outcomes, LLM judge scores and
+    complexity metrics in indexed tables, so cross-run and cross-model questions can be
+    answered without loading the JSON outputs of each tool.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_WAREHOUSE
+        if os.path.dirname(os.path.abspath(self.db_path)):
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                              (str(SCHEMA_VERSION),))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    def _create_run(self, tool, label=None, source=None, pass_at_k=None):
+        cursor = self.conn.execute(
+            "INSERT INTO runs (tool, label, source, pass_at_k, created_at) VALUES (?, ?, ?, ?, ?)",
+            (tool, label, source, pass_at_k, time.strftime("%Y-%m-%d %H:%M:%S")))
+        return cursor.lastrowid
+
+    def _delete_run(self, run_id):
+        for table in ("executions", "execution_samples", "judge_scores", "runs"):
+            self.conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+    def _file_changed(self, file_path, tool):
+        """
+        Check whether a file needs to be (re-)ingested.
+
+        Returns:
+            Tuple of (changed, previous_run_id, stat, sha256)
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT * FROM ingested_files WHERE path = ? AND tool = ?", (path, tool)).fetchone()
+        if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            return False, row["run_id"], stat, row["sha256"]
+        sha256 = file_sha256(path)
+        if row is not None and row["sha256"] == sha256:
+            with self.conn:
+                self.conn.execute("UPDATE ingested_files SET mtime_ns = ? WHERE path = ? AND tool = ?",
+                                  (stat.st_mtime_ns, path, tool))
+            return False, row["run_id"], stat, sha256
+        return True, row["run_id"] if row is not None else None, stat, sha256
+
+    def _mark_ingested(self, file_path, tool, stat, sha256, run_id=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO ingested_files (path, tool, size, mtime_ns, sha256, run_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(file_path), tool, stat.st_size, stat.st_mtime_ns, sha256, run_id))
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def ingest_test_cases(self, benchmark_dir=None):
+        """Ingest (or refresh) every benchmark test case. Returns the number of cases."""
+        benchmark_index = get_benchmark_index(benchmark_dir)
+        rows = [(language, category, str(record.get("id")), record.get("testsource"), record.get("prefix"),
+                 record.get("suffix"), record.get("golden_completion"), record.get("assertions"))
+                for language, category, record in benchmark_index.iter_records()]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO test_cases VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def ingest_completion_file(self, file_path, force=False):
+        """
+        Ingest a completion file (regular or normalized store layout).
+
+        Returns:
+            Number of completions ingested (0 if the file is unchanged)
+        """
+        from completion_store import model_name_from_filename, read_completion_rows
+
+        changed, _, stat, sha256 = self._file_changed(file_path, "completions")
+        if not changed and not force:
+            return 0
+
+        model_name = model_name_from_filename(file_path)
+        language, category = split_benchmark_path(file_path)
+        rows = []
+        for data in read_completion_rows(file_path, include_benchmark=False):
+            if isinstance(data.get(f"{model_name}_completions"), list):
+                samples = data[f"{model_name}_completions"]
+            elif f"{model_name}_completion_0" in data:
+                samples = []
+                while f"{model_name}_completion_{len(samples)}" in data:
+                    samples.append(data[f"{model_name}_completion_{len(samples)}"])
+            else:
+                samples = [data.get(model_name, "")]
+            for sample_index, completion in enumerate(samples):
+                rows.append((language, category, str(data.get("id")), model_name, sample_index, completion))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM completions WHERE language = ? AND category = ? AND model = ?",
+                              (language, category, model_name))
+            self.conn.executemany("INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._mark_ingested(file_path, "completions", stat, sha256)
+        return len(rows)
+
+    def ingest_completions_dir(self, completions_dir, verbose=True):
+        """Incrementally ingest every completion file under a directory."""
+        total = 0
+        for file_path in find_jsonl_files(completions_dir):
+            count = self.ingest_completion_file(file_path)
+            if count and verbose:
+                print(f"Ingested {count} completions from {file_path}")
+            total += count
+        return total
+
+    def ingest_execution_results(self, models_results, label=None, source=None, pass_at_k=None):
+        """
+        Ingest per test case execution results as produced by execute_model_completions.
+
+        Args:
+            models_results: {model: {"test_cases": [test case result, ...]}} (the "models"
+                section of the --json-output file)
+            label: Optional run label (e.g. to group the languages of one sweep)
+            source: Optional source description (e.g. the JSON file it came from)
+            pass_at_k: k used for the pass_at_k_score column
+
+        Returns:
+            The new run id
+        """
+        with self.conn:
+            run_id = self._create_run("execute_benchmark", label, source, pass_at_k)
+            cases = []
+            samples = []
+            for model_name, model_results in models_results.items():
+                for case in model_results.get("test_cases", []):
+                    language, category = split_benchmark_path(case.get("file", ""))
+                    category = case.get("category", category)
+                    test_id = str(case.get("test_id"))
+                    cases.append((run_id, language, category, test_id, model_name, int(bool(case.get("success"))),
+                                  case.get("total_completions"), case.get("correct_completions"),
+                                  case.get("pass_at_k_score")))
+                    for sample in case.get("completion_results", []):
+                        error = sample.get("error")
+                        samples.append((run_id, language, category, test_id, model_name,
+                                        sample.get("completion_index", 0), int(bool(sample.get("success"))),
+                                        int(bool(sample.get("is_timeout"))),
+                                        error[:MAX_ERROR_CHARS] if error else None))
+            self.conn.executemany("INSERT OR REPLACE INTO executions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", cases)
+            self.conn.executemany("INSERT OR REPLACE INTO execution_samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", samples)
+        return run_id
+
+    def ingest_execution_file(self, json_file, label=None, force=False, pass_at_k=None):
+        """
+        Ingest an execute_benchmark --json-output file.
+
+        Args:
+            json_file: Path of the JSON file
+            label: Run label (default: the file name)
+            force: Ingest the file even if it did not change
+            pass_at_k: k of the pass_at_k_score column, overriding the one recorded in the file
+                (older files do not record it); also set on the run of an unchanged file without k
+
+        Returns:
+            Run id, or None if the file is unchanged or holds no per test case results
+        """
+        changed, previous_run_id, stat, sha256 = self._file_changed(json_file, "execute_benchmark")
+        if not changed and not force:
+            if pass_at_k is not None and previous_run_id is not None:
+                with self.conn:
+                    self.conn.execute("UPDATE runs SET pass_at_k = ? WHERE run_id = ? AND pass_at_k IS NULL",
+                                      (pass_at_k, previous_run_id))
+            return None
+        with open_text(json_file, 'r') as f:
+            data = json.load(f)
+        models_results = data.get("models", {})
+        if not any("test_cases" in model_results for model_results in models_results.values()):
+            # The combined --language all file only has aggregates, the per-language files have the cases
+            print(f"Skipping {json_file}: no per test case results")
+            return None
+        if previous_run_id is not None:
+            with self.conn:
+                self._delete_run(previous_run_id)
+        if pass_at_k is None:
+            pass_at_k = data.get("pass_at_k")
+        run_id = self.ingest_execution_results(models_results, label or os.path.basename(json_file),
+                                               os.path.abspath(json_file), pass_at_k)
+        with self.conn:
+            self._mark_ingested(json_file, "execute_benchmark", stat, sha256, run_id)
+        return run_id
+
+    def ingest_judge_file(self, json_file, force=False):
+        """
+        Ingest an llm_judge '<language>_<category>_<model>_single_evaluation.json' file.
+
+        Returns:
+            Run id, or None if the file is unchanged
+        """
+        changed, previous_run_id, stat, sha256 = self._file_changed(json_file, "llm_judge")
+        if not changed and not force:
+            return None
+        with open_text(json_file, 'r') as f:
+            entries = json.load(f)
+        if not isinstance(entries, list):
+            return None
+
+        filename = os.path.basename(json_file).split("_single_evaluation.json")[0]
+        with self.conn:
+            if previous_run_id is not None:
+                self._delete_run(previous_run_id)
+            run_id = self._create_run("llm_judge", filename, os.path.abspath(json_file))
+            rows = []
+            for entry in entries:
+                language = entry.get("language")
+                category = entry.get("category")
+                # The model name is what follows '<language>_<category>_' in the file name
+                prefix = f"{language}_{category}_"
+                model_name = filename[len(prefix):] if filename.startswith(prefix) else filename
+                scores = entry.get("individual_scores")
+                if scores is None:
+                    scores = [entry.get("score")]
+                for sample_index, score in enumerate(scores):
+                    rows.append((run_id, language, category, str(entry.get("id")), model_name, sample_index, score))
+            self.conn.executemany("INSERT OR REPLACE INTO judge_scores VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._mark_ingested(json_file, "llm_judge", stat, sha256, run_id)
+        return run_id
+
+    def ingest_judge_dir(self, results_dir, verbose=True):
+        """Incrementally ingest every *_single_evaluation.json file in a directory."""
+        ingested = 0
+        for filename in sorted(os.listdir(results_dir)):
+            if filename.endswith("_single_evaluation.json"):
+                run_id = self.ingest_judge_file(os.path.join(results_dir, filename))
+                if run_id is not None:
+                    ingested += 1
+                    if verbose:
+                        print(f"Ingested judge scores from {filename} (run {run_id})")
+        return ingested
+
+    def ingest_complexity_metrics(self, case_metrics):
+        """
+        Ingest per test case complexity metrics.
+
+        Args:
+            case_metrics: Iterable of (language, category, test_id, {metric: value})
+        """
+        rows = [(language, category, str(test_id), metric, value)
+                for language, category, test_id, metrics_data in case_metrics
+                for metric, value in metrics_data.items()]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO complexity_metrics VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _filters(language=None, category=None, models=None, alias=""):
+        clauses = []
+        params = []
+        if language:
+            clauses.append(f"{alias}language = ?")
+            params.append(language)
+        if category:
+            clauses.append(f"{alias}category = ?")
+            params.append(category)
+        if models:
+            clauses.append(f"{alias}model IN ({', '.join('?' for _ in models)})")
+            params.extend(models)
+        return clauses, params
+
+    def query(self, sql, params=()):
+        """Run an arbitrary SQL query and return the rows as dictionaries."""
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def runs(self, tool=None) -> List[Dict]:
+        """List ingested runs, most recent first."""
+        if tool:
+            return self.query("SELECT * FROM runs WHERE tool = ? ORDER BY run_id DESC", (tool,))
+        return self.query("SELECT * FROM runs ORDER BY run_id DESC")
+
+    def execution_leaderboard(self, language=None, category=None, run_label=None, pass_at_k=None) -> List[Dict]:
+        """
+        Rank models by pass rate, using the latest execution of every (test case, model) per k.
+
+        pass@k scores of different k are not comparable, so models are ranked separately for
+        every k of the runs (k is empty for runs ingested without it).
+
+        Args:
+            language: Optional language filter
+            category: Optional category filter
+            run_label: Only use runs with this label instead of the latest results
+            pass_at_k: Only use runs with this k
+        """
+        clauses, params = self._filters(language, category, alias="e.")
+        if run_label:
+            source = "executions e JOIN runs r ON r.run_id = e.run_id"
+            clauses.append("r.label = ?")
+            params.append(run_label)
+        else:
+            source = "latest_executions_by_k e JOIN runs r ON r.run_id = e.run_id"
+        if pass_at_k is not None:
+            clauses.append("r.pass_at_k = ?")
+            params.append(pass_at_k)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.query(f"""
+            SELECT r.pass_at_k AS k, e.model AS model, COUNT(*) AS cases, SUM(e.success) AS passed,
+                   ROUND(100.0 * SUM(e.success) / COUNT(*), 2) AS success_rate,
+                   ROUND(AVG(e.pass_at_k_score), 4) AS avg_pass_at_k
+            FROM {source} {where}
+            GROUP BY r.pass_at_k, e.model ORDER BY r.pass_at_k, avg_pass_at_k DESC, success_rate DESC""", params)
+
+    def judge_leaderboard(self, language=None, category=None) -> List[Dict]:
+        """Rank models by average LLM judge score (latest scores per test case)."""
+        clauses, params = self._filters(language, category, alias="j.")
+        clauses.append("j.score IS NOT NULL")
+        return self.query(f"""
+            SELECT j.model AS model, COUNT(DISTINCT j.language || '/' || j.category || '/' || j.test_id) AS cases,
+                   COUNT(*) AS scores, ROUND(AVG(j.score), 3) AS avg_score
+            FROM latest_judge_scores j WHERE {' AND '.join(clauses)}
+            GROUP BY j.model ORDER BY avg_score DESC""", params)
+
+    def diff_models(self, model_a, model_b, language=None, category=None) -> Dict[str, List[Dict]]:
+        """
+        Compare the latest execution outcomes of two models case by case.
+
+        Returns:
+            {"only_a": [...], "only_b": [...]} - cases passed by one model and failed by the other
+        """
+        clauses, params = self._filters(language, category, alias="a.")
+        where = f"AND {' AND '.join(clauses)}" if clauses else ""
+        rows = self.query(f"""
+            SELECT a.language, a.category, a.test_id, a.success AS success_a, b.success AS success_b,
+                   a.pass_at_k_score AS pass_at_k_a, b.pass_at_k_score AS pass_at_k_b
+            FROM latest_executions a
+            JOIN latest_executions b
+              ON a.language = b.language AND a.category = b.category AND a.test_id = b.test_id
+            WHERE a.model = ? AND b.model = ? AND a.success != b.success {where}
+            ORDER BY a.language, a.category, CAST(a.test_id AS INTEGER)""", [model_a, model_b] + params)
+        return {"only_a": [row for row in rows if row["success_a"]],
+                "only_b": [row for row in rows if row["success_b"]]}
+
+    def diff_runs(self, run_a, run_b, model=None, language=None, category=None) -> Dict[str, List[Dict]]:
+        """
+        Compare two execution runs case by case.
+
+        Returns:
+            {"regressed": [...], "fixed": [...]} relative to run_a
+        """
+        clauses, params = self._filters(language, category, [model] if model else None, alias="a.")
+        where = f"AND {' AND '.join(clauses)}" if clauses else ""
+        rows = self.query(f"""
+            SELECT a.model, a.language, a.category, a.test_id, a.success AS success_a, b.success AS success_b
+            FROM executions a
+            JOIN executions b
+              ON a.language = b.language AND a.category = b.category AND a.test_id = b.test_id AND a.model = b.model
+            WHERE a.run_id = ? AND b.run_id = ? AND a.success != b.success {where}
+            ORDER BY a.model, a.language, a.category, CAST(a.test_id AS INTEGER)""", [run_a, run_b] + params)
+        return {"regressed": [row for row in rows if row["success_a"]],
+                "fixed": [row for row in rows if row["success_b"]]}
+
+    def case_results(self, language=None, category=None) -> List[Dict]:
+        """Latest per test case outcome of every model (input for subset selection and analysis)."""
+        clauses, params = self._filters(language, category)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.query(f"""
+            SELECT language, category, test_id, model, success, pass_at_k_score
+            FROM latest_executions {where}""", params)
+
+
+def print_table(rows, columns=None):
+    """Print query results as an aligned text table."""
+    if not rows:
+        print("(no rows)")
+        return
+    columns = columns or list(rows[0].keys())
+    widths = {column: max(len(str(column)), *(len(str(row.get(column, ""))) for row in rows)) for column in columns}
+    print("  ".join(str(column).ljust(widths[column]) for column in columns))
+    print("  ".join("-" * widths[column] for column in columns))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='SQLite results warehouse for DevBench runs')
+    parser.add_argument('--db', default=DEFAULT_WAREHOUSE, help=f'Path to the warehouse database (default: {DEFAULT_WAREHOUSE})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Incrementally ingest results into the warehouse')
+    ingest_parser.add_argument('--benchmark', default=None, help='Benchmark directory to ingest test cases from')
+    ingest_parser.add_argument('--completions', default=None, help='Completions directory (or completion store) to ingest')
+    ingest_parser.add_argument('--executions', nargs='+', default=[], help='execute_benchmark --json-output files to ingest')
+    ingest_parser.add_argument('--judge-dir', default=None, help='llm_judge results directory to ingest')
+    ingest_parser.add_argument('--label', default=None, help='Run label for ingested execution files')
+    ingest_parser.add_argument('--pass_at_k', type=int, default=None,
+                               help='k of the pass@k scores of the execution files (for older files that do not record it)')
+
+    runs_parser = subparsers.add_parser('runs', help='List ingested runs')
+    runs_parser.add_argument('--tool', default=None, help='Only list runs of this tool (execute_benchmark, llm_judge)')
+
+    board_parser = subparsers.add_parser('leaderboard', help='Rank models by execution pass rate or judge score')
+    board_parser.add_argument('--source', choices=['execution', 'judge'], default='execution')
+    board_parser.add_argument('--language', default=None)
+    board_parser.add_argument('--category', default=None)
+    board_parser.add_argument('--label', default=None, help='Only use execution runs with this label')
+    board_parser.add_argument('--pass_at_k', type=int, default=None, help='Only use execution runs with this k')
+
+    diff_parser = subparsers.add_parser('diff', help='Cases where two models (or two runs) disagree')
+    diff_parser.add_argument('--model-a', help='First model')
+    diff_parser.add_argument('--model-b', help='Second model')
+    diff_parser.add_argument('--run-a', type=int, help='Baseline run id')
+    diff_parser.add_argument('--run-b', type=int, help='Run id to compare against the baseline')
+    diff_parser.add_argument('--model', default=None, help='Model filter for run diffs')
+    diff_parser.add_argument('--language', default=None)
+    diff_parser.add_argument('--category', default=None)
+
+    sql_parser = subparsers.add_parser('sql', help='Run a raw SQL query')
+    sql_parser.add_argument('query', help='SQL query')
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    with ResultsWarehouse(args.db) as warehouse:
+        if args.command == 'ingest':
+            if args.benchmark:
+                print(f"Ingested {warehouse.ingest_test_cases(args.benchmark)} test cases")
+            if args.completions:
+                print(f"Ingested {warehouse.ingest_completions_dir(args.completions)} completions")
+            for json_file in args.executions:
+                run_id = warehouse.ingest_execution_file(json_file, args.label, pass_at_k=args.pass_at_k)
+                print(f"{json_file}: " + (f"ingested as run {run_id}" if run_id else "unchanged, skipped"))
+            if args.judge_dir:
+                print(f"Ingested {warehouse.ingest_judge_dir(args.judge_dir)} judge result files")
+
+        elif args.command == 'runs':
+            print_table(warehouse.runs(args.tool), ['run_id', 'tool', 'label', 'pass_at_k', 'created_at', 'source'])
+
+        elif args.command == 'leaderboard':
+            if args.source == 'judge':
+                print_table(warehouse.judge_leaderboard(args.language, args.category))
+            else:
+                print_table(warehouse.execution_leaderboard(args.language, args.category, args.label, args.pass_at_k))
+
+        elif args.command == 'diff':
+            if args.run_a is not None and args.run_b is not None:
+                result = warehouse.diff_runs(args.run_a, args.run_b, args.model, args.language, args.category)
+                print(f"Regressed in run {args.run_b} ({len(result['regressed'])}):")
+                print_table(result['regressed'])
+                print(f"\nFixed in run {args.run_b} ({len(result['fixed'])}):")
+                print_table(result['fixed'])
+            elif args.model_a and args.model_b:
+                result = warehouse.diff_models(args.model_a, args.model_b, args.language, args.category)
+                print(f"Passed by {args.model_a}, failed by {args.model_b} ({len(result['only_a'])}):")
+                print_table(result['only_a'])
+                print(f"\nPassed by {args.model_b}, failed by {args.model_a} ({len(result['only_b'])}):")
+                print_table(result['only_b'])
+            else:
+                parser.error("diff needs either --model-a/--model-b or --run-a/--run-b")
+
+        elif args.command == 'sql':
+            print_table(warehouse.query(args.query))
+
+    print(f"\n({(time.perf_counter() - start) * 1000:.1f} ms)")
@@ -0,0 +1,539 @@
+import os
+import json
+import math
+from collections import defaultdict
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmark_index import REPO_ROOT, split_benchmark_path
+
+# Where named subsets ("quick", ...) are stored
+SUBSET_DIR = os.path.join(REPO_ROOT, "subsets")
+
+# Complexity metrics used as covariates for the case difficulty
+COMPLEXITY_FEATURES = ['prefix_length', 'token_count', 'cyclomatic', 'golden_length',
+                       'golden_token_count', 'total_length', 'total_token_count']
+
+
+def stratum_of(language, category):
+    return f"{language}/{category}"
+
+
+# ----------------------------------------------------------------------
+# Data loading
+# ----------------------------------------------------------------------
+
+def load_case_results(warehouse_path) -> Dict[str, Dict[Tuple[str, str, str], float]]:
+    """
+    Load the latest per test case score of every model from the results warehouse.
+
+    Cases without a score (results ingested without a pass_at_k_score field) are skipped.
+
+    Returns:
+        {model: {(language, category, test_id): pass@k score}}
+    """
+    from results_warehouse import ResultsWarehouse
+
+    case_results = defaultdict(dict)
+    skipped = 0
+    with ResultsWarehouse(warehouse_path) as warehouse:
+        for row in warehouse.case_results():
+            if row["pass_at_k_score"] is None:
+                skipped += 1
+                continue
+            case_results[row["model"]][(row["language"], row["category"], row["test_id"])] = row["pass_at_k_score"]
+    if skipped:
+        print(f"Skipped {skipped} case result(s) without a pass@k score in {warehouse_path}")
+    return dict(case_results)
+
+
+def load_complexity_features(warehouse_path) -> Dict[Tuple[str, str, str], List[float]]:
+    """
+    Load the complexity metrics of every test case from the results warehouse.
+
+    Returns:
+        {(language, category, test_id): [feature values in COMPLEXITY_FEATURES order]}
+    """
+    from results_warehouse import ResultsWarehouse
+
+    values = defaultdict(dict)
+    with ResultsWarehouse(warehouse_path) as warehouse:
+        for row in warehouse.query("SELECT * FROM complexity_metrics"):
+            values[(row["language"], row["category"], row["test_id"])][row["metric"]] = row["value"]
+
+    available = [metric for metric in COMPLEXITY_FEATURES if any(metric in v for v in values.values())]
+    return {case: [case_values.get(metric, 0.0) or 0.0 for metric in available]
+            for case, case_values in values.items()}
+
+
+# ----------------------------------------------------------------------
+# Item response theory
+# ----------------------------------------------------------------------
+
+def _sigmoid(x):
+    """Numerically stable logistic function of a number or numpy array."""
+    if np.ndim(x):
+        z = np.exp(-np.abs(x))
+        return np.where(x >= 0, 1.0 / (1.0 + z), z / (1.0 + z))
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+def fit_irt(case_results, cases, difficulty_prior=None, iterations=300, learning_rate=0.1, prior_strength=0.1):
+    """
+    Fit a two-parameter logistic IRT model P(pass) = sigmoid(a_i * (theta_m - b_i)).
+
+    Scores may be fractional (pass@k), they are used as soft targets. Ability, difficulty and
+    log-discrimination get Gaussian priors so cases every model passes (or fails) stay finite.
+
+    Args:
+        case_results: {model: {case: score in [0, 1]}}
+        cases: Cases to fit
+        difficulty_prior: Optional {case: prior mean of the difficulty}
+        iterations: Number of gradient ascent steps
+        learning_rate: Step size
+        prior_strength: Weight of the Gaussian priors
+
+    Returns:
+        Tuple of ({model: ability}, {case: discrimination}, {case: difficulty})
+    """
+    models = sorted(case_results)
+    cases = list(cases)
+    model_index = {model: i for i, model in enumerate(models)}
+    case_index = {case: i for i, case in enumerate(cases)}
+
+    observations = [(model_index[model], case_index[case], score) for model in models
+                    for case, score in case_results[model].items() if case in case_index and score is not None]
+    obs_model = np.array([m for m, _, _ in observations], dtype=np.int64)
+    obs_case = np.array([c for _, c, _ in observations], dtype=np.int64)
+    obs_score = np.array([score for _, _, score in observations], dtype=float)
+    model_counts = np.bincount(obs_model, minlength=len(models))
+    case_counts = np.bincount(obs_case, minlength=len(cases))
+    fitted_models = model_counts > 0
+    fitted_cases = case_counts > 0
+    case_step = learning_rate / np.sqrt(np.maximum(case_counts, 1))
+
+    theta = np.zeros(len(models))
+    log_a = np.zeros(len(cases))
+    b_mean = np.array([(difficulty_prior or {}).get(case, 0.0) for case in cases], dtype=float)
+    b = b_mean.copy()
+
+    # All observations are updated at once; the gradients are summed per model and per case
+    for _ in range(iterations):
+        a = np.exp(log_a)[obs_case]
+        diff = theta[obs_model] - b[obs_case]
+        weighted = (obs_score - _sigmoid(a * diff)) * a
+        grad_theta = np.bincount(obs_model, weights=weighted, minlength=len(models))
+        grad_b = -np.bincount(obs_case, weights=weighted, minlength=len(cases))
+        grad_log_a = np.bincount(obs_case, weights=weighted * diff, minlength=len(cases))
+
+        theta = np.where(fitted_models,
+                         theta + learning_rate * (grad_theta / np.maximum(model_counts, 1) - prior_strength * theta),
+                         theta)
+        b = np.where(fitted_cases, b + case_step * (grad_b - prior_strength * (b - b_mean)), b)
+        log_a = np.where(fitted_cases, np.clip(log_a + case_step * (grad_log_a - prior_strength * log_a), -3.0, 3.0),
+                         log_a)
+
+    return ({model: float(theta[i]) for i, model in enumerate(models)},
+            {case: float(math.exp(log_a[i])) for i, case in enumerate(cases)},
+            {case: float(b[i]) for i, case in enumerate(cases)})
+
+
+def _solve(matrix, vector):
+    """Solve a small dense linear system with Gaussian elimination (partial pivoting)."""
+    n = len(vector)
+    augmented = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(augmented[r][col]))
+        augmented[col], augmented[pivot] = augmented[pivot], augmented[col]
+        if abs(augmented[col][col]) < 1e-12:
+            continue
+        for row in range(col + 1, n):
+            factor = augmented[row][col] / augmented[col][col]
+            for k in range(col, n + 1):
+                augmented[row][k] -= factor * augmented[col][k]
+    solution = [0.0] * n
+    for row in range(n - 1, -1, -1):
+        if abs(augmented[row][row]) < 1e-12:
+            continue
+        solution[row] = (augmented[row][n] - sum(augmented[row][k] * solution[k] for k in range(row + 1, n))) / augmented[row][row]
+    return solution
+
+
+def complexity_difficulty_prior(difficulty, features, ridge=1.0) -> Dict:
+    """
+    Predict case difficulty from complexity metrics with a ridge regression.
+
+    Used as the prior mean of the difficulty, which stabilizes the fit for cases with few
+    (or uninformative) observations.
+
+    Args:
+        difficulty: {case: fitted difficulty}
+        features: {case: [complexity feature values]}
+        ridge: L2 penalty of the regression
+
+    Returns:
+        {case: predicted difficulty} for every case with features
+    """
+    cases = [case for case in difficulty if case in features]
+    if not cases or not features[cases[0]]:
+        return {}
+
+    # Standardize log-scaled features (counts are heavily skewed)
+    k = len(features[cases[0]])
+    transformed = {case: [math.log1p(max(value, 0.0)) for value in values] for case, values in features.items()}
+    means = [sum(transformed[case][j] for case in cases) / len(cases) for j in range(k)]
+    stds = [math.sqrt(sum((transformed[case][j] - means[j]) ** 2 for case in cases) / len(cases)) or 1.0 for j in range(k)]
+
+    def row(case):
+        return [1.0] + [(transformed[case][j] - means[j]) / stds[j] for j in range(k)]
+
+    xtx = [[0.0] * (k + 1) for _ in range(k + 1)]
+    xty = [0.0] * (k + 1)
+    for case in cases:
+        x = row(case)
+        for i in range(k + 1):
+            xty[i] += x[i] * difficulty[case]
+            for j in range(k + 1):
+                xtx[i][j] += x[i] * x[j]
+    for i in range(1, k + 1):
+        xtx[i][i] += ridge
+    weights = _solve(xtx, xty)
+    return {case: sum(w * v for w, v in zip(weights, row(case))) for case in transformed}
+
+
+def case_information(discrimination, difficulty, abilities) -> Dict:
+    """Fisher information of every case, summed over the given model abilities."""
+    information = {}
+    for case, a in discrimination.items():
+        total = 0.0
+        for theta in abilities:
+            p = _sigmoid(a * (theta - difficulty[case]))
+            total += a * a * p * (1.0 - p)
+        information[case] = total
+    return information
+
+
+# ----------------------------------------------------------------------
+# Selection and estimation
+# ----------------------------------------------------------------------
+
+def select_cases(cases_by_stratum, difficulty, information, per_stratum) -> Dict[str, List[str]]:
+    """
+    Pick per_stratum cases from every stratum.
+
+    Cases of a stratum are sorted by difficulty and split into per_stratum equal bins; the most
+    informative case of each bin is selected, so the subset covers the whole difficulty range.
+
+    Returns:
+        {stratum: [test ids]}
+    """
+    selected = {}
+    for stratum, cases in cases_by_stratum.items():
+        ordered = sorted(cases, key=lambda case: (difficulty.get(case, 0.0), case))
+        count = min(per_stratum, len(ordered))
+        picks = []
+        for i in range(count):
+            bin_cases = ordered[i * len(ordered) // count:(i + 1) * len(ordered) // count]
+            if bin_cases:
+                picks.append(max(bin_cases, key=lambda case: (information.get(case, 0.0), case)))
+        selected[stratum] = sorted((case[2] for case in picks), key=lambda test_id: (len(test_id), test_id))
+    return selected
+
+
+def stratified_estimate(scores_by_stratum, stratum_sizes, confidence=0.95) -> Tuple[float, float, float]:
+    """
+    Stratified estimate of the full-benchmark mean score from a subset.
+
+    Each stratum mean is weighted by the stratum size; the variance uses the finite population
+    correction, so a fully evaluated stratum contributes no uncertainty.
+
+    Args:
+        scores_by_stratum: {stratum: [scores of the evaluated cases]}
+        stratum_sizes: {stratum: number of cases in the full benchmark}
+        confidence: Confidence level of the interval
+
+    Returns:
+        Tuple of (estimate, lower, upper)
+    """
+    strata = [stratum for stratum in stratum_sizes if scores_by_stratum.get(stratum)]
+    total = sum(stratum_sizes[stratum] for stratum in strata)
+    if not total:
+        return 0.0, 0.0, 0.0
+
+    estimate = 0.0
+    variance = 0.0
+    for stratum in strata:
+        scores = scores_by_stratum[stratum]
+        n = len(scores)
+        size = stratum_sizes[stratum]
+        weight = size / total
+        mean = sum(scores) / n
+        sample_variance = sum((score - mean) ** 2 for score in scores) / (n - 1) if n > 1 else 0.0
+        if sample_variance == 0.0:
+            # A single case, or all cases passed/failed: use a smoothed Bernoulli variance
+            # instead of claiming no uncertainty
+            smoothed = (sum(scores) + 0.5) / (n + 1)
+            sample_variance = smoothed * (1 - smoothed)
+        estimate += weight * mean
+        variance += weight ** 2 * max(0.0, 1 - n / size) * sample_variance / n
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    margin = z * math.sqrt(variance)
+    return estimate, max(0.0, estimate - margin), min(1.0, estimate + margin)
+
+
+def _slice_scores(model_results, cases, key_index=None, key=None):
+    values = [model_results[case] for case in cases
+              if case in model_results and (key_index is None or case[key_index] == key)]
+    return sum(values) / len(values) if values else None
+
+
+def _subset_scores(model_results, subset_cases, cases_by_stratum, key_index=None, key=None):
+    scores_by_stratum = {}
+    sizes = {}
+    for stratum, test_ids in subset_cases.items():
+        language, category = stratum.split("/", 1)
+        if key_index is not None and (language, category)[key_index] != key:
+            continue
+        sizes[stratum] = len(cases_by_stratum[stratum])
+        scores_by_stratum[stratum] = [model_results[(language, category, test_id)] for test_id in test_ids
+                                      if (language, category, test_id) in model_results]
+    return stratified_estimate(scores_by_stratum, sizes)[0] if sizes else None
+
+
+def evaluate_subset(case_results, subset_by_model, cases_by_stratum, error_bound):
+    """
+    Compare subset estimates with the full-benchmark scores of past models.
+
+    Args:
+        case_results: {model: {case: score}}
+        subset_by_model: {model: subset used to estimate that model}
+        cases_by_stratum: {stratum: [cases]}
+        error_bound: Maximum tolerated absolute error of the overall score
+
+    Returns:
+        Dictionary with the maximum errors and the ranking violations
+    """
+    all_cases = [case for cases in cases_by_stratum.values() for case in cases]
+    languages = sorted({case[0] for case in all_cases})
+    categories = sorted({case[1] for case in all_cases})
+    slices = [("overall", None, None)] + [("language", 0, language) for language in languages] + \
+             [("category", 1, category) for category in categories]
+
+    full = defaultdict(dict)
+    estimated = defaultdict(dict)
+    for model, model_results in case_results.items():
+        for _, key_index, key in slices:
+            full[(key_index, key)][model] = _slice_scores(model_results, all_cases, key_index, key)
+            estimated[(key_index, key)][model] = _subset_scores(model_results, subset_by_model[model],
+                                                                cases_by_stratum, key_index, key)
+
+    report = {"max_overall_error": 0.0, "max_language_error": 0.0, "max_category_error": 0.0,
+              "ranking_violations": []}
+    for kind, key_index, key in slices:
+        for model in case_results:
+            if full[(key_index, key)][model] is None or estimated[(key_index, key)][model] is None:
+                continue
+            error = abs(full[(key_index, key)][model] - estimated[(key_index, key)][model])
+            field = f"max_{kind}_error"
+            report[field] = max(report[field], error)
+
+        # Pairs whose true gap is clearly larger than the error bound must keep their order
+        models = [model for model in case_results if full[(key_index, key)][model] is not None
+                  and estimated[(key_index, key)][model] is not None]
+        for i, model_a in enumerate(models):
+            for model_b in models[i + 1:]:
+                gap = full[(key_index, key)][model_a] - full[(key_index, key)][model_b]
+                estimated_gap = estimated[(key_index, key)][model_a] - estimated[(key_index, key)][model_b]
+                if abs(gap) > 2 * error_bound and gap * estimated_gap <= 0:
+                    report["ranking_violations"].append(
+                        {"slice": key or "overall", "models": [model_a, model_b], "gap": round(gap, 4)})
+    return report
+
+
+def build_subset(case_results, benchmark_cases, features=None, error_bound=0.03, min_per_stratum=2,
+                 max_per_stratum=None, iterations=200, verbose=True) -> Dict:
+    """
+    Select the smallest stratified subset whose estimates stay within the error bound.
+
+    The subset size per (language, category) stratum grows until, in leave-one-model-out
+    validation, the overall score of every past model is estimated within error_bound and no
+    per-language or per-category ranking with a gap above 2 * error_bound is flipped.
+
+    Args:
+        case_results: {model: {(language, category, test_id): score}}
+        benchmark_cases: All (language, category, test_id) cases of the benchmark
+        features: Optional {case: complexity features} used as difficulty covariates
+        error_bound: Maximum tolerated absolute error of the overall score
+        min_per_stratum: Smallest number of cases per stratum
+        max_per_stratum: Largest number of cases per stratum (default: stratum size)
+        iterations: IRT gradient steps
+        verbose: Whether to print progress
+
+    Returns:
+        Subset definition dictionary
+    """
+    cases_by_stratum = defaultdict(list)
+    for case in benchmark_cases:
+        cases_by_stratum[stratum_of(case[0], case[1])].append(case)
+    cases_by_stratum = dict(sorted(cases_by_stratum.items()))
+    max_per_stratum = max_per_stratum or max(len(cases) for cases in cases_by_stratum.values())
+
+    def fit(results):
+        theta, discrimination, difficulty = fit_irt(results, benchmark_cases, iterations=iterations)
+        if features:
+            prior = complexity_difficulty_prior(difficulty, features)
+            theta, discrimination, difficulty = fit_irt(results, benchmark_cases, prior, iterations=iterations)
+        information = case_information(discrimination, difficulty, list(theta.values()))
+        return theta, discrimination, difficulty, information
+
+    if verbose:
+        print(f"Fitting IRT model on {len(case_results)} models x {len(benchmark_cases)} cases...")
+    theta, discrimination, difficulty, information = fit(case_results)
+
+    # Leave-one-model-out fits give an honest estimate of the error on an unseen model
+    held_out_fits = {}
+    if len(case_results) >= 3:
+        for model in case_results:
+            if verbose:
+                print(f"  Leave-one-out fit without {model}")
+            others = {other: results for other, results in case_results.items() if other != model}
+            held_out_fits[model] = fit(others)
+    elif verbose:
+        print("Warning: fewer than 3 models with results - skipping leave-one-model-out validation")
+
+    chosen = None
+    for per_stratum in range(min_per_stratum, max_per_stratum + 1):
+        subset_by_model = {}
+        for model in case_results:
+            _, _, model_difficulty, model_information = held_out_fits.get(model, (theta, discrimination, difficulty, information))
+            subset_by_model[model] = select_cases(cases_by_stratum, model_difficulty, model_information, per_stratum)
+        report = evaluate_subset(case_results, subset_by_model, cases_by_stratum, error_bound)
+        if verbose:
+            print(f"  {per_stratum} cases/stratum: max overall error {report['max_overall_error']:.4f}, "
+                  f"ranking violations {len(report['ranking_violations'])}")
+        chosen = (per_stratum, report)
+        if report["max_overall_error"] <= error_bound and not report["ranking_violations"]:
+            break
+
+    per_stratum, validation = chosen
+    cases = select_cases(cases_by_stratum, difficulty, information, per_stratum)
+    in_sample = evaluate_subset(case_results, {model: cases for model in case_results}, cases_by_stratum, error_bound)
+
+    return {
+        "error_bound": error_bound,
+        "per_stratum": per_stratum,
+        "total_cases": sum(len(test_ids) for test_ids in cases.values()),
+        "benchmark_cases": len(benchmark_cases),
+        "models": sorted(case_results),
+        "strata": {stratum: len(stratum_cases) for stratum, stratum_cases in cases_by_stratum.items()},
+        "cases": cases,
+        "validation": {
+            "leave_one_model_out": validation if held_out_fits else None,
+            "in_sample": in_sample,
+            "within_bound": validation["max_overall_error"] <= error_bound and not validation["ranking_violations"],
+        },
+        "abilities": {model: round(value, 4) for model, value in theta.items()},
+    }
+
+
+def subset_path(name_or_path):
+    """Resolve a subset name ('quick') or path to its JSON file."""
+    if os.path.exists(name_or_path) or name_or_path.endswith(".json"):
+        return name_or_path
+    return os.path.join(SUBSET_DIR, f"{name_or_path}.json")
+
+
+def load_subset(name_or_path) -> Dict:
+    """
+    Load a subset definition.
+
+    Returns:
+        Subset dictionary; subset["cases"] maps "language/category" to the selected test ids
+    """
+    path = subset_path(name_or_path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Subset '{name_or_path}' not found at {path} - create it with subset_selection.py")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def subset_test_ids(subset, benchmark_file) -> Optional[set]:
+    """Return the selected test ids for a benchmark file (None if its stratum is not in the subset)."""
+    language, category = split_benchmark_path(benchmark_file)
+    test_ids = subset["cases"].get(stratum_of(language, category))
+    return set(test_ids) if test_ids is not None else None
+
+
+def estimate_full_score(subset, scores_by_stratum, confidence=0.95) -> Tuple[float, float, float]:
+    """
+    Estimate the full-benchmark score of a model from its results on a subset.
+
+    Only the strata that were evaluated are considered, so running a single language
+    estimates the full score for that language.
+
+    Args:
+        subset: Subset definition (see load_subset)
+        scores_by_stratum: {"language/category": [per test case scores on the subset]}
+        confidence: Confidence level of the interval
+
+    Returns:
+        Tuple of (estimate, lower, upper)
+    """
+    sizes = {stratum: size for stratum, size in subset["strata"].items() if scores_by_stratum.get(stratum)}
+    return stratified_estimate(scores_by_stratum, sizes, confidence)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from benchmark_index import get_benchmark_index
+    from results_warehouse import DEFAULT_WAREHOUSE
+
+    parser = argparse.ArgumentParser(description='Select a statistically-bounded quick-eval subset of the benchmark')
+    parser.add_argument('--warehouse', default=DEFAULT_WAREHOUSE, help='Results warehouse with past execution results')
+    parser.add_argument('--name', default='quick', help='Subset name (saved to subsets/<name>.json)')
+    parser.add_argument('--error-bound', type=float, default=0.03, help='Maximum absolute error of the overall score (default: 0.03)')
+    parser.add_argument('--min-per-stratum', type=int, default=2, help='Minimum cases per language/category (default: 2)')
+    parser.add_argument('--max-per-stratum', type=int, default=None, help='Maximum cases per language/category')
+    parser.add_argument('--iterations', type=int, default=200, help='IRT fitting iterations (default: 200)')
+    parser.add_argument('--no-complexity', action='store_true', help='Do not use complexity metrics as difficulty covariates')
+    args = parser.parse_args()
+
+    case_results = load_case_results(args.warehouse)
+    if len(case_results) < 2:
+        parser.error("Need execution results for at least two models in the warehouse (see results_warehouse.py ingest)")
+    benchmark_cases = [(language, category, str(record.get("id")))
+                       for language, category, record in get_benchmark_index().iter_records()]
+    features = None if args.no_complexity else load_complexity_features(args.warehouse)
+    if features is not None and not features:
+        print("No complexity metrics in the warehouse - run calculate_complexity.py --warehouse to use them")
+        features = None
+
+    subset = build_subset(case_results, benchmark_cases, features, args.error_bound,
+                          args.min_per_stratum, args.max_per_stratum, args.iterations)
+    subset["name"] = args.name
+
+    os.makedirs(SUBSET_DIR, exist_ok=True)
+    output_path = subset_path(args.name)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(subset, f, indent=2)
+
+    validation = subset["validation"]
+    print("\n" + "=" * 80)
+    print(f"SUBSET '{args.name}': {subset['total_cases']} of {subset['benchmark_cases']} cases "
+          f"({subset['per_stratum']} per language/category)")
+    print("=" * 80)
+    if validation["leave_one_model_out"]:
+        loo = validation["leave_one_model_out"]
+        print(f"Leave-one-model-out max error: overall {loo['max_overall_error']:.4f}, "
+              f"language {loo['max_language_error']:.4f}, category {loo['max_category_error']:.4f}")
+    print(f"In-sample max error: overall {validation['in_sample']['max_overall_error']:.4f}")
+    if not validation["within_bound"]:
+        print(f"Warning: the error bound of {args.error_bound} could not be met; the largest subset tried was kept")
+    print(f"Subset saved to {output_path}")